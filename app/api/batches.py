@@ -1,73 +1,74 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session, joinedload
 from ..database import get_db
-from ..models import (Batch, Recipe, RecipeIngredient, RecipeBatchPortion, WEIGHT_CONVERSIONS, VOLUME_CONVERSIONS,
-                     BAKING_MEASUREMENTS, convert_weight, convert_volume)
+from ..models import Batch, Recipe, RecipeIngredient, WEIGHT_CONVERSIONS, VOLUME_CONVERSIONS, BAKING_MEASUREMENTS
+from ..utils.costing import get_cost_graph, get_latest_completed_tasks
+from ..utils.units import unit_factor
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/batches", tags=["batches-api"])
 
 def calculate_recipe_total_cost(recipe_id: int, db: Session) -> float:
     """Calculate total cost of a recipe including ingredients and batch portions"""
-    recipe_ingredients = db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id == recipe_id).all()
-    ingredients_cost = sum(ri.cost for ri in recipe_ingredients)
+    return get_cost_graph(db).recipe_cost(recipe_id)
 
-    recipe_batch_portions = db.query(RecipeBatchPortion).filter(RecipeBatchPortion.recipe_id == recipe_id).all()
-    batch_portions_cost = sum(rbp.get_total_cost(db) for rbp in recipe_batch_portions)
+def _batch_list_entry(batch: Batch, total_recipe_cost: float, actual_labor_cost: float) -> dict:
+    total_batch_cost = total_recipe_cost + actual_labor_cost
+    cost_per_unit = total_batch_cost / batch.yield_amount if batch.yield_amount else 0
 
-    return ingredients_cost + batch_portions_cost
+    return {
+        "id": batch.id,
+        "recipe_name": batch.recipe.name,
+        "yield_amount": batch.yield_amount,
+        "yield_unit": batch.yield_unit,
+        "cost_per_unit": cost_per_unit,
+        "category": batch.recipe.category.name if batch.recipe.category else None
+    }
+
+def get_batch_list_costs(batches, db: Session) -> list:
+    """Cost per unit for a list of batches using actual labor cost (falls back to estimated if no completed tasks)
+
+    Recipe costs come from the cost graph and the latest completed task for
+    every batch from one windowed query, so the number of queries does not
+    grow with the number of batches. If the bulk path fails the batches are
+    costed one at a time.
+    """
+    try:
+        graph = get_cost_graph(db)
+        latest_tasks = get_latest_completed_tasks(db, [batch.id for batch in batches])
+        result = []
+        for batch in batches:
+            task = latest_tasks.get(batch.id)
+            actual_labor_cost = task.labor_cost if task else batch.estimated_labor_cost
+            result.append(_batch_list_entry(batch, graph.recipe_cost(batch.recipe_id), actual_labor_cost))
+        return result
+    except Exception as e:
+        logger.error(f"Bulk batch costing failed, falling back to per-batch costing: {e}")
+        db.rollback()
+
+    return [
+        _batch_list_entry(batch, calculate_recipe_total_cost(batch.recipe_id, db), batch.get_actual_labor_cost(db))
+        for batch in batches
+    ]
 
 @router.get("/search")
 async def search_batches(q: str = "", db: Session = Depends(get_db)):
-    query = db.query(Batch).options(joinedload(Batch.recipe)).join(Recipe).filter(Recipe.deleted == False)
+    query = db.query(Batch).options(joinedload(Batch.recipe).joinedload(Recipe.category)).join(Recipe).filter(Recipe.deleted == False)
 
     if q:
         query = query.filter(Recipe.name.ilike(f"%{q}%"))
 
     batches = query.all()
 
-    result = []
-    for batch in batches:
-        # Calculate cost per unit using actual labor cost (falls back to estimated if no completed tasks)
-        total_recipe_cost = calculate_recipe_total_cost(batch.recipe_id, db)
-        actual_labor_cost = batch.get_actual_labor_cost(db)
-        total_batch_cost = total_recipe_cost + actual_labor_cost
-        cost_per_unit = total_batch_cost / batch.yield_amount if batch.yield_amount else 0
-
-        batch_data = {
-            "id": batch.id,
-            "recipe_name": batch.recipe.name,
-            "yield_amount": batch.yield_amount,
-            "yield_unit": batch.yield_unit,
-            "cost_per_unit": cost_per_unit,
-            "category": batch.recipe.category.name if batch.recipe.category else None
-        }
-        result.append(batch_data)
-
-    return result
+    return get_batch_list_costs(batches, db)
 
 @router.get("/all")
 async def get_all_batches(db: Session = Depends(get_db)):
-    batches = db.query(Batch).options(joinedload(Batch.recipe)).join(Recipe).filter(Recipe.deleted == False).all()
-
-    result = []
-    for batch in batches:
-        # Calculate cost per unit using actual labor cost (falls back to estimated if no completed tasks)
-        total_recipe_cost = calculate_recipe_total_cost(batch.recipe_id, db)
-        actual_labor_cost = batch.get_actual_labor_cost(db)
-        total_batch_cost = total_recipe_cost + actual_labor_cost
-        cost_per_unit = total_batch_cost / batch.yield_amount if batch.yield_amount else 0
-
-        batch_data = {
-            "id": batch.id,
-            "recipe_name": batch.recipe.name,
-            "yield_amount": batch.yield_amount,
-            "yield_unit": batch.yield_unit,
-            "cost_per_unit": cost_per_unit,
-            "category": batch.recipe.category.name if batch.recipe.category else None
-        }
-        result.append(batch_data)
+    batches = db.query(Batch).options(joinedload(Batch.recipe).joinedload(Recipe.category)).join(Recipe).filter(Recipe.deleted == False).all()
 
-    return result
+    return get_batch_list_costs(batches, db)
 
 @router.get("/{batch_id}/portion_units")
 async def get_batch_portion_units(batch_id: int, db: Session = Depends(get_db)):
@@ -148,46 +149,11 @@ async def get_batch_cost_per_unit(batch_id: int, unit: str, db: Session = Depend
     actual_cost_per_unit = actual_cost_per_yield_unit
 
     if unit != batch.yield_unit:
-        # Get recipe ingredients to determine usage type
-        recipe_ingredients = db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id == batch.recipe_id).all()
-
-        # Determine usage type from ingredients
-        usage_type = None
-        for ri in recipe_ingredients:
-            if ri.ingredient and ri.ingredient.usage_type:
-                usage_type = ri.ingredient.usage_type
-                break
-
-        try:
-            conversion_factor = None
-
-            # Check if both units are in the same system
-            if batch.yield_unit in WEIGHT_CONVERSIONS and unit in WEIGHT_CONVERSIONS:
-                conversion_factor = convert_weight(1, batch.yield_unit, unit)
-            elif batch.yield_unit in VOLUME_CONVERSIONS and unit in VOLUME_CONVERSIONS:
-                conversion_factor = convert_volume(1, batch.yield_unit, unit)
-            elif batch.yield_unit in BAKING_MEASUREMENTS and unit in BAKING_MEASUREMENTS:
-                # Both are baking measurements, convert via cups
-                cups_from_yield = 1 / BAKING_MEASUREMENTS[batch.yield_unit]
-                conversion_factor = cups_from_yield * BAKING_MEASUREMENTS[unit]
-            # Handle cross-system conversions: VOLUME <-> BAKING
-            elif batch.yield_unit in VOLUME_CONVERSIONS and unit in BAKING_MEASUREMENTS:
-                # Convert from volume unit to cups, then to baking measurement
-                cups_from_volume = convert_volume(1, batch.yield_unit, 'cup')
-                # Now convert cups to the baking measurement
-                conversion_factor = cups_from_volume * BAKING_MEASUREMENTS[unit]
-            elif batch.yield_unit in BAKING_MEASUREMENTS and unit in VOLUME_CONVERSIONS:
-                # Convert from baking measurement to cups, then to volume unit
-                cups_from_baking = 1 / BAKING_MEASUREMENTS[batch.yield_unit]
-                # Now convert cups to the volume unit
-                conversion_factor = convert_volume(cups_from_baking, 'cup', unit)
-
-            if conversion_factor is not None:
-                expected_cost_per_unit = expected_cost_per_yield_unit / conversion_factor
-                actual_cost_per_unit = actual_cost_per_yield_unit / conversion_factor
-        except (ValueError, ZeroDivisionError):
-            # Conversion failed, use original values
-            pass
+        # Same-system and volume <-> baking conversions come from the unit registry
+        conversion_factor = unit_factor(batch.yield_unit, unit)
+        if conversion_factor:
+            expected_cost_per_unit = expected_cost_per_yield_unit / conversion_factor
+            actual_cost_per_unit = actual_cost_per_yield_unit / conversion_factor
     
     return {
         "batch_id": batch_id,
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from datetime import date, datetime, time
+from ..database import get_db
+from ..dependencies import get_current_user, require_manager_or_admin
+from ..models import Dish
+from ..utils.dish_costs import (build_menu_margin_report, build_menu_costs_as_of, simulate_ingredient_prices,
+                                MENU_REPORT_SORT_KEYS, DEFAULT_TARGET_FOOD_COST_PERCENT)
+
+router = APIRouter(prefix="/api/dishes", tags=["dishes-api"])
+
+class IngredientPriceChange(BaseModel):
+    ingredient_id: int
+    purchase_total_cost: float
+
+class PriceSimulationRequest(BaseModel):
+    prices: list[IngredientPriceChange]
+    target_food_cost_percent: float = DEFAULT_TARGET_FOOD_COST_PERCENT
+
+@router.get("/margins")
+async def get_menu_margins(sort: str = "name", order: str = "asc", db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """Expected cost, actual cost and margin for every dish"""
+    if sort not in MENU_REPORT_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort key. Use one of: {', '.join(MENU_REPORT_SORT_KEYS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order. Use 'asc' or 'desc'")
+
+    return build_menu_margin_report(db, sort, order)
+
+@router.get("/costs")
+async def get_menu_costs_as_of(as_of: date, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """Expected cost of every dish with ingredient prices in effect at the end of `as_of`"""
+    return build_menu_costs_as_of(db, datetime.combine(as_of, time.max))
+
+@router.post("/simulate_prices")
+async def simulate_prices(request: PriceSimulationRequest, db: Session = Depends(get_db), current_user = Depends(require_manager_or_admin)):
+    """Per-dish cost deltas for hypothetical ingredient prices; nothing is saved"""
+    if not request.prices:
+        raise HTTPException(status_code=400, detail="At least one ingredient price is required")
+    if any(change.purchase_total_cost < 0 for change in request.prices):
+        raise HTTPException(status_code=400, detail="Prices cannot be negative")
+
+    prices = {change.ingredient_id: change.purchase_total_cost for change in request.prices}
+    try:
+        dishes = simulate_ingredient_prices(db, prices, request.target_food_cost_percent)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {
+        "target_food_cost_percent": request.target_food_cost_percent,
+        "over_target_count": sum(1 for row in dishes if row["over_target"]),
+        "newly_over_target_count": sum(1 for row in dishes if row["newly_over_target"]),
+        "dishes": dishes
+    }
+
+@router.get("/{slug}/cost")
+async def get_dish_cost_as_of(slug: str, as_of: date, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """Expected cost of one dish with ingredient prices in effect at the end of `as_of`"""
+    dish = db.query(Dish).filter(Dish.slug == slug).first()
+    if not dish:
+        raise HTTPException(status_code=404, detail="Dish not found")
+
+    rows = build_menu_costs_as_of(db, datetime.combine(as_of, time.max), {dish.id})
+    if not rows:
+        raise HTTPException(status_code=404, detail="Dish not found")
+    return {"as_of": as_of.isoformat(), **rows[0]}
@@ -4,9 +4,9 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..database import get_db
 from ..dependencies import require_manager_or_admin
-from ..models import InventoryDay, InventoryDayItem, Task, User, InventoryItem
+from ..models import InventoryDay, User
 from ..utils.email import send_email, generate_report_email_html
-from datetime import datetime
+from ..utils.inventory_report import get_inventory_report, build_report_email_data
 
 router = APIRouter(prefix="/api/inventory", tags=["email_reports"])
 
@@ -60,112 +60,11 @@ async def send_inventory_report_email(
 
         recipient_emails = [r.email for r in recipients]
 
-        tasks = db.query(Task).filter(Task.day_id == day_id).all()
-        completed_tasks = [t for t in tasks if t.finished_at is not None]
+        # Finalized days' reports come from the same cache as the report page
+        email_data = build_report_email_data(get_inventory_report(db, inventory_day))
+        day_date = email_data["day_date"]
 
-        all_employees = db.query(User).filter(User.is_active == True).all()
-
-        day_items = db.query(InventoryDayItem).filter(InventoryDayItem.day_id == day_id).all()
-
-        day_summary = {
-            'total_tasks': len(tasks),
-            'completed_tasks': len(completed_tasks),
-            'total_labor_cost': sum(t.labor_cost for t in completed_tasks),
-            'total_time_hours': sum(t.total_time_minutes for t in completed_tasks) / 60
-        }
-
-        task_report = {
-            'tasks': []
-        }
-        for task in tasks:
-            task_info = {
-                'description': task.description or 'N/A',
-                'assigned_to': task.assigned_to.full_name if task.assigned_to else 'Unassigned',
-                'status': task.status,
-                'time_minutes': task.total_time_minutes if task.finished_at else 0,
-                'labor_cost': task.labor_cost if task.finished_at else 0
-            }
-            task_report['tasks'].append(task_info)
-
-        inventory_status = {
-            'items': []
-        }
-        for day_item in day_items:
-            if day_item.inventory_item:
-                quantity = day_item.quantity
-                par_level = day_item.inventory_item.par_level
-
-                if quantity < par_level * 0.25:
-                    status = 'critical'
-                elif quantity < par_level * 0.5:
-                    status = 'warning'
-                else:
-                    status = 'ok'
-
-                inventory_status['items'].append({
-                    'name': day_item.inventory_item.name,
-                    'current_quantity': quantity,
-                    'par_level': par_level,
-                    'status': status
-                })
-
-        employee_time = {}
-        for task in completed_tasks:
-            if task.assigned_to:
-                emp_name = task.assigned_to.full_name or task.assigned_to.username
-                if emp_name not in employee_time:
-                    employee_time[emp_name] = 0
-                employee_time[emp_name] += task.total_time_minutes
-
-        time_analysis = {
-            'employees': [
-                {
-                    'name': name,
-                    'hours_worked': minutes / 60
-                }
-                for name, minutes in employee_time.items()
-            ]
-        }
-
-        day_date = inventory_day.date.strftime('%B %d, %Y')
-
-        notes_data = {
-            'daily_note': inventory_day.global_notes,
-            'task_notes': []
-        }
-
-        sorted_tasks = sorted(
-            [t for t in tasks if t.notes],
-            key=lambda x: x.started_at if x.started_at else datetime.max
-        )
-
-        for task in sorted_tasks:
-            assigned_to_name = None
-            if task.assigned_employee_ids:
-                emp_ids = [int(id.strip()) for id in task.assigned_employee_ids.split(',')]
-                if len(emp_ids) > 1:
-                    assigned_to_name = f"Team of {len(emp_ids)}"
-                else:
-                    emp = next((e for e in all_employees if e.id == emp_ids[0]), None)
-                    if emp:
-                        assigned_to_name = emp.full_name or emp.username
-            elif task.assigned_to:
-                assigned_to_name = task.assigned_to.full_name or task.assigned_to.username
-
-            notes_data['task_notes'].append({
-                'description': task.description,
-                'assigned_to': assigned_to_name,
-                'note': task.notes
-            })
-
-        html_body = generate_report_email_html(
-            day_date=day_date,
-            day_summary=day_summary,
-            task_report=task_report,
-            inventory_status=inventory_status,
-            time_analysis=time_analysis,
-            notes_data=notes_data
-        )
+        html_body = generate_report_email_html(**email_data)
 
         subject = f"Daily Operations Report - {day_date}"
 
@@ -0,0 +1,225 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Session, joinedload
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date, timedelta
+from ..database import get_db
+from ..dependencies import require_manager_or_admin, get_current_user
+from ..models import InventoryDay, InventoryDayItem, InventoryDayRollup
+from ..sse import broadcast_inventory_update
+from ..utils.datetime_utils import get_naive_local_time
+from ..utils.day_rollups import TREND_PERIODS, get_day_trends
+from ..utils.task_generation import generate_tasks_for_day
+
+router = APIRouter(prefix="/api/inventory", tags=["inventory-api"])
+
+class InventoryItemCount(BaseModel):
+    item_id: int
+    quantity: Optional[float] = None
+    override_create_task: Optional[bool] = None
+    override_no_task: Optional[bool] = None
+
+class InventoryCountsRequest(BaseModel):
+    items: list[InventoryItemCount]
+
+def _item_status(quantity, par_level):
+    """Same par status the inventory day page shows for a count"""
+    if quantity < par_level:
+        return "below_par"
+    if quantity == par_level:
+        return "on_par"
+    if quantity == par_level + 1:
+        return "near_par"
+    return "good"
+
+def _day_item_data(day_item):
+    item = day_item.inventory_item
+    return {
+        "item_id": item.id,
+        "item_name": item.name,
+        "quantity": day_item.quantity,
+        "par_level": item.par_level,
+        "override_create_task": day_item.override_create_task,
+        "override_no_task": day_item.override_no_task,
+        "status": _item_status(day_item.quantity, item.par_level)
+    }
+
+@router.post("/days/{date}/items")
+async def save_inventory_counts(date: str, request: InventoryCountsRequest, db: Session = Depends(get_db), current_user = Depends(require_manager_or_admin)):
+    """Save the count and override flags of one or more items and regenerate only their tasks
+
+    Fields left out of an item are kept as they are. Only items whose values
+    actually changed are written, have their tasks regenerated and are
+    broadcast to other clients viewing the day.
+    """
+    inventory_day = db.query(InventoryDay).filter(InventoryDay.date == date).first()
+    if not inventory_day:
+        raise HTTPException(status_code=404, detail="Inventory day not found")
+
+    if inventory_day.finalized:
+        raise HTTPException(status_code=400, detail="Cannot update finalized day")
+
+    counts = {count.item_id: count for count in request.items}
+    if any(count.quantity is not None and count.quantity < 0 for count in counts.values()):
+        raise HTTPException(status_code=400, detail="Quantity cannot be negative")
+
+    day_items = db.query(InventoryDayItem).options(
+        joinedload(InventoryDayItem.inventory_item)
+    ).filter(
+        InventoryDayItem.day_id == inventory_day.id,
+        InventoryDayItem.inventory_item_id.in_(counts)
+    ).all()
+
+    missing = set(counts) - {day_item.inventory_item_id for day_item in day_items}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Inventory items not found for this day: {', '.join(map(str, sorted(missing)))}")
+
+    changed_items = []
+    for day_item in day_items:
+        count = counts[day_item.inventory_item_id]
+        values = {
+            "quantity": count.quantity,
+            "override_create_task": count.override_create_task,
+            "override_no_task": count.override_no_task
+        }
+        changed = False
+        for field, value in values.items():
+            if value is not None and getattr(day_item, field) != value:
+                setattr(day_item, field, value)
+                changed = True
+        if changed:
+            changed_items.append(day_item)
+
+    task_changes = {"created": 0, "updated": 0, "deleted": 0}
+    if changed_items:
+        task_changes = generate_tasks_for_day(db, inventory_day, changed_items, [])
+
+    # Serialize before committing so the rows aren't reloaded afterwards
+    items_data = {day_item.inventory_item_id: _day_item_data(day_item) for day_item in day_items}
+    changed_item_ids = [day_item.inventory_item_id for day_item in changed_items]
+
+    if changed_items:
+        db.commit()
+
+        try:
+            await broadcast_inventory_update(
+                inventory_day.id,
+                changed_item_ids[0] if len(changed_item_ids) == 1 else 0,
+                "inventory_items_updated",
+                {"items": [items_data[item_id] for item_id in changed_item_ids], "tasks": task_changes}
+            )
+        except Exception:
+            pass
+
+    return {
+        "items": list(items_data.values()),
+        "changed_item_ids": changed_item_ids,
+        "tasks": task_changes
+    }
+
+@router.get("/trends")
+async def get_inventory_trends(
+    period: str = "week",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(require_manager_or_admin)
+):
+    """Weekly or monthly totals of the finalized days' report metrics (the last year by default)
+
+    Reads only the per-day rollups written when days are finalized.
+    """
+    if period not in TREND_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Period must be one of: {', '.join(TREND_PERIODS)}")
+
+    end_date = end_date or get_naive_local_time().date()
+    start_date = start_date or end_date - timedelta(days=365)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="Start date must be on or before end date")
+
+    return {
+        "period": period,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "periods": get_day_trends(db, period, start_date, end_date)
+    }
+
+def _completed_day_data(day, rollup):
+    data = {
+        "id": day.id,
+        "date": day.date.strftime('%Y-%m-%d'),
+        "day_name": day.date.strftime('%A'),
+        "summary": None
+    }
+    if rollup is not None:
+        data["summary"] = {
+            "total_tasks": rollup.total_tasks,
+            "completed_tasks": rollup.completed_tasks,
+            "below_par_items": rollup.below_par_items,
+            "total_task_minutes": rollup.total_task_minutes,
+            "shift_efficiency": rollup.shift_efficiency,
+            "labor_cost": rollup.labor_cost
+        }
+    return data
+
+@router.get("/completed_days")
+async def get_completed_days(
+    before: Optional[date] = None,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    limit: int = 30,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Finalized days, newest first, one page at a time
+
+    Keyset-paginated on the date: pass the previous page's next_before to
+    get the next page. year (and optionally month) jumps to the end of that
+    year or month. The first (unfiltered) page also lists the months that
+    have finalized days, for the jump controls.
+    """
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="Limit must be between 1 and 100")
+    if year is not None and not 1 <= year < 9999:
+        raise HTTPException(status_code=400, detail="Invalid year")
+    if month is not None and (year is None or not 1 <= month <= 12):
+        raise HTTPException(status_code=400, detail="Month needs a year and must be between 1 and 12")
+
+    first_page = before is None and year is None
+    if before is None and year is not None:
+        # Jump: start from the day after the end of the year or month
+        if month is None or month == 12:
+            before = date(year + 1, 1, 1)
+        else:
+            before = date(year, month + 1, 1)
+
+    query = db.query(InventoryDay, InventoryDayRollup).outerjoin(
+        InventoryDayRollup, InventoryDayRollup.day_id == InventoryDay.id
+    ).filter(InventoryDay.finalized == True)
+    if before is not None:
+        query = query.filter(InventoryDay.date < before)
+
+    rows = query.order_by(InventoryDay.date.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    result = {
+        "days": [_completed_day_data(day, rollup) for day, rollup in rows],
+        "has_more": has_more,
+        "next_before": rows[-1][0].date.isoformat() if has_more else None
+    }
+
+    if first_page:
+        month_year = extract("year", InventoryDay.date)
+        month_number = extract("month", InventoryDay.date)
+        result["months"] = [
+            {"year": row_year, "month": row_month, "days": count}
+            for row_year, row_month, count in db.query(
+                month_year, month_number, func.count(InventoryDay.id)
+            ).filter(
+                InventoryDay.finalized == True
+            ).group_by(month_year, month_number).order_by(month_year.desc(), month_number.desc())
+        ]
+
+    return result
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session, joinedload
 from pydantic import BaseModel
+import math
 from datetime import datetime, timedelta
 from ..database import get_db
 from ..models import Task, Batch, InventoryItem, User, WEIGHT_CONVERSIONS, VOLUME_CONVERSIONS, BAKING_MEASUREMENTS
 from ..auth import get_current_user
 from ..utils.datetime_utils import get_naive_local_time
+from ..utils.day_rollups import refresh_day_rollup
+from ..utils.task_slugs import find_task_by_slug
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks-api"])
 
@@ -18,12 +21,7 @@ class EditAssignedEmployeesRequest(BaseModel):
 
 @router.get("/{task_slug}/scale_options")
 async def get_task_scale_options(task_slug: str, day_id: int = None, db: Session = Depends(get_db)):
-    # Get all tasks and find by slug (slug is a property, not a column)
-    query = db.query(Task).options(joinedload(Task.batch))
-    if day_id:
-        query = query.filter(Task.day_id == day_id)
-    tasks = query.all()
-    task = next((t for t in tasks if t.slug == task_slug), None)
+    task = find_task_by_slug(db, task_slug, day_id, options=[joinedload(Task.batch)])
     if not task or not task.batch:
         raise HTTPException(status_code=404, detail="Task or batch not found")
     
@@ -48,15 +46,10 @@ async def get_task_scale_options(task_slug: str, day_id: int = None, db: Session
 
 @router.get("/{task_slug}/finish_requirements")
 async def get_task_finish_requirements(task_slug: str, day_id: int = None, db: Session = Depends(get_db)):
-    # Get all tasks and find by slug (slug is a property, not a column)
-    query = db.query(Task).options(
+    task = find_task_by_slug(db, task_slug, day_id, options=[
         joinedload(Task.batch),
         joinedload(Task.inventory_item)
-    )
-    if day_id:
-        query = query.filter(Task.day_id == day_id)
-    tasks = query.all()
-    task = next((t for t in tasks if t.slug == task_slug), None)
+    ])
 
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -121,11 +114,7 @@ async def get_task_finish_requirements(task_slug: str, day_id: int = None, db: S
 
 @router.get("/{task_slug}")
 async def get_task_details(task_slug: str, day_id: int = None, db: Session = Depends(get_db)):
-    query = db.query(Task)
-    if day_id:
-        query = query.filter(Task.day_id == day_id)
-    tasks = query.all()
-    task = next((t for t in tasks if t.slug == task_slug), None)
+    task = find_task_by_slug(db, task_slug, day_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
@@ -152,11 +141,7 @@ async def edit_task_time(
     if current_user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Only admins and managers can edit task times")
 
-    query = db.query(Task)
-    if day_id:
-        query = query.filter(Task.day_id == day_id)
-    tasks = query.all()
-    task = next((t for t in tasks if t.slug == task_slug), None)
+    task = find_task_by_slug(db, task_slug, day_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
@@ -182,24 +167,28 @@ async def edit_task_time(
 
         if len(all_sessions) > 1:
             # Multi-session task: use total_minutes to calculate the last session's end time
-            # Calculate time from all previous sessions (excluding the last one)
-            previous_sessions_minutes = sum(
-                session.duration_minutes for session in all_sessions[:-1]
-            )
-            # Calculate how many minutes the last session should be
-            last_session_minutes = request.total_minutes - previous_sessions_minutes
+            # Worked time of all previous sessions (excluding the last one), in seconds like
+            # Task.worked_seconds, so the recorded total matches total_minutes exactly
+            previous_sessions_time = sum((
+                max(timedelta(0), session.ended_at - session.started_at - timedelta(seconds=session.pause_duration or 0))
+                for session in all_sessions[:-1]
+            ), timedelta(0))
+            # Calculate how long the last session should be
+            last_session_time = timedelta(minutes=request.total_minutes) - previous_sessions_time
 
             # Validate that the last session would have positive duration
-            if last_session_minutes < 0:
+            if last_session_time < timedelta(0):
+                minimum_minutes = math.ceil(previous_sessions_time.total_seconds() / 60)
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Total time must be at least {previous_sessions_minutes} minutes (duration of previous sessions)"
+                    detail=f"Total time must be at least {minimum_minutes} minutes (duration of previous sessions)"
                 )
 
             # Calculate the end time for the last session
-            # ended_at = started_at + (last_session_minutes * 60) + pause_duration
-            last_session_seconds = (last_session_minutes * 60) + last_session.pause_duration
-            last_session.ended_at = last_session.started_at + timedelta(seconds=last_session_seconds)
+            # ended_at = started_at + last session time + pause_duration
+            last_session.ended_at = (
+                last_session.started_at + last_session_time + timedelta(seconds=last_session.pause_duration or 0)
+            )
 
             # Also update task.finished_at to match
             task.finished_at = last_session.ended_at
@@ -218,6 +207,8 @@ async def edit_task_time(
             raise HTTPException(status_code=400, detail="Finish time must be after start time")
         task.finished_at = finished_at_dt
 
+    task.record_time_and_cost()
+    refresh_day_rollup(db, task.day)
     db.commit()
 
     return {
@@ -243,11 +234,7 @@ async def edit_assigned_employees(
     if current_user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Only admins and managers can edit task assignments")
 
-    query = db.query(Task)
-    if day_id:
-        query = query.filter(Task.day_id == day_id)
-    tasks = query.all()
-    task = next((t for t in tasks if t.slug == task_slug), None)
+    task = find_task_by_slug(db, task_slug, day_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
@@ -265,11 +252,13 @@ async def edit_assigned_employees(
 
     if len(employee_ids) == 1:
         task.assigned_to_id = employee_ids[0]
-        task.assigned_employee_ids = None
+        task.set_assigned_employees([])
     else:
         task.assigned_to_id = employee_ids[0]
-        task.assigned_employee_ids = ",".join(str(emp_id) for emp_id in employee_ids)
+        task.set_assigned_employees(employee_ids)
 
+    task.record_time_and_cost()
+    refresh_day_rollup(db, task.day)
     db.commit()
 
     return {
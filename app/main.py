@@ -5,9 +5,10 @@ from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, and_
-from datetime import datetime, timedelta
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import datetime
 import json
+import logging
 import os
 from pathlib import Path
 
@@ -22,10 +23,12 @@ if env_file.exists():
                 os.environ.setdefault(key, value)
 
 # Import database and models
-from .database import engine
+from .database import engine, SessionLocal
 from .dependencies import get_db
-from .models import Base, Task, Batch, InventoryItem
-from .utils.datetime_utils import get_naive_local_time
+from .models import Base, Batch
+from .utils.labor_stats import get_labor_stats
+from .utils.cost_table import fill_missing_entity_costs
+from .utils.day_rollups import backfill_day_rollups
 
 # Import routers
 from .routers import (
@@ -34,7 +37,7 @@ from .routers import (
 )
 
 # Import API routers
-from .api import ingredients as api_ingredients, batches as api_batches, recipes as api_recipes, tasks as api_tasks, email_reports
+from .api import ingredients as api_ingredients, batches as api_batches, recipes as api_recipes, tasks as api_tasks, dishes as api_dishes, inventory as api_inventory, email_reports
 
 # Import SSE router
 from .sse import router as sse_router
@@ -44,9 +47,24 @@ from .dependencies import get_current_user
 
 # Import template helper functions
 
+logger = logging.getLogger(__name__)
+
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Fill in cost table rows for recipes, batches and dishes that have none yet
+with SessionLocal() as db:
+    fill_missing_entity_costs(db)
+
+# Write rollups for finalized days that have none yet (days finalized before rollups existed);
+# a day that can't be rolled up must not keep the app from starting
+with SessionLocal() as db:
+    try:
+        backfill_day_rollups(db)
+    except Exception:
+        logger.exception("Failed to backfill day rollups")
+        db.rollback()
+
 # Initialize templates
 from app.utils.template_helpers import setup_template_filters
 templates = setup_template_filters(Jinja2Templates(directory="templates"))
@@ -86,7 +104,9 @@ app.include_router(docs.router)
 app.include_router(api_ingredients.router)
 app.include_router(api_batches.router)
 app.include_router(api_recipes.router)
+app.include_router(api_dishes.router)
 app.include_router(api_tasks.router)
+app.include_router(api_inventory.router)
 app.include_router(email_reports.router)
 
 # Include SSE router
@@ -99,18 +119,8 @@ async def api_batch_labor_stats(slug: str, db: Session = Depends(get_db)):
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
 
-    completed_tasks = db.query(Task).filter(
-        or_(
-            Task.batch_id == batch.id,
-            and_(
-                Task.inventory_item_id.isnot(None),
-                Task.inventory_item.has(InventoryItem.batch_id == batch.id)
-            )
-        ),
-        Task.finished_at.isnot(None)
-    ).order_by(Task.finished_at.desc()).all()
-    
-    if not completed_tasks:
+    stats = get_labor_stats(db, [batch.id]).get(batch.id)
+    if not stats:
         return {
             "task_count": 0,
             "most_recent_cost": batch.estimated_labor_cost,
@@ -121,24 +131,15 @@ async def api_batch_labor_stats(slug: str, db: Session = Depends(get_db)):
             "month_task_count": 0
         }
     
-    # Calculate statistics
-    most_recent = completed_tasks[0]
-    now = get_naive_local_time()
-    week_ago = now - timedelta(days=7)
-    month_ago = now - timedelta(days=30)
-    
-    week_tasks = [t for t in completed_tasks if t.finished_at >= week_ago]
-    month_tasks = [t for t in completed_tasks if t.finished_at >= month_ago]
-    
     return {
-        "task_count": len(completed_tasks),
-        "most_recent_cost": most_recent.labor_cost,
-        "most_recent_date": most_recent.finished_at.strftime('%Y-%m-%d'),
-        "average_week": sum(t.labor_cost for t in week_tasks) / len(week_tasks) if week_tasks else batch.estimated_labor_cost,
-        "average_month": sum(t.labor_cost for t in month_tasks) / len(month_tasks) if month_tasks else batch.estimated_labor_cost,
-        "average_all_time": sum(t.labor_cost for t in completed_tasks) / len(completed_tasks),
-        "week_task_count": len(week_tasks),
-        "month_task_count": len(month_tasks)
+        "task_count": stats["task_count"],
+        "most_recent_cost": stats["most_recent_cost"],
+        "most_recent_date": stats["most_recent_at"].strftime('%Y-%m-%d'),
+        "average_week": stats["average_week"] if stats["week_task_count"] else batch.estimated_labor_cost,
+        "average_month": stats["average_month"] if stats["month_task_count"] else batch.estimated_labor_cost,
+        "average_all_time": stats["average_all_time"],
+        "week_task_count": stats["week_task_count"],
+        "month_task_count": stats["month_task_count"]
     }
 
 # Error handlers
@@ -153,6 +154,16 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         "detail": exc.detail
     }, status_code=exc.status_code)
 
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    # A versioned row (e.g. a task) was changed by another request since it was loaded;
+    # the transaction was rolled back, so nothing of this request was saved
+    return templates.TemplateResponse("error.html", {
+        "request": request,
+        "status_code": 409,
+        "detail": "This was just changed on another device, please reload and try again"
+    }, status_code=409)
+
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc):
     return templates.TemplateResponse("error.html", {
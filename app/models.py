@@ -1,74 +1,34 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, Text, ForeignKey, Enum
-from sqlalchemy.orm import relationship, Session
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, Text, ForeignKey, Enum, Index
+from sqlalchemy.orm import relationship, Session, object_session
 from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime, date
+from datetime import datetime
 import enum
 from app.utils.datetime_utils import get_naive_local_time
+from app.utils.units import WEIGHT_CONVERSIONS, VOLUME_CONVERSIONS, BAKING_MEASUREMENTS, UNIT_FACTORS, unit_factor
 
 Base = declarative_base()
 
-# Unit conversion dictionaries
-WEIGHT_CONVERSIONS = {
-    'lb': 1.0,
-    'oz': 16.0,
-    'g': 453.592,
-    'kg': 0.453592
+USAGE_CONVERSIONS = {
+    'weight': WEIGHT_CONVERSIONS,
+    'volume': VOLUME_CONVERSIONS
 }
 
-VOLUME_CONVERSIONS = {
-    'gal': 1.0,
-    'qt': 4.0,
-    'pt': 8.0,
-    'cup': 16.0,
-    'fl_oz': 128.0,
-    'l': 3.78541,
-    'ml': 3785.41
-}
+def get_portion_ratio(portion, batch):
+    """Fraction of a batch's recipe used by a recipe or dish batch portion"""
+    if portion.use_recipe_portion and portion.recipe_portion_percent:
+        return portion.recipe_portion_percent
 
-BAKING_MEASUREMENTS = {
-    'cup': 1.0,
-    '3_4_cup': 1.333,
-    '2_3_cup': 1.5,
-    '1_2_cup': 2.0,
-    '1_3_cup': 3.0,
-    '1_4_cup': 4.0,
-    '1_8_cup': 8.0,
-    'tbsp': 16.0,
-    'tsp': 48.0
-}
+    # Cannot calculate for variable yield without recipe portion
+    if batch.variable_yield:
+        return 0
 
-def convert_weight(amount, from_unit, to_unit):
-    """Convert weight from one unit to another"""
-    if from_unit not in WEIGHT_CONVERSIONS or to_unit not in WEIGHT_CONVERSIONS:
-        raise ValueError(f"Unsupported weight units: {from_unit} to {to_unit}")
-    
-    # Convert to pounds first, then to target unit
-    pounds = amount / WEIGHT_CONVERSIONS[from_unit]
-    return pounds * WEIGHT_CONVERSIONS[to_unit]
-
-def convert_volume(amount, from_unit, to_unit):
-    """Convert volume from one unit to another"""
-    if from_unit not in VOLUME_CONVERSIONS or to_unit not in VOLUME_CONVERSIONS:
-        raise ValueError(f"Unsupported volume units: {from_unit} to {to_unit}")
-    
-    # Convert to gallons first, then to target unit
-    gallons = amount / VOLUME_CONVERSIONS[from_unit]
-    return gallons * VOLUME_CONVERSIONS[to_unit]
-
-def convert_baking_measurement(amount, from_unit, to_unit, weight_per_cup, weight_unit):
-    """Convert baking measurements using weight conversion"""
-    if from_unit not in BAKING_MEASUREMENTS or to_unit not in BAKING_MEASUREMENTS:
-        raise ValueError(f"Unsupported baking units: {from_unit} to {to_unit}")
-    
-    # Convert to cups first
-    cups = amount / BAKING_MEASUREMENTS[from_unit]
-    
-    # Convert to weight
-    weight = cups * weight_per_cup
-    
-    # Convert back to target baking measurement
-    target_cups = weight / weight_per_cup
-    return target_cups * BAKING_MEASUREMENTS[to_unit]
+    if batch.yield_amount and portion.portion_size and portion.portion_unit:
+        # Convert portion_size to the batch yield unit (1.0 when they match)
+        factor = unit_factor(portion.portion_unit, batch.yield_unit)
+        if factor is not None:
+            return portion.portion_size * factor / batch.yield_amount
+
+    return 0
 
 class User(Base):
     __tablename__ = "users"
@@ -153,6 +113,7 @@ class Ingredient(Base):
     baking_weight_unit = Column(String)  # oz, g, lb
     
     created_at = Column(DateTime, default=get_naive_local_time)
+    updated_at = Column(DateTime, default=get_naive_local_time, onupdate=get_naive_local_time)  # Row version for cost caches
     
     # Relationships
     category = relationship("Category")
@@ -240,49 +201,77 @@ class Ingredient(Base):
         if unit == self.net_unit:
             return base_cost_per_net_unit
         
-        # Handle baking measurements
+        # Handle baking measurements: weight of the requested amount via the defined measurement
         if (unit in BAKING_MEASUREMENTS and self.has_baking_conversion and
             self.baking_weight_amount and self.baking_weight_unit):
-
-            # Convert from baking measurement to weight
-            if unit in BAKING_MEASUREMENTS:
-                # Convert the defined baking measurement to cups first
-                cups_per_defined_unit = 1.0 / BAKING_MEASUREMENTS[self.baking_measurement_unit]
-                weight_per_cup = self.baking_weight_amount / cups_per_defined_unit
-
-                # Convert requested unit to cups
-                cups_per_requested_unit = 1.0 / BAKING_MEASUREMENTS[unit]
-                weight_for_requested_unit = weight_per_cup * cups_per_requested_unit
+            baking_factor = unit_factor(unit, self.baking_measurement_unit)
+            if baking_factor is not None:
+                weight_for_requested_unit = self.baking_weight_amount * baking_factor
 
                 # Convert weight to net unit if needed
-                if self.baking_weight_unit != self.net_unit:
-                    if (self.baking_weight_unit in WEIGHT_CONVERSIONS and
-                        self.net_unit in WEIGHT_CONVERSIONS):
-                        weight_for_requested_unit = convert_weight(
-                            weight_for_requested_unit,
-                            self.baking_weight_unit,
-                            self.net_unit
-                        )
+                if (self.baking_weight_unit in WEIGHT_CONVERSIONS and
+                    self.net_unit in WEIGHT_CONVERSIONS):
+                    weight_for_requested_unit *= UNIT_FACTORS[(self.baking_weight_unit, self.net_unit)]
 
                 return base_cost_per_net_unit * weight_for_requested_unit
-        
-        # Handle weight conversions
-        if (self.usage_type == 'weight' and 
-            self.net_unit in WEIGHT_CONVERSIONS and 
-            unit in WEIGHT_CONVERSIONS):
-            conversion_factor = convert_weight(1, self.net_unit, unit)
-            return base_cost_per_net_unit / conversion_factor
-        
-        # Handle volume conversions
-        if (self.usage_type == 'volume' and 
-            self.net_unit in VOLUME_CONVERSIONS and 
-            unit in VOLUME_CONVERSIONS):
-            conversion_factor = convert_volume(1, self.net_unit, unit)
-            return base_cost_per_net_unit / conversion_factor
-        
+
+        # Handle weight/volume conversions within the ingredient's usage system
+        conversions = USAGE_CONVERSIONS.get(self.usage_type)
+        if conversions and self.net_unit in conversions and unit in conversions:
+            return base_cost_per_net_unit / UNIT_FACTORS[(self.net_unit, unit)]
+
         # If no conversion possible, return base cost
         return base_cost_per_net_unit
 
+class IngredientPrice(Base):
+    """Append-only history of an ingredient's pricing, one row per change"""
+    __tablename__ = "ingredient_prices"
+    __table_args__ = (
+        Index("ix_ingredient_prices_ingredient_effective", "ingredient_id", "effective_at"),
+    )
+
+    # Ingredient columns that determine its cost per unit
+    PRICING_FIELDS = (
+        "usage_type", "purchase_type", "purchase_total_cost", "use_item_count_pricing",
+        "items_per_case", "net_weight_volume_item", "net_weight_volume_case", "net_unit",
+        "has_baking_conversion", "baking_measurement_unit", "baking_weight_amount", "baking_weight_unit"
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), nullable=False)
+    effective_at = Column(DateTime, nullable=False, default=get_naive_local_time)
+    usage_type = Column(String)
+    purchase_type = Column(String)
+    purchase_total_cost = Column(Float)
+    use_item_count_pricing = Column(Boolean, default=False)
+    items_per_case = Column(Integer)
+    net_weight_volume_item = Column(Float)
+    net_weight_volume_case = Column(Float)
+    net_unit = Column(String)
+    has_baking_conversion = Column(Boolean, default=False)
+    baking_measurement_unit = Column(String)
+    baking_weight_amount = Column(Float)
+    baking_weight_unit = Column(String)
+
+    @classmethod
+    def from_ingredient(cls, ingredient, effective_at=None):
+        """Snapshot an ingredient's current pricing"""
+        price = cls(ingredient_id=ingredient.id, effective_at=effective_at or get_naive_local_time())
+        for field in cls.PRICING_FIELDS:
+            setattr(price, field, getattr(ingredient, field))
+        return price
+
+    def same_pricing(self, ingredient):
+        """Whether an ingredient's pricing matches this snapshot"""
+        return all(getattr(self, field) == getattr(ingredient, field) for field in self.PRICING_FIELDS)
+
+    def to_ingredient(self, ingredient):
+        """Transient copy of an ingredient priced as of this snapshot (for costing only)"""
+        priced = Ingredient(id=ingredient.id, name=ingredient.name, updated_at=self.effective_at)
+        for field in self.PRICING_FIELDS:
+            setattr(priced, field, getattr(self, field))
+        return priced
+
 class Recipe(Base):
     __tablename__ = "recipes"
 
@@ -334,82 +323,15 @@ class RecipeBatchPortion(Base):
 
     def get_recipe_cost(self, db: Session):
         """Get recipe cost for this portion"""
-        # Calculate total recipe cost including ingredients and batch portions
-        recipe_ingredients = db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id == self.batch.recipe_id).all()
-        ingredients_cost = sum(ri.cost for ri in recipe_ingredients)
-
-        # Also include batch portions from the recipe
-        recipe_batch_portions = db.query(RecipeBatchPortion).filter(RecipeBatchPortion.recipe_id == self.batch.recipe_id).all()
-        batch_portions_cost = sum(rbp.get_total_cost(db) for rbp in recipe_batch_portions)
+        from app.utils.costing import get_cost_graph
 
-        total_recipe_cost = ingredients_cost + batch_portions_cost
-
-        if self.use_recipe_portion and self.recipe_portion_percent:
-            return total_recipe_cost * self.recipe_portion_percent
-        else:
-            # Calculate based on portion size
-            if self.batch.variable_yield:
-                return 0
-
-            if self.batch.yield_amount and self.portion_size and self.portion_unit:
-                # Check if unit conversion is needed
-                if self.portion_unit == self.batch.yield_unit:
-                    # Same unit, simple ratio
-                    portion_ratio = self.portion_size / self.batch.yield_amount
-                    return total_recipe_cost * portion_ratio
-                else:
-                    # Different units, need to convert
-                    # Try to convert portion_size to batch yield_unit
-                    try:
-                        if self.portion_unit in WEIGHT_CONVERSIONS and self.batch.yield_unit in WEIGHT_CONVERSIONS:
-                            converted_portion = convert_weight(self.portion_size, self.portion_unit, self.batch.yield_unit)
-                            portion_ratio = converted_portion / self.batch.yield_amount
-                            return total_recipe_cost * portion_ratio
-                        elif self.portion_unit in VOLUME_CONVERSIONS and self.batch.yield_unit in VOLUME_CONVERSIONS:
-                            converted_portion = convert_volume(self.portion_size, self.portion_unit, self.batch.yield_unit)
-                            portion_ratio = converted_portion / self.batch.yield_amount
-                            return total_recipe_cost * portion_ratio
-                    except (ValueError, KeyError):
-                        # Conversion failed, fall back to simple ratio
-                        portion_ratio = self.portion_size / self.batch.yield_amount
-                        return total_recipe_cost * portion_ratio
-
-        return 0
+        return get_cost_graph(db).portion_recipe_cost(self)
 
     def get_labor_cost(self, db: Session):
         """Get estimated labor cost for this portion"""
-        labor_cost = self.batch.estimated_labor_cost
+        from app.utils.costing import get_cost_graph
 
-        if self.use_recipe_portion and self.recipe_portion_percent:
-            return labor_cost * self.recipe_portion_percent
-        else:
-            # Calculate based on portion size
-            if self.batch.variable_yield:
-                return 0
-
-            if self.batch.yield_amount and self.portion_size and self.portion_unit:
-                # Check if unit conversion is needed
-                if self.portion_unit == self.batch.yield_unit:
-                    # Same unit, simple ratio
-                    portion_ratio = self.portion_size / self.batch.yield_amount
-                    return labor_cost * portion_ratio
-                else:
-                    # Different units, need to convert
-                    try:
-                        if self.portion_unit in WEIGHT_CONVERSIONS and self.batch.yield_unit in WEIGHT_CONVERSIONS:
-                            converted_portion = convert_weight(self.portion_size, self.portion_unit, self.batch.yield_unit)
-                            portion_ratio = converted_portion / self.batch.yield_amount
-                            return labor_cost * portion_ratio
-                        elif self.portion_unit in VOLUME_CONVERSIONS and self.batch.yield_unit in VOLUME_CONVERSIONS:
-                            converted_portion = convert_volume(self.portion_size, self.portion_unit, self.batch.yield_unit)
-                            portion_ratio = converted_portion / self.batch.yield_amount
-                            return labor_cost * portion_ratio
-                    except (ValueError, KeyError):
-                        # Conversion failed, fall back to simple ratio
-                        portion_ratio = self.portion_size / self.batch.yield_amount
-                        return labor_cost * portion_ratio
-
-        return 0
+        return get_cost_graph(db).portion_labor_cost(self)
 
     def get_total_cost(self, db: Session):
         """Get total cost (recipe + labor)"""
@@ -532,39 +454,8 @@ class DishBatchPortion(Base):
     
     def get_recipe_cost(self, db: Session):
         """Get recipe cost for this portion"""
-        recipe_ingredients = db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id == self.batch.recipe_id).all()
-        total_recipe_cost = sum(ri.cost for ri in recipe_ingredients)
-
-        if self.use_recipe_portion and self.recipe_portion_percent:
-            return total_recipe_cost * self.recipe_portion_percent
-        else:
-            # Calculate based on portion size
-            if self.batch.variable_yield:
-                return 0  # Cannot calculate for variable yield without recipe portion
-
-            if self.batch.yield_amount and self.portion_size and self.portion_unit:
-                # Check if unit conversion is needed
-                if self.portion_unit == self.batch.yield_unit:
-                    # Same unit, simple ratio
-                    portion_ratio = self.portion_size / self.batch.yield_amount
-                    return total_recipe_cost * portion_ratio
-                else:
-                    # Different units, need to convert
-                    try:
-                        if self.portion_unit in WEIGHT_CONVERSIONS and self.batch.yield_unit in WEIGHT_CONVERSIONS:
-                            converted_portion = convert_weight(self.portion_size, self.portion_unit, self.batch.yield_unit)
-                            portion_ratio = converted_portion / self.batch.yield_amount
-                            return total_recipe_cost * portion_ratio
-                        elif self.portion_unit in VOLUME_CONVERSIONS and self.batch.yield_unit in VOLUME_CONVERSIONS:
-                            converted_portion = convert_volume(self.portion_size, self.portion_unit, self.batch.yield_unit)
-                            portion_ratio = converted_portion / self.batch.yield_amount
-                            return total_recipe_cost * portion_ratio
-                    except (ValueError, KeyError):
-                        # Conversion failed, fall back to simple ratio
-                        portion_ratio = self.portion_size / self.batch.yield_amount
-                        return total_recipe_cost * portion_ratio
-
-        return 0
+        from .utils.costing import get_cost_graph
+        return get_cost_graph(db).portion_recipe_cost(self)
     
     def get_labor_cost(self, db: Session, cost_type='estimated'):
         """Get labor cost for this portion"""
@@ -581,36 +472,7 @@ class DishBatchPortion(Base):
         else:
             labor_cost = self.batch.estimated_labor_cost
 
-        if self.use_recipe_portion and self.recipe_portion_percent:
-            return labor_cost * self.recipe_portion_percent
-        else:
-            # Calculate based on portion size
-            if self.batch.variable_yield:
-                return 0  # Cannot calculate for variable yield without recipe portion
-
-            if self.batch.yield_amount and self.portion_size and self.portion_unit:
-                # Check if unit conversion is needed
-                if self.portion_unit == self.batch.yield_unit:
-                    # Same unit, simple ratio
-                    portion_ratio = self.portion_size / self.batch.yield_amount
-                    return labor_cost * portion_ratio
-                else:
-                    # Different units, need to convert
-                    try:
-                        if self.portion_unit in WEIGHT_CONVERSIONS and self.batch.yield_unit in WEIGHT_CONVERSIONS:
-                            converted_portion = convert_weight(self.portion_size, self.portion_unit, self.batch.yield_unit)
-                            portion_ratio = converted_portion / self.batch.yield_amount
-                            return labor_cost * portion_ratio
-                        elif self.portion_unit in VOLUME_CONVERSIONS and self.batch.yield_unit in VOLUME_CONVERSIONS:
-                            converted_portion = convert_volume(self.portion_size, self.portion_unit, self.batch.yield_unit)
-                            portion_ratio = converted_portion / self.batch.yield_amount
-                            return labor_cost * portion_ratio
-                    except (ValueError, KeyError):
-                        # Conversion failed, fall back to simple ratio
-                        portion_ratio = self.portion_size / self.batch.yield_amount
-                        return labor_cost * portion_ratio
-
-        return 0
+        return labor_cost * get_portion_ratio(self, self.batch)
     
     def get_expected_cost(self, db: Session):
         """Get expected total cost (recipe + estimated labor)"""
@@ -628,73 +490,22 @@ class DishBatchPortion(Base):
         """Get actual total cost with month average labor"""
         return self.get_recipe_cost(db) + self.get_labor_cost(db, 'month_avg')
     
+    def _get_average_labor_cost(self, db: Session, window):
+        """Average labor cost of completed tasks for a window, from SQL aggregates"""
+        from .utils.labor_stats import get_batch_labor_stats
+        return get_batch_labor_stats(db, [self.batch_id])[self.batch_id][window]
+
     def get_week_avg_labor_cost(self, db: Session):
         """Get week average labor cost"""
-        from datetime import timedelta
-        from sqlalchemy import or_, and_
-        
-        week_ago = get_naive_local_time() - timedelta(days=7)
-        
-        week_tasks = db.query(Task).filter(
-            or_(
-                Task.batch_id == self.batch_id,
-                and_(
-                    Task.inventory_item_id.isnot(None),
-                    Task.inventory_item.has(InventoryItem.batch_id == self.batch_id)
-                )
-            ),
-            Task.finished_at.isnot(None),
-            Task.finished_at >= week_ago
-        ).all()
-        
-        if week_tasks:
-            return sum(t.labor_cost for t in week_tasks) / len(week_tasks)
-        
-        return self.batch.estimated_labor_cost
+        return self._get_average_labor_cost(db, 'week_avg')
     
     def get_month_avg_labor_cost(self, db: Session):
         """Get month average labor cost"""
-        from datetime import timedelta
-        from sqlalchemy import or_, and_
-        
-        month_ago = get_naive_local_time() - timedelta(days=30)
-        
-        month_tasks = db.query(Task).filter(
-            or_(
-                Task.batch_id == self.batch_id,
-                and_(
-                    Task.inventory_item_id.isnot(None),
-                    Task.inventory_item.has(InventoryItem.batch_id == self.batch_id)
-                )
-            ),
-            Task.finished_at.isnot(None),
-            Task.finished_at >= month_ago
-        ).all()
-        
-        if month_tasks:
-            return sum(t.labor_cost for t in month_tasks) / len(month_tasks)
-        
-        return self.batch.estimated_labor_cost
+        return self._get_average_labor_cost(db, 'month_avg')
     
     def get_all_time_avg_labor_cost(self, db: Session):
         """Get all time average labor cost"""
-        from sqlalchemy import or_, and_
-        
-        all_tasks = db.query(Task).filter(
-            or_(
-                Task.batch_id == self.batch_id,
-                and_(
-                    Task.inventory_item_id.isnot(None),
-                    Task.inventory_item.has(InventoryItem.batch_id == self.batch_id)
-                )
-            ),
-            Task.finished_at.isnot(None)
-        ).all()
-        
-        if all_tasks:
-            return sum(t.labor_cost for t in all_tasks) / len(all_tasks)
-        
-        return self.batch.estimated_labor_cost
+        return self._get_average_labor_cost(db, 'all_time_avg')
 
 class DishIngredientPortion(Base):
     __tablename__ = "dish_ingredient_portions"
@@ -781,15 +592,47 @@ class InventoryDay(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, unique=True, index=True)
-    employees_working = Column(String)  # Comma-separated employee IDs
     global_notes = Column(Text)
     finalized = Column(Boolean, default=False)
     started_at = Column(DateTime)  # When day was created/started
     finalized_at = Column(DateTime)  # When day was finalized
+    usage_recorded_at = Column(DateTime)  # When the par suggestion job recorded this day's item usage
     created_at = Column(DateTime, default=get_naive_local_time)
 
+    # Relationships
+    day_employees = relationship("DayEmployee", back_populates="day", order_by="DayEmployee.position",
+                                 cascade="all, delete-orphan")
+
+    @property
+    def employees_working(self):
+        """Comma-separated IDs of the employees working this day, in the order they were picked"""
+        return ','.join(str(day_employee.employee_id) for day_employee in self.day_employees)
+
+    def set_employees_working(self, employee_ids):
+        """Replace the employees working this day, keeping their order"""
+        self.day_employees = [
+            DayEmployee(employee_id=employee_id, position=position)
+            for position, employee_id in enumerate(dict.fromkeys(employee_ids))
+        ]
+
+class DayEmployee(Base):
+    __tablename__ = "day_employees"
+    __table_args__ = (
+        Index("ix_day_employees_employee_day", "employee_id", "day_id"),
+    )
+
+    day_id = Column(Integer, ForeignKey("inventory_days.id"), primary_key=True)
+    employee_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)  # Order the employee was picked in
+
+    day = relationship("InventoryDay", back_populates="day_employees")
+    employee = relationship("User")
+
 class InventoryDayItem(Base):
     __tablename__ = "inventory_day_items"
+    __table_args__ = (
+        Index("ix_inventory_day_items_day_item", "day_id", "inventory_item_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     day_id = Column(Integer, ForeignKey("inventory_days.id"))
@@ -802,6 +645,79 @@ class InventoryDayItem(Base):
     day = relationship("InventoryDay")
     inventory_item = relationship("InventoryItem")
 
+class InventoryItemUsage(Base):
+    """How much of an item was used between two consecutive finalized days, in par units"""
+    __tablename__ = "inventory_item_usage"
+    __table_args__ = (
+        Index("ix_inventory_item_usage_item_day", "inventory_item_id", "day_id", unique=True),
+        Index("ix_inventory_item_usage_item_date", "inventory_item_id", "date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"), nullable=False)
+    day_id = Column(Integer, ForeignKey("inventory_days.id"), nullable=False)  # Day whose count closes the period
+    date = Column(Date, nullable=False)  # Date of the day the period starts on
+    days = Column(Integer, nullable=False)  # Days between the two counts
+    usage = Column(Float, nullable=False)  # Opening count + made - closing count
+
+class ParSuggestion(Base):
+    """Suggested par level for an inventory item, computed from its usage history"""
+    __tablename__ = "par_suggestions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"), nullable=False, unique=True)
+    suggested_par = Column(Float, nullable=False)  # 90th percentile of daily usage
+    mean_daily_usage = Column(Float, nullable=False)
+    p90_daily_usage = Column(Float, nullable=False)
+    weekday_pars = Column(String)  # Comma-separated suggested pars for Monday..Sunday
+    observations = Column(Integer, nullable=False)
+    computed_at = Column(DateTime, default=get_naive_local_time)
+
+    @property
+    def weekday_par_list(self):
+        """Suggested par for each weekday, Monday first"""
+        if not self.weekday_pars:
+            return [self.suggested_par] * 7
+        return [float(value) for value in self.weekday_pars.split(',')]
+
+class InventoryDayRollup(Base):
+    """Report metrics of a finalized day, written when it is finalized, for multi-day trends"""
+    __tablename__ = "inventory_day_rollups"
+    __table_args__ = (
+        Index("ix_inventory_day_rollups_date", "date", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day_id = Column(Integer, ForeignKey("inventory_days.id"), nullable=False, unique=True)
+    date = Column(Date, nullable=False)
+    total_tasks = Column(Integer, nullable=False)  # Started tasks, as counted by the day's report
+    completed_tasks = Column(Integer, nullable=False)
+    unstarted_tasks = Column(Integer, nullable=False)
+    inventory_items = Column(Integer, nullable=False)  # Items counted
+    below_par_items = Column(Integer, nullable=False)
+    total_task_minutes = Column(Integer, nullable=False)  # Time on started tasks
+    completed_task_minutes = Column(Integer, nullable=False)
+    shift_minutes = Column(Float)  # Day start to finalize; null if the day has no start time
+    off_task_minutes = Column(Float)
+    shift_efficiency = Column(Float)  # Task time / shift time, in percent
+    labor_cost = Column(Float, nullable=False)
+    computed_at = Column(DateTime, default=get_naive_local_time)
+
+class InventoryDayCategoryRollup(Base):
+    """Started and completed task counts of a finalized day per category (null for uncategorized tasks)"""
+    __tablename__ = "inventory_day_category_rollups"
+    __table_args__ = (
+        Index("ix_inventory_day_category_rollups_date", "date"),
+        Index("ix_inventory_day_category_rollups_day", "day_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day_id = Column(Integer, ForeignKey("inventory_days.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"))
+    task_count = Column(Integer, nullable=False)
+    completed_count = Column(Integer, nullable=False)
+
 class JanitorialTask(Base):
     __tablename__ = "janitorial_tasks"
     
@@ -829,16 +745,20 @@ class JanitorialTaskDay(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_batch_id_finished_at", "batch_id", "finished_at"),
+        Index("ix_tasks_slug_day_id", "slug", "day_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    day_id = Column(Integer, ForeignKey("inventory_days.id"))
+    day_id = Column(Integer, ForeignKey("inventory_days.id"), index=True)
     assigned_to_id = Column(Integer, ForeignKey("users.id"))
-    assigned_employee_ids = Column(String)  # Comma-separated employee IDs for multi-assignment
-    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"))
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"), index=True)
     batch_id = Column(Integer, ForeignKey("batches.id"))
     janitorial_task_id = Column(Integer, ForeignKey("janitorial_tasks.id"))
     category_id = Column(Integer, ForeignKey("categories.id"))
     description = Column(String)
+    slug = Column(String)  # Unique within the day, assigned by utils.task_slugs
     auto_generated = Column(Boolean, default=False)
     started_at = Column(DateTime)
     finished_at = Column(DateTime)
@@ -854,7 +774,14 @@ class Task(Base):
     snapshot_par_level = Column(Float)  # Par level when task was created
     snapshot_override_create = Column(Boolean, default=False)  # Override state when task was created
     snapshot_override_no_task = Column(Boolean, default=False)  # Override state when task was created
+    duration_seconds = Column(Integer)  # Worked seconds, recorded when the task is finished
+    recorded_labor_cost = Column("labor_cost", Float)  # Labor cost, recorded when the task is finished
     created_at = Column(DateTime, default=get_naive_local_time)
+    version = Column(Integer, nullable=False, default=1)  # Row version, checked and bumped by every update
+
+    # Updates are issued as UPDATE ... WHERE id = ? AND version = ?, so a task changed
+    # since it was loaded raises StaleDataError instead of being overwritten
+    __mapper_args__ = {"version_id_col": version}
     
     # Relationships
     day = relationship("InventoryDay")
@@ -864,6 +791,20 @@ class Task(Base):
     janitorial_task = relationship("JanitorialTask")
     category = relationship("Category")
     sessions = relationship("TaskSession", back_populates="task", cascade="all, delete-orphan")
+    assignments = relationship("TaskAssignment", back_populates="task", order_by="TaskAssignment.position",
+                               cascade="all, delete-orphan")  # Multi-assignment; assigned_to is the primary assignee
+
+    @property
+    def assigned_employee_ids(self):
+        """Comma-separated IDs of the employees assigned to this task, in assignment order (None if none)"""
+        return ','.join(str(assignment.employee_id) for assignment in self.assignments) or None
+
+    def set_assigned_employees(self, employee_ids):
+        """Replace the employees assigned to this task, keeping their order"""
+        self.assignments = [
+            TaskAssignment(employee_id=employee_id, position=position)
+            for position, employee_id in enumerate(dict.fromkeys(employee_ids))
+        ]
     
     @property
     def status(self):
@@ -901,10 +842,15 @@ class Task(Base):
         return int(total_seconds)
 
     @property
-    def total_time_minutes(self):
-        """Calculate total time in minutes from all sessions"""
+    def worked_seconds(self):
+        """Calculate worked seconds from sessions (or start/finish times), excluding pauses"""
         if self.sessions:
-            return sum(session.duration_minutes for session in self.sessions)
+            end_default = self.finished_at or get_naive_local_time()
+            total_seconds = 0
+            for session in self.sessions:
+                session_seconds = ((session.ended_at or end_default) - session.started_at).total_seconds()
+                total_seconds += max(0, session_seconds - session.pause_duration)
+            return int(total_seconds)
 
         if not self.started_at:
             return 0
@@ -916,58 +862,65 @@ class Task(Base):
         total_seconds = (end_time - self.started_at).total_seconds()
         total_seconds -= self.total_pause_time
 
-        return max(0, int(total_seconds / 60))
+        return max(0, int(total_seconds))
+
+    @property
+    def total_time_minutes(self):
+        """Calculate total time in minutes from all sessions"""
+        if self.finished_at and self.duration_seconds is not None:
+            return self.duration_seconds // 60
+
+        if self.sessions:
+            return sum(session.duration_minutes for session in self.sessions)
+
+        return self.worked_seconds // 60
     
     @property
     def labor_cost(self):
         """Calculate labor cost based on time and highest wage of assigned employees"""
-        if not self.finished_at or not self.assigned_to:
+        if not self.finished_at:
             return 0
-        
+
+        if self.recorded_labor_cost is not None:
+            return self.recorded_labor_cost
+
+        return self.calculate_labor_cost()
+
+    def calculate_labor_cost(self, wages=None):
+        """Calculate labor cost based on time and highest wage of assigned employees
+
+        `wages` maps employee_id -> hourly wage (utils.labor_costing.get_task_wages);
+        pass it when costing many tasks so wages are looked up once.
+        """
+        if not self.finished_at or not self.assigned_to_id:
+            return 0
+
+        from app.utils.labor_costing import get_task_wages, task_employee_ids
+
+        if wages is None:
+            db = object_session(self)
+            if db is None:
+                return (self.total_time_minutes / 60) * (self.assigned_to.hourly_wage if self.assigned_to else 0)
+            wages = get_task_wages(db, [self])
+
         # Get highest wage among assigned employees
-        highest_wage = self.assigned_to.hourly_wage
-        
-        if self.assigned_employee_ids:
-            # Parse employee IDs and get highest wage
-            try:
-                employee_ids = [int(id.strip()) for id in self.assigned_employee_ids.split(',') if id.strip()]
-                # We need to get a database session to query employees
-                # This will be handled by passing the session from the calling code
-                # For now, use the assigned_to wage as fallback
-                pass
-            except (ValueError, AttributeError):
-                pass
-        
+        highest_wage = max((wages.get(emp_id, 0) for emp_id in task_employee_ids(self)), default=0)
+
         return (self.total_time_minutes / 60) * highest_wage
-    
-    @property
-    def slug(self):
-        """Generate slug from task description and related entities"""
-        from app.utils.slugify import slugify
-
-        # For manual tasks, ALWAYS use the description if available
-        # This ensures manually created tasks keep their custom names even when attached to batches
-        if not self.auto_generated and self.description:
-            base_slug = slugify(self.description[:50])
-        # For auto-generated tasks, prefer the most specific entity name
-        # Priority: inventory_item > batch/recipe > janitorial_task > description
-        elif self.inventory_item:
-            base_slug = slugify(self.inventory_item.name)
-        elif self.batch and self.batch.recipe:
-            base_slug = slugify(self.batch.recipe.name)
-        elif self.janitorial_task:
-            base_slug = slugify(self.janitorial_task.title)
-        elif self.description:
-            base_slug = slugify(self.description[:50])
-        else:
-            base_slug = f"task-{self.id}"
 
-        # Add scale suffix for batch tasks if not full scale
-        if self.batch and self.selected_scale and self.selected_scale != 'full':
-            base_slug = f"{base_slug}-{self.selected_scale}"
+    def record_time_and_cost(self, wages=None):
+        """Persist duration_seconds and labor cost for a finished task (cleared while it is open)
 
-        return base_slug
+        Call whenever a task's finish time, sessions or assignees change.
+        """
+        if not self.finished_at:
+            self.duration_seconds = None
+            self.recorded_labor_cost = None
+            return
 
+        self.duration_seconds = self.worked_seconds
+        self.recorded_labor_cost = self.calculate_labor_cost(wages)
+    
     @property
     def requires_made_amount(self):
         """Check if this task requires entering a made amount"""
@@ -997,6 +950,7 @@ class Task(Base):
         self.finished_at = None
         self.is_paused = False
         self.paused_at = None
+        self.record_time_and_cost()
 
 class UtilityCost(Base):
     __tablename__ = "utility_costs"
@@ -1011,11 +965,38 @@ class UtilityCost(Base):
         """Calculate daily cost (monthly / 30)"""
         return self.monthly_cost / 30
 
+class EntityCost(Base):
+    __tablename__ = "entity_costs"
+    __table_args__ = (
+        Index("ix_entity_costs_type_id", "entity_type", "entity_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String, nullable=False)  # recipe, batch, dish
+    entity_id = Column(Integer, nullable=False)
+    recipe_cost = Column(Float, default=0)  # Full (nested) recipe cost
+    cost_per_unit = Column(Float)  # Batches: expected cost per yield unit
+    expected_cost = Column(Float)  # Dishes: recipe + estimated labor + ingredients
+    updated_at = Column(DateTime, default=get_naive_local_time, onupdate=get_naive_local_time)
+
+class TaskAssignment(Base):
+    __tablename__ = "task_assignments"
+    __table_args__ = (
+        Index("ix_task_assignments_employee_task", "employee_id", "task_id"),
+    )
+
+    task_id = Column(Integer, ForeignKey("tasks.id"), primary_key=True)
+    employee_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)  # Order the employee was assigned in
+
+    task = relationship("Task", back_populates="assignments")
+    employee = relationship("User")
+
 class TaskSession(Base):
     __tablename__ = "task_sessions"
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
     started_at = Column(DateTime, nullable=False)
     ended_at = Column(DateTime)
     pause_duration = Column(Integer, default=0)
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..dependencies import require_admin, get_current_user
 from ..schemas import UserOut
 from ..utils.backup import create_backup, cleanup_old_backups, list_backups, get_backup_dir, restore_backup
+from ..utils.exports import EXPORTS, EXPORT_FORMATS, stream_export
+from datetime import date
 from pathlib import Path
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,7 +28,8 @@ async def administration_page(
     return templates.TemplateResponse("administration.html", {
         "request": request,
         "current_user": current_user,
-        "backups": backups
+        "backups": backups,
+        "export_datasets": list(EXPORTS)
     })
 
 @router.post("/administration/backup")
@@ -96,3 +100,26 @@ async def restore_database_backup(
         })
     else:
         raise HTTPException(status_code=500, detail=f"Restore failed: {result['error']}")
+
+@router.get("/administration/export/{dataset}")
+async def export_data(
+    dataset: str,
+    format: str = "csv",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user: UserOut = Depends(require_admin)
+):
+    """Stream the raw history of a dataset as CSV or JSON Lines, optionally limited to a date range"""
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="Start date must be on or before end date")
+
+    filename = "_".join([dataset] + [day.isoformat() for day in (start_date, end_date) if day]) + f".{format}"
+    return StreamingResponse(
+        stream_export(dataset, format, start_date, end_date),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -7,6 +7,8 @@ from ..dependencies import require_manager_or_admin, get_current_user, require_a
 from ..models import Batch, Recipe, RecipeIngredient, Category
 from ..utils.template_helpers import setup_template_filters
 from ..utils.slugify import generate_unique_slug
+from ..utils.costing import get_cost_graph
+from ..utils.cost_table import get_entity_costs, refresh_entity_costs
 
 router = APIRouter(prefix="/batches", tags=["batches"])
 templates = setup_template_filters(Jinja2Templates(directory="templates"))
@@ -21,6 +23,7 @@ async def batches_page(request: Request, db: Session = Depends(get_db), current_
         "request": request,
         "current_user": current_user,
         "batches": batches,
+        "costs": get_entity_costs(db, "batch"),
         "recipes": recipes,
         "categories": categories
     })
@@ -77,6 +80,7 @@ async def create_batch(
 
     db.add(batch)
     db.commit()
+    refresh_entity_costs(db)
 
     return RedirectResponse(url=f"/batches/{slug}", status_code=302)
 
@@ -87,7 +91,7 @@ async def batch_detail(slug: str, request: Request, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Batch not found")
 
     recipe_ingredients = db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id == batch.recipe_id).all()
-    total_recipe_cost = sum(ri.cost for ri in recipe_ingredients)
+    total_recipe_cost = get_cost_graph(db).batch_recipe_cost(batch.id)
 
     # Get actual labor cost (falls back to estimated if no completed tasks)
     actual_labor_cost = batch.get_actual_labor_cost(db)
@@ -162,6 +166,13 @@ async def update_batch(
         recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
         if not recipe:
             raise HTTPException(status_code=404, detail="Recipe not found")
+
+        # A batch can't be made from a recipe that (indirectly) uses this batch
+        graph = get_cost_graph(db)
+        cycle = graph.find_batch_cycle(batch.id, recipe_id)
+        if cycle:
+            raise HTTPException(status_code=400, detail=f"Batch recipe would create a recipe cycle: {graph.describe_cycle(cycle)}")
+
         batch.slug = generate_unique_slug(db, Batch, recipe.name, exclude_id=batch.id)
 
     batch.recipe_id = recipe_id
@@ -183,6 +194,7 @@ async def update_batch(
     batch.scale_sixteenth = scale_sixteenth if can_be_scaled else False
     
     db.commit()
+    refresh_entity_costs(db)
 
     return RedirectResponse(url=f"/batches/{batch.slug}", status_code=302)
 
@@ -194,5 +206,6 @@ async def delete_batch(slug: str, db: Session = Depends(get_db), current_user =
     
     db.delete(batch)
     db.commit()
+    refresh_entity_costs(db)
     
     return RedirectResponse(url="/batches", status_code=302)
\ No newline at end of file
@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Request, Form, HTTPException, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 import json
 from ..database import get_db
 from ..dependencies import require_manager_or_admin, get_current_user, require_admin
 from ..models import Dish, Category, DishBatchPortion, DishIngredientPortion, Batch
 from ..utils.template_helpers import setup_template_filters
 from ..utils.slugify import generate_unique_slug
+from ..utils.cost_table import get_entity_costs, refresh_entity_costs
+from ..utils.dish_costs import build_dish_cost_breakdown, build_menu_margin_report, MENU_REPORT_SORT_KEYS
 
 router = APIRouter(prefix="/dishes", tags=["dishes"])
 templates = setup_template_filters(Jinja2Templates(directory="templates"))
@@ -21,6 +23,7 @@ async def dishes_page(request: Request, db: Session = Depends(get_db), current_u
         "request": request,
         "current_user": current_user,
         "dishes": dishes,
+        "costs": get_entity_costs(db, "dish"),
         "categories": categories
     })
 
@@ -82,89 +85,41 @@ async def create_dish(
         raise HTTPException(status_code=400, detail="Invalid ingredient portions data")
     
     db.commit()
+    refresh_entity_costs(db)
 
     return RedirectResponse(url=f"/dishes/{slug}", status_code=302)
 
+@router.get("/margins", response_class=HTMLResponse)
+async def menu_margins_page(request: Request, sort: str = "name", order: str = "asc", db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    if sort not in MENU_REPORT_SORT_KEYS:
+        sort = "name"
+    if order not in ("asc", "desc"):
+        order = "asc"
+
+    rows = build_menu_margin_report(db, sort, order)
+
+    return templates.TemplateResponse("dish_margins.html", {
+        "request": request,
+        "current_user": current_user,
+        "rows": rows,
+        "sort": sort,
+        "order": order
+    })
+
 @router.get("/{slug}", response_class=HTMLResponse)
 async def dish_detail(slug: str, request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    dish = db.query(Dish).filter(Dish.slug == slug).first()
+    dish = db.query(Dish).options(joinedload(Dish.category)).filter(Dish.slug == slug).first()
     if not dish:
         raise HTTPException(status_code=404, detail="Dish not found")
 
-    dish_batch_portions = db.query(DishBatchPortion).filter(DishBatchPortion.dish_id == dish.id).all()
-    dish_ingredient_portions = db.query(DishIngredientPortion).filter(DishIngredientPortion.dish_id == dish.id).all()
-    
-    # Calculate costs dynamically for each portion
-    expected_recipe_cost = sum(portion.get_recipe_cost(db) for portion in dish_batch_portions)
-    expected_labor_cost = sum(portion.get_labor_cost(db, 'estimated') for portion in dish_batch_portions)
-    ingredient_cost = sum(portion.cost for portion in dish_ingredient_portions)
-    expected_total_cost = expected_recipe_cost + expected_labor_cost + ingredient_cost
-    
-    actual_recipe_cost = sum(portion.get_recipe_cost(db) for portion in dish_batch_portions)
-    actual_labor_cost = sum(portion.get_labor_cost(db, 'actual') for portion in dish_batch_portions)
-    actual_total_cost = actual_recipe_cost + actual_labor_cost + ingredient_cost
-    
-    week_recipe_cost = sum(portion.get_recipe_cost(db) for portion in dish_batch_portions)
-    week_labor_cost = sum(portion.get_labor_cost(db, 'week_avg') for portion in dish_batch_portions)
-    actual_total_cost_week = week_recipe_cost + week_labor_cost + ingredient_cost
-    
-    month_recipe_cost = sum(portion.get_recipe_cost(db) for portion in dish_batch_portions)
-    month_labor_cost = sum(portion.get_labor_cost(db, 'month_avg') for portion in dish_batch_portions)
-    actual_total_cost_month = month_recipe_cost + month_labor_cost + ingredient_cost
-    
-    all_time_recipe_cost = sum(portion.get_recipe_cost(db) for portion in dish_batch_portions)
-    all_time_labor_cost = sum(portion.get_labor_cost(db, 'all_time_avg') for portion in dish_batch_portions)
-    actual_total_cost_all_time = all_time_recipe_cost + all_time_labor_cost + ingredient_cost
-    
-    # Calculate profits and margins
-    expected_profit = dish.sale_price - expected_total_cost
-    expected_profit_margin = (expected_profit / dish.sale_price * 100) if dish.sale_price > 0 else 0
-    
-    actual_profit = dish.sale_price - actual_total_cost
-    actual_profit_margin = (actual_profit / dish.sale_price * 100) if dish.sale_price > 0 else 0
-    
-    actual_profit_week = dish.sale_price - actual_total_cost_week
-    actual_profit_margin_week = (actual_profit_week / dish.sale_price * 100) if dish.sale_price > 0 else 0
-    
-    actual_profit_month = dish.sale_price - actual_total_cost_month
-    actual_profit_margin_month = (actual_profit_month / dish.sale_price * 100) if dish.sale_price > 0 else 0
-    
-    actual_profit_all_time = dish.sale_price - actual_total_cost_all_time
-    actual_profit_margin_all_time = (actual_profit_all_time / dish.sale_price * 100) if dish.sale_price > 0 else 0
-    
+    # Every figure is computed up front so rendering the template issues no queries
+    breakdown = build_dish_cost_breakdown(db, dish)
+
     return templates.TemplateResponse("dish_detail.html", {
         "request": request,
         "current_user": current_user,
         "dish": dish,
-        "dish_batch_portions": dish_batch_portions,
-        "dish_ingredient_portions": dish_ingredient_portions,
-        "ingredient_cost": ingredient_cost,
-        "expected_total_cost": expected_total_cost,
-        "expected_recipe_cost": expected_recipe_cost,
-        "expected_labor_cost": expected_labor_cost,
-        "actual_total_cost": actual_total_cost,
-        "actual_recipe_cost": actual_recipe_cost,
-        "actual_labor_cost": actual_labor_cost,
-        "week_recipe_cost": week_recipe_cost,
-        "week_labor_cost": week_labor_cost,
-        "actual_total_cost_week": actual_total_cost_week,
-        "month_recipe_cost": month_recipe_cost,
-        "month_labor_cost": month_labor_cost,
-        "actual_total_cost_month": actual_total_cost_month,
-        "all_time_recipe_cost": all_time_recipe_cost,
-        "all_time_labor_cost": all_time_labor_cost,
-        "actual_total_cost_all_time": actual_total_cost_all_time,
-        "expected_profit": expected_profit,
-        "expected_profit_margin": expected_profit_margin,
-        "actual_profit": actual_profit,
-        "actual_profit_margin": actual_profit_margin,
-        "actual_profit_week": actual_profit_week,
-        "actual_profit_margin_week": actual_profit_margin_week,
-        "actual_profit_month": actual_profit_month,
-        "actual_profit_margin_month": actual_profit_margin_month,
-        "actual_profit_all_time": actual_profit_all_time,
-        "actual_profit_margin_all_time": actual_profit_margin_all_time,
-        "db": db
+        **breakdown.template_context()
     })
 
 @router.get("/{slug}/edit", response_class=HTMLResponse)
@@ -251,6 +206,7 @@ async def update_dish(
         raise HTTPException(status_code=400, detail="Invalid ingredient portions data")
     
     db.commit()
+    refresh_entity_costs(db)
 
     return RedirectResponse(url=f"/dishes/{dish.slug}", status_code=302)
 
@@ -268,5 +224,6 @@ async def delete_dish(slug: str, db: Session = Depends(get_db), current_user = D
     
     db.delete(dish)
     db.commit()
+    refresh_entity_costs(db)
     
     return RedirectResponse(url="/dishes", status_code=302)
\ No newline at end of file
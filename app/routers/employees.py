@@ -9,6 +9,7 @@ from ..auth import hash_password
 
 from ..utils.template_helpers import setup_template_filters
 from ..utils.slugify import generate_unique_slug
+from ..utils.labor_costing import invalidate_wages
 router = APIRouter(prefix="/employees", tags=["employees"])
 templates = setup_template_filters(Jinja2Templates(directory="templates"))
 
@@ -135,6 +136,7 @@ async def update_employee(
         employee.hashed_password = hash_password(password)
     
     db.commit()
+    invalidate_wages(employee.id)
 
     return RedirectResponse(url=f"/employees/{employee.slug}", status_code=302)
 
@@ -8,6 +8,8 @@ from ..models import Ingredient, Category, Vendor, VendorUnit
 from ..utils.helpers import get_today_date
 from ..utils.template_helpers import setup_template_filters
 from ..utils.slugify import generate_unique_slug
+from ..utils.cost_table import refresh_entity_costs
+from ..utils.price_history import record_ingredient_price
 
 router = APIRouter(prefix="/ingredients", tags=["ingredients"])
 templates = setup_template_filters(Jinja2Templates(directory="templates"))
@@ -114,6 +116,8 @@ async def create_ingredient(
         ingredient.baking_weight_unit = baking_weight_unit
     
     db.add(ingredient)
+    db.flush()
+    record_ingredient_price(db, ingredient)
     db.commit()
 
     return RedirectResponse(url=f"/ingredients/{slug}", status_code=302)
@@ -239,7 +243,9 @@ async def update_ingredient(
         ingredient.baking_weight_amount = None
         ingredient.baking_weight_unit = None
     
+    record_ingredient_price(db, ingredient)
     db.commit()
+    refresh_entity_costs(db)
 
     return RedirectResponse(url=f"/ingredients/{ingredient.slug}", status_code=302)
 
@@ -251,5 +257,6 @@ async def delete_ingredient(slug: str, db: Session = Depends(get_db), current_us
     
     db.delete(ingredient)
     db.commit()
+    refresh_entity_costs(db)
     
     return RedirectResponse(url="/ingredients", status_code=302)
\ No newline at end of file
@@ -1,22 +1,33 @@
 from fastapi import APIRouter, Request, Form, HTTPException, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import case
+from sqlalchemy.orm import Session, joinedload, selectinload, aliased
+from sqlalchemy import case, insert, select, literal, func, and_
 from datetime import date, timedelta
 from ..database import get_db
 from ..dependencies import require_manager_or_admin, get_current_user, require_admin
 from ..models import (InventoryItem, Category, Batch, ParUnitName, InventoryDay,
-                     InventoryDayItem, Task, User, JanitorialTask, JanitorialTaskDay)
+                     InventoryDayItem, Task, TaskAssignment, User, JanitorialTask, JanitorialTaskDay, ParSuggestion)
 from ..utils.helpers import get_today_date
 from datetime import datetime
 from ..utils.datetime_utils import get_naive_local_time
+from ..utils.labor_costing import record_labor_costs
+from ..utils.task_generation import generate_tasks_for_day
+from ..utils.inventory_day_view import get_inventory_day_view, calculate_task_summary
+from ..utils.inventory_report import get_inventory_report
+from ..utils.day_rollups import write_day_rollup
+from ..utils.par_suggestions import update_par_suggestions
 
 # Import SSE broadcasting functions
 from ..sse import broadcast_task_update, broadcast_inventory_update, broadcast_day_update
 
 from ..utils.template_helpers import setup_template_filters
 from ..utils.slugify import slugify, generate_unique_slug
+from ..utils.task_slugs import find_task_by_slug
+from ..utils import task_lifecycle
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 templates = setup_template_filters(Jinja2Templates(directory="templates"))
@@ -24,11 +35,7 @@ templates = setup_template_filters(Jinja2Templates(directory="templates"))
 
 def get_task_by_slug(db: Session, day_id: int, task_slug: str):
     """Helper function to get a task by its slug within a specific day."""
-    tasks = db.query(Task).filter(Task.day_id == day_id).all()
-    for task in tasks:
-        if task.slug == task_slug:
-            return task
-    return None
+    return find_task_by_slug(db, task_slug, day_id)
 
 @router.get("/", response_class=HTMLResponse)
 async def inventory_page(request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
@@ -43,6 +50,9 @@ async def inventory_page(request: Request, db: Session = Depends(get_db), curren
     today = date.today()
     current_day = db.query(InventoryDay).filter(InventoryDay.date == today).first()
     
+    # Suggested pars from the usage history (written by the par suggestion job)
+    par_suggestions = {suggestion.inventory_item_id: suggestion for suggestion in db.query(ParSuggestion).all()}
+
     # Get recent finalized days (last 30 days)
     thirty_days_ago = today - timedelta(days=30)
     finalized_days = db.query(InventoryDay).filter(
@@ -61,6 +71,7 @@ async def inventory_page(request: Request, db: Session = Depends(get_db), curren
         "current_day": current_day,
         "janitorial_tasks": janitorial_tasks,
         "finalized_days": finalized_days,
+        "par_suggestions": par_suggestions,
         "today_date": get_today_date()
     })
 
@@ -169,7 +180,9 @@ async def delete_janitorial_task(
     # Delete associated day tasks first
     db.query(JanitorialTaskDay).filter(JanitorialTaskDay.janitorial_task_id == task_id).delete()
     
-    # Delete any tasks linked to this janitorial task
+    # Delete any tasks linked to this janitorial task, with their assignments
+    linked_task_ids = db.query(Task.id).filter(Task.janitorial_task_id == task_id).scalar_subquery()
+    db.query(TaskAssignment).filter(TaskAssignment.task_id.in_(linked_task_ids)).delete(synchronize_session=False)
     db.query(Task).filter(Task.janitorial_task_id == task_id).delete()
     
     db.delete(janitorial_task)
@@ -183,6 +196,7 @@ async def create_inventory_day(
     date: str = Form(...),
     employees_working: list = Form([]),
     global_notes: str = Form(""),
+    carry_over: bool = Form(False),
     db: Session = Depends(get_db),
     current_user = Depends(require_manager_or_admin)
 ):
@@ -202,33 +216,55 @@ async def create_inventory_day(
     # Create new inventory day
     inventory_day = InventoryDay(
         date=inventory_date_obj,
-        employees_working=','.join(map(str, employees_working)) if employees_working else '',
         global_notes=global_notes if global_notes else None,
         started_at=get_naive_local_time()
     )
+    inventory_day.set_employees_working(int(employee_id) for employee_id in employees_working)
     
     db.add(inventory_day)
     db.flush()  # Get the day ID
-    
-    # Create inventory day items for all inventory items
-    inventory_items = db.query(InventoryItem).all()
-    for item in inventory_items:
-        day_item = InventoryDayItem(
-            day_id=inventory_day.id,
-            inventory_item_id=item.id,
-            quantity=0.0
+
+    # Optionally start from the most recent finalized day's counts and overrides
+    previous_day_id = None
+    if carry_over:
+        previous_day_id = db.query(InventoryDay.id).filter(
+            InventoryDay.finalized == True,
+            InventoryDay.date < inventory_date_obj
+        ).order_by(InventoryDay.date.desc()).limit(1).scalar()
+
+    # Create inventory day items for all inventory items (one INSERT ... SELECT)
+    if previous_day_id is not None:
+        previous = aliased(InventoryDayItem)
+        day_items = select(
+            literal(inventory_day.id),
+            InventoryItem.id,
+            func.coalesce(previous.quantity, 0.0),
+            func.coalesce(previous.override_create_task, False),
+            func.coalesce(previous.override_no_task, False)
+        ).outerjoin(
+            previous,
+            and_(previous.inventory_item_id == InventoryItem.id, previous.day_id == previous_day_id)
         )
-        db.add(day_item)
+    else:
+        day_items = select(literal(inventory_day.id), InventoryItem.id, literal(0.0), literal(False), literal(False))
+    db.execute(
+        insert(InventoryDayItem).from_select(
+            ["day_id", "inventory_item_id", "quantity", "override_create_task", "override_no_task"],
+            day_items
+        )
+    )
     
-    # Create janitorial task day items for all janitorial tasks
-    janitorial_tasks = db.query(JanitorialTask).all()
-    for janitorial_task in janitorial_tasks:
-        janitorial_day_item = JanitorialTaskDay(
-            day_id=inventory_day.id,
-            janitorial_task_id=janitorial_task.id,
-            include_task=(janitorial_task.task_type == 'daily')  # Auto-include daily tasks
+    # Create janitorial task day items for all janitorial tasks, auto-including daily tasks
+    db.execute(
+        insert(JanitorialTaskDay).from_select(
+            ["day_id", "janitorial_task_id", "include_task"],
+            select(
+                literal(inventory_day.id),
+                JanitorialTask.id,
+                case((JanitorialTask.task_type == 'daily', True), else_=False)
+            )
         )
-        db.add(janitorial_day_item)
+    )
     
     db.commit()
     
@@ -373,9 +409,9 @@ async def create_manual_task(
         batch_id=batch_id if batch_id else None,  # Direct batch assignment or from inventory item
         category_id=category_id if category_id else None,
         description=description,
-        auto_generated=False,
-        assigned_employee_ids=','.join(map(str, assigned_to_ids)) if assigned_to_ids else None
+        auto_generated=False
     )
+    task.set_assigned_employees(assigned_to_ids)
     
     # Set batch_id from inventory item if linked and no direct batch selected
     if inventory_item_id and not batch_id:
@@ -473,7 +509,7 @@ async def assign_multiple_employees_to_task(
     task.assigned_to_id = assigned_to_ids[0]
 
     # Store all assigned employee IDs
-    task.assigned_employee_ids = ','.join(map(str, assigned_to_ids))
+    task.set_assigned_employees(assigned_to_ids)
 
     db.commit()
 
@@ -504,11 +540,7 @@ async def assign_and_start_task(
     current_user = Depends(require_manager_or_admin)
 ):
     """Assign employees to a task and immediately start it"""
-    from ..models import TaskSession
-
-    inventory_day = db.query(InventoryDay).filter(InventoryDay.date == date).first()
-    if not inventory_day:
-        raise HTTPException(status_code=404, detail="Inventory day not found")
+    inventory_day, task = task_lifecycle.load_task(db, date, task_slug)
 
     # Get form data to handle checkbox values
     form_data = await request.form()
@@ -522,10 +554,6 @@ async def assign_and_start_task(
             except ValueError:
                 continue
 
-    task = get_task_by_slug(db, inventory_day.id, task_slug)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
     if not assigned_to_ids:
         raise HTTPException(status_code=400, detail="At least one employee must be selected")
 
@@ -534,23 +562,13 @@ async def assign_and_start_task(
 
     # Assign employees
     task.assigned_to_id = assigned_to_ids[0]
-    task.assigned_employee_ids = ','.join(map(str, assigned_to_ids))
-
-    # Start task immediately if it doesn't need scale selection
-    if not needs_scale_selection:
-        now = get_naive_local_time()
-        task.started_at = now
-        task.is_paused = False
-
-        # Create task session
-        task_session = TaskSession(
-            task_id=task.id,
-            started_at=now
-        )
-        db.add(task_session)
+    task.set_assigned_employees(assigned_to_ids)
 
     # Commit once - either assignment only (needs scale) or assignment + start (ready to go)
-    db.commit()
+    if needs_scale_selection:
+        db.commit()
+    else:
+        task_lifecycle.start_task(db, task)
 
     # Broadcast assignment
     try:
@@ -616,7 +634,9 @@ async def bulk_assign_tasks(
                     continue
 
     # Get all tasks for this day
-    all_tasks = db.query(Task).filter(Task.day_id == inventory_day.id, Task.status != 'completed').all()
+    all_tasks = db.query(Task).options(selectinload(Task.assignments)).filter(
+        Task.day_id == inventory_day.id, Task.status != 'completed'
+    ).all()
 
     # Update each task
     updated_count = 0
@@ -626,14 +646,15 @@ async def bulk_assign_tasks(
         # Update task assignments (even if empty - allows unassigning all)
         if employee_ids:
             task.assigned_to_id = employee_ids[0]  # Set primary assignee to first
-            task.assigned_employee_ids = ','.join(map(str, employee_ids))
         else:
             # Clear assignments
             task.assigned_to_id = None
-            task.assigned_employee_ids = None
+        task.set_assigned_employees(employee_ids)
 
         updated_count += 1
 
+    # Reassigned tasks that were already finished are re-costed for their new assignees
+    record_labor_costs(db, [task for task in all_tasks if task.finished_at])
     db.commit()
 
     # Broadcast bulk assignment update
@@ -654,34 +675,8 @@ async def start_task(
     db: Session = Depends(get_db),
     current_user = Depends(require_manager_or_admin)
 ):
-    from ..models import TaskSession
-
-    inventory_day = db.query(InventoryDay).filter(InventoryDay.date == date).first()
-    if not inventory_day:
-        raise HTTPException(status_code=404, detail="Inventory day not found")
-
-    task = get_task_by_slug(db, inventory_day.id, task_slug)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if task.status != "not_started":
-        raise HTTPException(status_code=400, detail="Task already started")
-
-    # Check if task has assigned employees
-    if not task.assigned_to_id and not task.assigned_employee_ids:
-        raise HTTPException(status_code=400, detail="Please assign employees before starting this task")
-
-    now = get_naive_local_time()
-    task.started_at = now
-    task.is_paused = False
-
-    # Create new session
-    session = TaskSession(
-        task_id=task.id,
-        started_at=now
-    )
-    db.add(session)
-    db.commit()
+    inventory_day, task = task_lifecycle.load_task(db, date, task_slug)
+    now = task_lifecycle.start_task(db, task)
 
     # Broadcast AFTER committing
     try:
@@ -702,53 +697,8 @@ async def start_task_with_scale(
     db: Session = Depends(get_db),
     current_user = Depends(require_manager_or_admin)
 ):
-    from ..models import TaskSession
-
-    inventory_day = db.query(InventoryDay).filter(InventoryDay.date == date).first()
-    if not inventory_day:
-        raise HTTPException(status_code=404, detail="Inventory day not found")
-
-    task = get_task_by_slug(db, inventory_day.id, task_slug)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if task.status != "not_started":
-        raise HTTPException(status_code=400, detail="Task already started")
-
-    # Check if task has assigned employees
-    if not task.assigned_to_id and not task.assigned_employee_ids:
-        raise HTTPException(status_code=400, detail="Please assign employees before starting this task")
-
-    # Set scale information
-    task.selected_scale = selected_scale
-
-    # Calculate scale factor
-    scale_factors = {
-        'full': 1.0,
-        'double': 2.0,
-        'triple': 3.0,
-        'quadruple': 4.0,
-        'three_quarters': 0.75,
-        'two_thirds': 0.6667,
-        'half': 0.5,
-        'quarter': 0.25,
-        'eighth': 0.125,
-        'sixteenth': 0.0625
-    }
-    task.scale_factor = scale_factors.get(selected_scale, 1.0)
-
-    # Start the task
-    now = get_naive_local_time()
-    task.started_at = now
-    task.is_paused = False
-
-    # Create new session
-    session = TaskSession(
-        task_id=task.id,
-        started_at=now
-    )
-    db.add(session)
-    db.commit()
+    inventory_day, task = task_lifecycle.load_task(db, date, task_slug)
+    now = task_lifecycle.start_task(db, task, selected_scale)
 
     # Broadcast AFTER committing
     try:
@@ -759,7 +709,6 @@ async def start_task_with_scale(
         })
     except Exception as e:
         pass
-        pass
 
     return RedirectResponse(url=f"/inventory/day/{inventory_day.date}", status_code=302)
 
@@ -770,21 +719,8 @@ async def pause_task(
     db: Session = Depends(get_db),
     current_user = Depends(require_manager_or_admin)
 ):
-    inventory_day = db.query(InventoryDay).filter(InventoryDay.date == date).first()
-    if not inventory_day:
-        raise HTTPException(status_code=404, detail="Inventory day not found")
-
-    task = get_task_by_slug(db, inventory_day.id, task_slug)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if task.status != "in_progress":
-        raise HTTPException(status_code=400, detail="Task is not in progress")
-
-    now = get_naive_local_time()
-    task.paused_at = now
-    task.is_paused = True
-    db.commit()
+    inventory_day, task = task_lifecycle.load_task(db, date, task_slug)
+    now = task_lifecycle.pause_task(db, task)
 
     # Broadcast AFTER committing
     try:
@@ -805,38 +741,8 @@ async def resume_task(
     db: Session = Depends(get_db),
     current_user = Depends(require_manager_or_admin)
 ):
-    from ..models import TaskSession
-
-    inventory_day = db.query(InventoryDay).filter(InventoryDay.date == date).first()
-    if not inventory_day:
-        raise HTTPException(status_code=404, detail="Inventory day not found")
-
-    task = get_task_by_slug(db, inventory_day.id, task_slug)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if task.status != "paused":
-        raise HTTPException(status_code=400, detail="Task is not paused")
-
-    now = get_naive_local_time()
-
-    # Add pause time to total and current session
-    if task.paused_at:
-        pause_duration = int((now - task.paused_at).total_seconds())
-        task.total_pause_time += pause_duration
-
-        # Update current session pause duration
-        current_session = db.query(TaskSession).filter(
-            TaskSession.task_id == task.id,
-            TaskSession.ended_at.is_(None)
-        ).first()
-
-        if current_session:
-            current_session.pause_duration += pause_duration
-
-    task.paused_at = None
-    task.is_paused = False
-    db.commit()
+    inventory_day, task = task_lifecycle.load_task(db, date, task_slug, with_sessions=True)
+    now = task_lifecycle.resume_task(db, task)
 
     # Broadcast AFTER committing
     try:
@@ -857,54 +763,8 @@ async def finish_task(
     db: Session = Depends(get_db),
     current_user = Depends(require_manager_or_admin)
 ):
-    from ..models import TaskSession
-
-    inventory_day = db.query(InventoryDay).filter(InventoryDay.date == date).first()
-    if not inventory_day:
-        raise HTTPException(status_code=404, detail="Inventory day not found")
-
-    task = get_task_by_slug(db, inventory_day.id, task_slug)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if task.status not in ["in_progress", "paused"]:
-        raise HTTPException(status_code=400, detail="Task cannot be finished")
-
-    now = get_naive_local_time()
-
-    # Handle paused task - add pause time to total and current session
-    if task.is_paused and task.paused_at:
-        pause_duration = int((now - task.paused_at).total_seconds())
-        task.total_pause_time += pause_duration
-
-        # Update current session pause duration
-        current_session = db.query(TaskSession).filter(
-            TaskSession.task_id == task.id,
-            TaskSession.ended_at.is_(None)
-        ).first()
-
-        if current_session:
-            current_session.pause_duration += pause_duration
-
-    task.finished_at = now
-    task.is_paused = False
-    task.paused_at = None
-
-    # Close the current session
-    current_session = db.query(TaskSession).filter(
-        TaskSession.task_id == task.id,
-        TaskSession.ended_at.is_(None)
-    ).first()
-
-    if current_session:
-        current_session.ended_at = now
-
-    # For non-variable yield batches, set made amount automatically
-    if task.batch and not task.batch.variable_yield and task.scale_factor:
-        task.made_amount = task.batch.yield_amount * task.scale_factor
-        task.made_unit = task.batch.yield_unit
-
-    db.commit()
+    inventory_day, task = task_lifecycle.load_task(db, date, task_slug, with_sessions=True)
+    now = task_lifecycle.finish_task(db, inventory_day, task)
 
     # Broadcast AFTER committing
     try:
@@ -930,54 +790,8 @@ async def finish_task_with_amount(
     db: Session = Depends(get_db),
     current_user = Depends(require_manager_or_admin)
 ):
-    from ..models import TaskSession
-
-    inventory_day = db.query(InventoryDay).filter(InventoryDay.date == date).first()
-    if not inventory_day:
-        raise HTTPException(status_code=404, detail="Inventory day not found")
-
-    task = get_task_by_slug(db, inventory_day.id, task_slug)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if task.status not in ["in_progress", "paused"]:
-        raise HTTPException(status_code=400, detail="Task cannot be finished")
-
-    now = get_naive_local_time()
-
-    # Set made amount
-    task.made_amount = made_amount
-    task.made_unit = made_unit
-
-    # Handle paused task - add pause time to total and current session
-    if task.is_paused and task.paused_at:
-        pause_duration = int((now - task.paused_at).total_seconds())
-        task.total_pause_time += pause_duration
-
-        # Update current session pause duration
-        current_session = db.query(TaskSession).filter(
-            TaskSession.task_id == task.id,
-            TaskSession.ended_at.is_(None)
-        ).first()
-
-        if current_session:
-            current_session.pause_duration += pause_duration
-
-    # Finish the task
-    task.finished_at = now
-    task.is_paused = False
-    task.paused_at = None
-
-    # Close the current session
-    current_session = db.query(TaskSession).filter(
-        TaskSession.task_id == task.id,
-        TaskSession.ended_at.is_(None)
-    ).first()
-
-    if current_session:
-        current_session.ended_at = now
-
-    db.commit()
+    inventory_day, task = task_lifecycle.load_task(db, date, task_slug, with_sessions=True)
+    now = task_lifecycle.finish_task(db, inventory_day, task, made_amount, made_unit)
 
     # Broadcast AFTER committing
     try:
@@ -1001,32 +815,8 @@ async def reopen_task(
     db: Session = Depends(get_db),
     current_user = Depends(require_manager_or_admin)
 ):
-    from ..models import TaskSession
-
-    inventory_day = db.query(InventoryDay).filter(InventoryDay.date == date).first()
-    if not inventory_day:
-        raise HTTPException(status_code=404, detail="Inventory day not found")
-
-    task = get_task_by_slug(db, inventory_day.id, task_slug)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if task.status != "completed":
-        raise HTTPException(status_code=400, detail="Only completed tasks can be reopened")
-
-    now = get_naive_local_time()
-
-    # Use the model's reopen method to clear completion data
-    task.reopen()
-
-    # Create a new session for the reopened task
-    new_session = TaskSession(
-        task_id=task.id,
-        started_at=now
-    )
-    db.add(new_session)
-
-    db.commit()
+    inventory_day, task = task_lifecycle.load_task(db, date, task_slug)
+    now = task_lifecycle.reopen_task(db, inventory_day, task)
 
     # Broadcast AFTER committing
     try:
@@ -1036,7 +826,6 @@ async def reopen_task(
         })
     except Exception as e:
         pass
-        pass
 
     return RedirectResponse(url=f"/inventory/day/{inventory_day.date}", status_code=302)
 
@@ -1124,6 +913,7 @@ async def finalize_inventory_day(
 
     inventory_day.finalized = True
     inventory_day.finalized_at = get_naive_local_time()
+    write_day_rollup(db, inventory_day)
     db.commit()
     
     # Broadcast day finalization
@@ -1133,6 +923,13 @@ async def finalize_inventory_day(
         })
     except Exception as e:
         pass
+
+    # Fold the day's counts into the par suggestions
+    try:
+        update_par_suggestions(db)
+    except Exception:
+        logger.exception("Failed to update par suggestions")
+        db.rollback()
     
     return RedirectResponse(url=f"/inventory/day/{inventory_day.date}", status_code=302)
 
@@ -1150,165 +947,11 @@ async def inventory_report(
     if not inventory_day.finalized:
         raise HTTPException(status_code=400, detail="Day must be finalized to view report")
 
-    inventory_day_items = db.query(InventoryDayItem).filter(InventoryDayItem.day_id == inventory_day.id).all()
-    all_tasks = db.query(Task).filter(Task.day_id == inventory_day.id).all()
-    employees = db.query(User).filter(User.is_active == True).all()
-
-    # Filter out inventory day items where inventory item was deleted
-    inventory_day_items = [item for item in inventory_day_items if item.inventory_item is not None]
-
-    # Separate started and unstarted tasks
-    started_tasks = [t for t in all_tasks if t.started_at is not None]
-    unstarted_tasks = [t for t in all_tasks if t.started_at is None]
-
-    # Calculate statistics (only include started tasks in counts)
-    total_tasks = len(started_tasks)
-    completed_tasks = len([t for t in started_tasks if t.status == "completed"])
-    below_par_items = len([item for item in inventory_day_items if item.quantity <= item.inventory_item.par_level])
-
-    # Calculate time metrics (only from started tasks)
-    total_task_time = sum(t.total_time_minutes for t in started_tasks if t.total_time_minutes)
-    total_shift_duration = None
-    off_task_time = None
-    shift_efficiency = None
-
-    if inventory_day.started_at and inventory_day.finalized_at:
-        shift_duration_seconds = (inventory_day.finalized_at - inventory_day.started_at).total_seconds()
-        total_shift_duration = shift_duration_seconds / 60  # Convert to minutes
-        off_task_time = total_shift_duration - total_task_time
-        if total_shift_duration > 0:
-            shift_efficiency = (total_task_time / total_shift_duration) * 100
-
     return templates.TemplateResponse("inventory_report.html", {
         "request": request,
         "current_user": current_user,
-        "inventory_day": inventory_day,
-        "inventory_day_items": inventory_day_items,
-        "started_tasks": started_tasks,
-        "unstarted_tasks": unstarted_tasks,
-        "employees": employees,
-        "total_tasks": total_tasks,
-        "completed_tasks": completed_tasks,
-        "below_par_items": below_par_items,
-        "total_shift_duration": total_shift_duration,
-        "off_task_time": off_task_time,
-        "shift_efficiency": shift_efficiency
+        **get_inventory_report(db, inventory_day)
     })
-def generate_tasks_for_day(db: Session, inventory_day: InventoryDay, inventory_day_items, janitorial_day_items, force_regenerate: bool = False):
-    """Generate tasks for items that are below par level"""
-
-    if force_regenerate:
-        # Force regenerate: delete ALL tasks for this day
-        db.query(Task).filter(Task.day_id == inventory_day.id).delete()
-    else:
-        # Normal operation: only delete auto-generated tasks that haven't been started AND have changed
-        pass  # We'll handle deletions on a per-task basis below
-
-    for day_item in inventory_day_items:
-        item = day_item.inventory_item
-        is_below_par = day_item.quantity < item.par_level
-
-        # Check if task already exists for this item
-        existing_task = db.query(Task).filter(
-            Task.day_id == inventory_day.id,
-            Task.inventory_item_id == item.id
-        ).first()
-
-        # CRITICAL: Never modify tasks that have been started or completed
-        if existing_task and existing_task.started_at:
-            continue
-
-        # Check if inventory values have changed since task was created
-        inventory_changed = False
-        if existing_task:
-            # If snapshot fields are None (old tasks), treat as changed to update them
-            if existing_task.snapshot_quantity is None:
-                inventory_changed = True
-            else:
-                # Compare current values with snapshot
-                inventory_changed = (
-                    existing_task.snapshot_quantity != day_item.quantity or
-                    existing_task.snapshot_par_level != item.par_level or
-                    existing_task.snapshot_override_create != day_item.override_create_task or
-                    existing_task.snapshot_override_no_task != day_item.override_no_task
-                )
-
-        # If task exists, inventory hasn't changed, and not force regenerating - skip it
-        if existing_task and not inventory_changed and not force_regenerate:
-            continue
-
-        # Create task if:
-        # 1. Item is below par and not overridden to skip
-        # 2. Item is above par but overridden to create task
-        should_create_task = (
-            (is_below_par and not day_item.override_no_task) or
-            (not is_below_par and day_item.override_create_task)
-        )
-
-        # If task exists but should no longer exist, delete it
-        if existing_task and not should_create_task:
-            db.delete(existing_task)
-            continue
-
-        # If task should exist but doesn't, or inventory changed, create/update it
-        if should_create_task:
-            # If task exists and inventory changed, delete and recreate
-            if existing_task:
-                db.delete(existing_task)
-
-            # Create task description
-            if item.batch:
-                description = f"Make {item.name} - {item.batch.recipe.name}"
-            else:
-                description = f"Restock {item.name}"
-
-            task = Task(
-                day_id=inventory_day.id,
-                inventory_item_id=item.id,
-                batch_id=item.batch_id if item.batch else None,
-                description=description,
-                auto_generated=True,
-                snapshot_quantity=day_item.quantity,
-                snapshot_par_level=item.par_level,
-                snapshot_override_create=day_item.override_create_task,
-                snapshot_override_no_task=day_item.override_no_task
-            )
-            db.add(task)
-    
-    # Generate janitorial tasks
-    for janitorial_day_item in janitorial_day_items:
-        janitorial_task = janitorial_day_item.janitorial_task
-
-        # Check if task already exists for this janitorial task
-        existing_task = db.query(Task).filter(
-            Task.day_id == inventory_day.id,
-            Task.janitorial_task_id == janitorial_task.id
-        ).first()
-
-        # CRITICAL: Never modify tasks that have been started or completed
-        if existing_task and existing_task.started_at:
-            continue
-
-        # Determine if task should be included
-        should_include = (
-            janitorial_task.task_type == 'daily' or
-            (janitorial_task.task_type == 'manual' and janitorial_day_item.include_task)
-        )
-
-        # If task exists but should no longer exist, delete it
-        if existing_task and not should_include:
-            db.delete(existing_task)
-            continue
-
-        # If task should exist but doesn't, create it
-        if should_include and not existing_task:
-            task = Task(
-                day_id=inventory_day.id,
-                janitorial_task_id=janitorial_task.id,
-                description=janitorial_task.title,
-                auto_generated=(janitorial_task.task_type == 'daily')
-            )
-            db.add(task)
 
 @router.get("/day/{date}", response_class=HTMLResponse)
 async def inventory_day_detail(date: str, request: Request, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
@@ -1316,122 +959,14 @@ async def inventory_day_detail(date: str, request: Request, db: Session = Depend
     if not inventory_day:
         raise HTTPException(status_code=404, detail="Inventory day not found")
 
-    inventory_day_items = db.query(InventoryDayItem).filter(InventoryDayItem.day_id == inventory_day.id).all()
-    janitorial_day_items = db.query(JanitorialTaskDay).filter(JanitorialTaskDay.day_id == inventory_day.id).all()
+    view = get_inventory_day_view(db, inventory_day.id)
 
-    # Query tasks with category sorting
-    # Create aliases for categories from different sources
-    inventory_category = db.query(Category).join(InventoryItem).filter(
-        InventoryItem.id == Task.inventory_item_id
-    ).correlate(Task).scalar_subquery()
-
-    janitorial_category = db.query(Category).join(JanitorialTask).filter(
-        JanitorialTask.id == Task.janitorial_task_id
-    ).correlate(Task).scalar_subquery()
-
-    # Get tasks and sort by category name (prioritizing inventory item category, then janitorial category)
-    tasks = db.query(Task)\
-        .outerjoin(InventoryItem, Task.inventory_item_id == InventoryItem.id)\
-        .outerjoin(Category, InventoryItem.category_id == Category.id)\
-        .filter(Task.day_id == inventory_day.id)\
-        .order_by(
-            case(
-                (Category.name.isnot(None), Category.name),
-                else_=''
-            ),
-            Task.id
-        )\
-        .all()
-    employees = db.query(User).filter(User.is_active == True).all()
-    batches = db.query(Batch).all()  # Add batches for manual task creation
-    categories = db.query(Category).filter(Category.type.in_(["batch", "inventory"])).all()
-    
-    # Calculate task summaries for completed tasks
-    task_summaries = {}
-    for task in tasks:
-        if task.status == "completed" and task.inventory_item:
-            summary = calculate_task_summary(task, db)
-            if summary:
-                task_summaries[task.id] = summary
-    
     return templates.TemplateResponse("inventory_day.html", {
         "request": request,
         "current_user": current_user,
-        "inventory_day": inventory_day,
-        "inventory_day_items": inventory_day_items,
-        "janitorial_day_items": janitorial_day_items,
-        "tasks": tasks,
-        "employees": employees,
-        "batches": batches,
-        "categories": categories,
-        "task_summaries": task_summaries
+        **view
     })
 
-def calculate_task_summary(task, db):
-    """Calculate task summary information"""
-    if not task.inventory_item:
-        return None
-    
-    # Get the inventory day item for initial inventory
-    day_item = db.query(InventoryDayItem).filter(
-        InventoryDayItem.day_id == task.day_id,
-        InventoryDayItem.inventory_item_id == task.inventory_item.id
-    ).first()
-    
-    if not day_item:
-        return None
-    
-    item = task.inventory_item
-    
-    # Basic information
-    summary = {
-        'par_level': item.par_level,
-        'par_unit_name': item.par_unit_name.name if item.par_unit_name else 'units',
-        'par_unit_equals_type': item.par_unit_equals_type,
-        'par_unit_equals': item.par_unit_equals_calculated,
-        'par_unit_equals_unit': item.par_unit_equals_unit,
-        'initial_inventory': day_item.quantity,
-        'made_amount': task.made_amount,
-        'made_unit': task.made_unit,
-        'made_par_units': 0,
-        'made_amount_par_units': 0,
-        'final_inventory': day_item.quantity,
-        'initial_converted': None,
-        'made_converted': None,
-        'final_converted': None,
-        'made_quantity_equivalent': None,
-        'made_quantity_unit': None
-    }
-    
-    # Calculate made amount in par units and quantity equivalents
-    if task.made_amount and task.made_unit:
-        # For par unit tasks, the made_amount is already in par units
-        if item.par_unit_name and task.made_unit == item.par_unit_name.name:
-            summary['made_par_units'] = task.made_amount
-            summary['made_amount_par_units'] = task.made_amount
-            
-            # Calculate quantity equivalent if custom par unit equals
-            if item.par_unit_equals_type == 'custom' and item.par_unit_equals_amount and item.par_unit_equals_unit:
-                quantity_equivalent = task.made_amount * item.par_unit_equals_amount
-                summary['made_quantity_equivalent'] = quantity_equivalent
-                summary['made_quantity_unit'] = item.par_unit_equals_unit
-        else:
-            # Regular unit conversion
-            made_par_units = item.convert_to_par_units(task.made_amount, task.made_unit)
-            summary['made_par_units'] = made_par_units
-            summary['made_amount_par_units'] = made_par_units
-        
-        summary['final_inventory'] = day_item.quantity + summary['made_amount_par_units']
-    
-    # Calculate conversions if custom par unit equals
-    if item.par_unit_equals_type == 'custom' and item.par_unit_equals_calculated:
-        summary['initial_converted'] = day_item.quantity * item.par_unit_equals_calculated
-        if summary['made_amount_par_units']:
-            summary['made_converted'] = summary['made_amount_par_units'] * item.par_unit_equals_calculated
-        summary['final_converted'] = summary['final_inventory'] * item.par_unit_equals_calculated
-    
-    return summary
-
 @router.get("/items/{item_slug}/edit", response_class=HTMLResponse)
 async def inventory_item_edit_page(item_slug: str, request: Request, db: Session = Depends(get_db), current_user = Depends(require_admin)):
     item = db.query(InventoryItem).filter(InventoryItem.slug == item_slug).first()
@@ -1496,20 +1031,3 @@ async def delete_inventory_item(item_slug: str, db: Session = Depends(get_db), c
     db.commit()
 
     return RedirectResponse(url="/inventory", status_code=302)
-
-@router.get("/all_completed_days")
-async def get_all_completed_days(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    finalized_days = db.query(InventoryDay).filter(
-        InventoryDay.finalized == True
-    ).order_by(InventoryDay.date.desc()).all()
-
-    return {
-        "days": [
-            {
-                "id": day.id,
-                "date": day.date.strftime('%Y-%m-%d'),
-                "day_name": day.date.strftime('%A')
-            }
-            for day in finalized_days
-        ]
-    }
\ No newline at end of file
@@ -8,6 +8,8 @@ from ..dependencies import require_manager_or_admin, get_current_user, require_a
 from ..models import Recipe, Category, RecipeIngredient, RecipeBatchPortion
 from ..utils.template_helpers import setup_template_filters
 from ..utils.slugify import generate_unique_slug
+from ..utils.costing import get_cost_graph
+from ..utils.cost_table import get_entity_costs, refresh_entity_costs
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
 templates = setup_template_filters(Jinja2Templates(directory="templates"))
@@ -25,6 +27,7 @@ async def recipes_page(request: Request, show_deleted: bool = False, db: Session
         "request": request,
         "current_user": current_user,
         "recipes": recipes,
+        "costs": get_entity_costs(db, "recipe"),
         "categories": categories,
         "show_deleted": show_deleted
     })
@@ -85,6 +88,7 @@ async def create_recipe(
         raise HTTPException(status_code=400, detail="Invalid batch portions data")
 
     db.commit()
+    refresh_entity_costs(db)
 
     return RedirectResponse(url=f"/recipes/{slug}", status_code=302)
 
@@ -97,9 +101,7 @@ async def recipe_detail(slug: str, request: Request, db: Session = Depends(get_d
     recipe_ingredients = db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id == recipe.id).all()
     recipe_batch_portions = db.query(RecipeBatchPortion).filter(RecipeBatchPortion.recipe_id == recipe.id).all()
 
-    ingredients_cost = sum(ri.cost for ri in recipe_ingredients)
-    batch_portions_cost = sum(rbp.get_total_cost(db) for rbp in recipe_batch_portions)
-    total_cost = ingredients_cost + batch_portions_cost
+    total_cost = get_cost_graph(db).recipe_cost(recipe.id)
 
     return templates.TemplateResponse("recipe_detail.html", {
         "request": request,
@@ -147,6 +149,17 @@ async def update_recipe(
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
+    # Reject batch portions that would make this recipe depend on itself
+    try:
+        proposed_batch_ids = [int(batch_data['batch_id']) for batch_data in json.loads(batch_portions_data)]
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid batch portions data")
+
+    graph = get_cost_graph(db)
+    cycle = graph.find_recipe_cycle(recipe.id, proposed_batch_ids)
+    if cycle:
+        raise HTTPException(status_code=400, detail=f"Batch portions would create a recipe cycle: {graph.describe_cycle(cycle)}")
+
     if recipe.name != name:
         recipe.slug = generate_unique_slug(db, Recipe, name, exclude_id=recipe.id)
 
@@ -193,6 +206,7 @@ async def update_recipe(
         raise HTTPException(status_code=400, detail="Invalid batch portions data")
 
     db.commit()
+    refresh_entity_costs(db)
 
     return RedirectResponse(url=f"/recipes/{recipe.slug}", status_code=302)
 
@@ -204,6 +218,7 @@ async def delete_recipe(slug: str, db: Session = Depends(get_db), current_user =
 
     recipe.deleted = True
     db.commit()
+    refresh_entity_costs(db)
 
     return RedirectResponse(url="/recipes", status_code=302)
 
@@ -215,5 +230,6 @@ async def restore_recipe(slug: str, db: Session = Depends(get_db), current_user
 
     recipe.deleted = False
     db.commit()
+    refresh_entity_costs(db)
 
     return RedirectResponse(url="/recipes?show_deleted=true", status_code=302)
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Persisted cost table
+
+List pages and reports need the cost of every recipe, batch and dish. Those
+costs are kept in the entity_costs table so a page can read them with one
+indexed lookup instead of walking the cost graph per row. Write paths call
+refresh_entity_costs() after committing, which rewrites only the rows that
+depend on what changed (found via the cost graph's reverse dependency
+indexes). Rows missing after an upgrade are filled once at startup
+(fill_missing_entity_costs), so reads never write.
+"""
+import logging
+from sqlalchemy.orm import Session
+from ..models import EntityCost
+from .costing import get_cost_graph
+
+logger = logging.getLogger(__name__)
+
+def _cost_values(graph, entity_type, entity_id):
+    """Column values for one entity_costs row"""
+    if entity_type == "recipe":
+        return {"recipe_cost": graph.recipe_cost(entity_id), "cost_per_unit": None, "expected_cost": None}
+    if entity_type == "batch":
+        return {
+            "recipe_cost": graph.batch_recipe_cost(entity_id),
+            "cost_per_unit": graph.batch_cost_per_unit(entity_id),
+            "expected_cost": None
+        }
+    dish_recipe_cost = sum(graph.portion_recipe_cost(dbp) for dbp in graph.dish_batch_portions.get(entity_id, ()))
+    return {"recipe_cost": dish_recipe_cost, "cost_per_unit": None, "expected_cost": graph.dish_expected_cost(entity_id)}
+
+
+def _exists(graph, entity_type, entity_id):
+    if entity_type == "recipe":
+        return entity_id in graph.recipes
+    if entity_type == "batch":
+        return entity_id in graph.batches
+    return entity_id in graph.dishes
+
+
+def _write_rows(db: Session, graph, entity_ids_by_type):
+    """Upsert (or delete, for removed entities) the given entity_costs rows"""
+    written = 0
+    for entity_type, entity_ids in entity_ids_by_type.items():
+        if not entity_ids:
+            continue
+
+        existing = {
+            row.entity_id: row
+            for row in db.query(EntityCost).filter(
+                EntityCost.entity_type == entity_type,
+                EntityCost.entity_id.in_(entity_ids)
+            ).all()
+        }
+
+        for entity_id in entity_ids:
+            row = existing.get(entity_id)
+            if not _exists(graph, entity_type, entity_id):
+                if row:
+                    db.delete(row)
+                continue
+
+            values = _cost_values(graph, entity_type, entity_id)
+            if row is None:
+                row = EntityCost(entity_type=entity_type, entity_id=entity_id)
+                db.add(row)
+            for key, value in values.items():
+                setattr(row, key, value)
+            written += 1
+
+    db.commit()
+    return written
+
+
+def refresh_entity_costs(db: Session):
+    """Persist costs for everything re-costed since the last refresh
+
+    Call after committing a change to ingredients, recipes, batches or dishes.
+    Syncing the cost graph reloads the changed rows and records every recipe,
+    batch and dish downstream of them; only those rows are rewritten.
+    """
+    graph = get_cost_graph(db)
+    recipes, batches, dishes, everything = graph.pop_changed()
+    try:
+        if everything:
+            written = rebuild_entity_costs(db)
+        else:
+            written = _write_rows(db, graph, {"recipe": recipes, "batch": batches, "dish": dishes})
+        logger.debug(f"Refreshed {written} entity cost rows")
+    except Exception as e:
+        db.rollback()
+        # Keep the ids pending so the next refresh rewrites these rows instead of leaving them stale
+        graph.restore_changed(recipes, batches, dishes, everything)
+        logger.error(f"Failed to refresh entity costs: {e}")
+
+
+def rebuild_entity_costs(db: Session):
+    """Recompute the whole cost table"""
+    graph = get_cost_graph(db)
+    db.query(EntityCost).delete(synchronize_session=False)
+    return _write_rows(db, graph, {
+        "recipe": set(graph.recipes),
+        "batch": set(graph.batches),
+        "dish": set(graph.dishes)
+    })
+
+
+def fill_missing_entity_costs(db: Session):
+    """Write rows for recipes, batches and dishes that have none yet (the first start after an upgrade)"""
+    graph = get_cost_graph(db)
+    present = {}
+    for entity_type, entity_id in db.query(EntityCost.entity_type, EntityCost.entity_id):
+        present.setdefault(entity_type, set()).add(entity_id)
+    missing = {
+        "recipe": set(graph.recipes) - present.get("recipe", set()),
+        "batch": set(graph.batches) - present.get("batch", set()),
+        "dish": set(graph.dishes) - present.get("dish", set())
+    }
+    written = _write_rows(db, graph, missing)
+    if written:
+        logger.info(f"Filled {written} missing entity cost rows")
+    return written
+
+
+def get_entity_costs(db: Session, entity_type: str):
+    """Map entity_id -> EntityCost row for one entity type"""
+    return {
+        row.entity_id: row
+        for row in db.query(EntityCost).filter(EntityCost.entity_type == entity_type).all()
+    }
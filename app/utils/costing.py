@@ -0,0 +1,690 @@
+"""
+Recipe cost graph
+
+Costing a recipe that uses batch portions means costing the batch's recipe,
+which may itself use batch portions, and so on. Doing that with per-level
+queries fans out badly, so the whole recipe -> batch -> recipe graph (plus
+the dishes built on top of it) is loaded once and every node's cost is
+memoized. Recipes are costed bottom-up in topological order, so each one is
+costed exactly once and a dependency cycle can't recurse forever; saving a
+cycle is rejected up front (find_recipe_cycle / find_batch_cycle).
+
+The graph is kept in-process (the app runs a single worker) and is refreshed
+incrementally: session events record which ingredients, recipes, batches and
+dishes changed in a committed transaction, and the next caller reloads just
+those rows and drops the memoized costs that depend on them.
+"""
+import logging
+import threading
+from collections import defaultdict, deque
+from sqlalchemy import event, inspect, select, func, union_all
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+from ..models import (Ingredient, Recipe, Batch, RecipeIngredient, RecipeBatchPortion, Dish,
+                      DishBatchPortion, DishIngredientPortion, Task, InventoryItem, get_portion_ratio)
+
+logger = logging.getLogger(__name__)
+
+
+class CostGraph:
+    """In-memory recipe/batch/dish dependency graph with memoized costs"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+
+        # Detached row snapshots
+        self.ingredients = {}                               # ingredient_id -> Ingredient
+        self.recipes = {}                                   # recipe_id -> Recipe
+        self.batches = {}                                   # batch_id -> Batch
+        self.dishes = {}                                    # dish_id -> Dish
+        self.recipe_ingredients = defaultdict(list)         # recipe_id -> [RecipeIngredient]
+        self.recipe_portions = defaultdict(list)            # recipe_id -> [RecipeBatchPortion]
+        self.dish_batch_portions = defaultdict(list)        # dish_id -> [DishBatchPortion]
+        self.dish_ingredient_portions = defaultdict(list)   # dish_id -> [DishIngredientPortion]
+
+        # Reverse dependency indexes
+        self.recipes_by_ingredient = defaultdict(set)  # ingredient_id -> {recipe_id}
+        self.recipes_by_batch = defaultdict(set)       # batch_id -> {recipe_id using it}
+        self.batches_by_recipe = defaultdict(set)      # recipe_id -> {batch_id made from it}
+        self.dishes_by_ingredient = defaultdict(set)   # ingredient_id -> {dish_id}
+        self.dishes_by_batch = defaultdict(set)        # batch_id -> {dish_id}
+
+        self._recipe_costs = {}
+        self._dish_costs = {}
+        self._unit_costs = {}  # (ingredient_id, unit) -> (ingredient.updated_at, cost per unit)
+
+        # Pending invalidations, applied on the next sync()
+        self._stale_ingredients = set()
+        self._stale_recipes = set()
+        self._stale_batches = set()
+        self._stale_dishes = set()
+        self._stale_all = False
+
+        # Nodes whose cost changed since the last pop_changed() (for the persisted cost table)
+        self._changed_recipes = set()
+        self._changed_batches = set()
+        self._changed_dishes = set()
+        self._changed_all = False
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def sync(self, db: Session):
+        """Make sure the graph reflects all committed changes"""
+        with self._lock:
+            if not self._loaded or self._stale_all:
+                self._load_all(db)
+            elif self._stale_ingredients or self._stale_recipes or self._stale_batches or self._stale_dishes:
+                self._load_stale(db)
+
+    def _load_all(self, db: Session):
+        with Session(bind=db.get_bind()) as loader:
+            ingredients = loader.query(Ingredient).all()
+            recipes = loader.query(Recipe).all()
+            batches = loader.query(Batch).all()
+            dishes = loader.query(Dish).all()
+            recipe_ingredients = loader.query(RecipeIngredient).all()
+            recipe_portions = loader.query(RecipeBatchPortion).all()
+            dish_batch_portions = loader.query(DishBatchPortion).all()
+            dish_ingredient_portions = loader.query(DishIngredientPortion).all()
+
+        self.ingredients = {i.id: i for i in ingredients}
+        self.recipes = {r.id: r for r in recipes}
+        self.dishes = {d.id: d for d in dishes}
+        self.batches = {}
+        self.batches_by_recipe = defaultdict(set)
+        for batch in batches:
+            self._set_batch(batch)
+
+        self.recipe_ingredients = defaultdict(list)
+        self.recipe_portions = defaultdict(list)
+        self.recipes_by_ingredient = defaultdict(set)
+        self.recipes_by_batch = defaultdict(set)
+        self._add_recipe_edges(recipe_ingredients, recipe_portions)
+
+        self.dish_batch_portions = defaultdict(list)
+        self.dish_ingredient_portions = defaultdict(list)
+        self.dishes_by_ingredient = defaultdict(set)
+        self.dishes_by_batch = defaultdict(set)
+        self._add_dish_edges(dish_batch_portions, dish_ingredient_portions)
+
+        self._recipe_costs = {}
+        self._dish_costs = {}
+        self._stale_ingredients.clear()
+        self._stale_recipes.clear()
+        self._stale_batches.clear()
+        self._stale_dishes.clear()
+        self._stale_all = False
+        if self._loaded:
+            self._changed_all = True
+        self._loaded = True
+
+    def _load_stale(self, db: Session):
+        ingredient_ids = set(self._stale_ingredients)
+        recipe_ids = set(self._stale_recipes)
+        batch_ids = set(self._stale_batches)
+        dish_ids = set(self._stale_dishes)
+        self._stale_ingredients.clear()
+        self._stale_recipes.clear()
+        self._stale_batches.clear()
+        self._stale_dishes.clear()
+
+        # Everything that depended on the changed rows before the reload
+        recipes_before, batches_before, dishes_before = self.downstream(ingredient_ids, recipe_ids, batch_ids, dish_ids)
+
+        with Session(bind=db.get_bind()) as loader:
+            ingredients = loader.query(Ingredient).filter(Ingredient.id.in_(ingredient_ids)).all() if ingredient_ids else []
+            recipes = loader.query(Recipe).filter(Recipe.id.in_(recipe_ids)).all() if recipe_ids else []
+            batches = loader.query(Batch).filter(Batch.id.in_(batch_ids)).all() if batch_ids else []
+            dishes = loader.query(Dish).filter(Dish.id.in_(dish_ids)).all() if dish_ids else []
+            recipe_ingredients = loader.query(RecipeIngredient).filter(
+                RecipeIngredient.recipe_id.in_(recipe_ids)
+            ).all() if recipe_ids else []
+            recipe_portions = loader.query(RecipeBatchPortion).filter(
+                RecipeBatchPortion.recipe_id.in_(recipe_ids)
+            ).all() if recipe_ids else []
+            dish_batch_portions = loader.query(DishBatchPortion).filter(
+                DishBatchPortion.dish_id.in_(dish_ids)
+            ).all() if dish_ids else []
+            dish_ingredient_portions = loader.query(DishIngredientPortion).filter(
+                DishIngredientPortion.dish_id.in_(dish_ids)
+            ).all() if dish_ids else []
+
+        for ingredient_id in ingredient_ids:
+            self.ingredients.pop(ingredient_id, None)
+        for ingredient in ingredients:
+            self.ingredients[ingredient.id] = ingredient
+
+        for batch_id in batch_ids:
+            old_batch = self.batches.pop(batch_id, None)
+            if old_batch is not None:
+                self.batches_by_recipe[old_batch.recipe_id].discard(batch_id)
+        for batch in batches:
+            self._set_batch(batch)
+
+        for recipe_id in recipe_ids:
+            self.recipes.pop(recipe_id, None)
+            for ri in self.recipe_ingredients.pop(recipe_id, []):
+                self.recipes_by_ingredient[ri.ingredient_id].discard(recipe_id)
+            for rbp in self.recipe_portions.pop(recipe_id, []):
+                self.recipes_by_batch[rbp.batch_id].discard(recipe_id)
+        for recipe in recipes:
+            self.recipes[recipe.id] = recipe
+        self._add_recipe_edges(recipe_ingredients, recipe_portions)
+
+        for dish_id in dish_ids:
+            self.dishes.pop(dish_id, None)
+            for dbp in self.dish_batch_portions.pop(dish_id, []):
+                self.dishes_by_batch[dbp.batch_id].discard(dish_id)
+            for dip in self.dish_ingredient_portions.pop(dish_id, []):
+                self.dishes_by_ingredient[dip.ingredient_id].discard(dish_id)
+        for dish in dishes:
+            self.dishes[dish.id] = dish
+        self._add_dish_edges(dish_batch_portions, dish_ingredient_portions)
+
+        # ...and everything that depends on them now
+        recipes_after, batches_after, dishes_after = self.downstream(ingredient_ids, recipe_ids, batch_ids, dish_ids)
+        for recipe_id in recipes_before | recipes_after:
+            self._recipe_costs.pop(recipe_id, None)
+        for dish_id in dishes_before | dishes_after:
+            self._dish_costs.pop(dish_id, None)
+
+        self._changed_recipes |= recipes_before | recipes_after
+        self._changed_batches |= batches_before | batches_after
+        self._changed_dishes |= dishes_before | dishes_after
+
+    def _add_recipe_edges(self, recipe_ingredients, recipe_portions):
+        for ri in recipe_ingredients:
+            self.recipe_ingredients[ri.recipe_id].append(ri)
+            self.recipes_by_ingredient[ri.ingredient_id].add(ri.recipe_id)
+        for rbp in recipe_portions:
+            self.recipe_portions[rbp.recipe_id].append(rbp)
+            self.recipes_by_batch[rbp.batch_id].add(rbp.recipe_id)
+
+    def _add_dish_edges(self, dish_batch_portions, dish_ingredient_portions):
+        for dbp in dish_batch_portions:
+            self.dish_batch_portions[dbp.dish_id].append(dbp)
+            self.dishes_by_batch[dbp.batch_id].add(dbp.dish_id)
+        for dip in dish_ingredient_portions:
+            self.dish_ingredient_portions[dip.dish_id].append(dip)
+            self.dishes_by_ingredient[dip.ingredient_id].add(dip.dish_id)
+
+    def _set_batch(self, batch):
+        self.batches[batch.id] = batch
+        self.batches_by_recipe[batch.recipe_id].add(batch.id)
+
+    def downstream(self, ingredient_ids=(), recipe_ids=(), batch_ids=(), dish_ids=()):
+        """Recipes, batches and dishes whose cost depends on any of the given nodes"""
+        start = set(recipe_ids)
+        for ingredient_id in ingredient_ids:
+            start |= self.recipes_by_ingredient.get(ingredient_id, set())
+        for batch_id in batch_ids:
+            start |= self.recipes_by_batch.get(batch_id, set())
+
+        # Walk up: recipe -> batches made from it -> recipes using those batches
+        recipes = set()
+        batches = set(batch_ids)
+        pending = list(start)
+        while pending:
+            recipe_id = pending.pop()
+            if recipe_id in recipes:
+                continue
+            recipes.add(recipe_id)
+            for batch_id in self.batches_by_recipe.get(recipe_id, ()):
+                batches.add(batch_id)
+                pending.extend(self.recipes_by_batch.get(batch_id, ()))
+
+        dishes = set(dish_ids)
+        for ingredient_id in ingredient_ids:
+            dishes |= self.dishes_by_ingredient.get(ingredient_id, set())
+        for batch_id in batches:
+            dishes |= self.dishes_by_batch.get(batch_id, set())
+
+        return recipes, batches, dishes
+
+    def with_ingredients(self, ingredients):
+        """Detached copy of the graph with some ingredients replaced, for costing other prices
+
+        `ingredients` maps ingredient_id -> Ingredient (typically transient
+        copies carrying historical or hypothetical pricing). The copy shares
+        nothing mutable with this graph; memoized costs that don't depend on
+        the replaced ingredients are carried over, so only the affected part
+        of the graph is re-costed.
+        """
+        with self._lock:
+            graph = CostGraph()
+            graph._loaded = True
+            graph.ingredients = {**self.ingredients, **ingredients}
+
+            affected_recipes, _, affected_dishes = self.downstream(ingredient_ids=ingredients)
+            graph._recipe_costs = {
+                recipe_id: cost for recipe_id, cost in self._recipe_costs.items() if recipe_id not in affected_recipes
+            }
+            graph._dish_costs = {
+                dish_id: cost for dish_id, cost in self._dish_costs.items() if dish_id not in affected_dishes
+            }
+            graph._unit_costs = {
+                key: cached for key, cached in self._unit_costs.items() if key[0] not in ingredients
+            }
+            graph.recipes = dict(self.recipes)
+            graph.batches = dict(self.batches)
+            graph.dishes = dict(self.dishes)
+            for name in ("recipe_ingredients", "recipe_portions", "dish_batch_portions", "dish_ingredient_portions",
+                         "recipes_by_ingredient", "recipes_by_batch", "batches_by_recipe",
+                         "dishes_by_ingredient", "dishes_by_batch"):
+                edges = getattr(self, name)
+                copy = defaultdict(edges.default_factory)
+                copy.update((key, edges.default_factory(values)) for key, values in edges.items())
+                setattr(graph, name, copy)
+            return graph
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self, ingredient_ids=(), recipe_ids=(), batch_ids=(), dish_ids=(), everything=False):
+        """Mark nodes as changed; they are reloaded on the next sync()"""
+        with self._lock:
+            self._stale_ingredients.update(ingredient_ids)
+            self._stale_recipes.update(recipe_ids)
+            self._stale_batches.update(batch_ids)
+            self._stale_dishes.update(dish_ids)
+            if everything:
+                self._stale_all = True
+
+    def pop_changed(self):
+        """Return and clear (recipe_ids, batch_ids, dish_ids, everything) re-costed since the last call"""
+        with self._lock:
+            changed = (self._changed_recipes, self._changed_batches, self._changed_dishes, self._changed_all)
+            self._changed_recipes = set()
+            self._changed_batches = set()
+            self._changed_dishes = set()
+            self._changed_all = False
+            return changed
+
+    def restore_changed(self, recipe_ids=(), batch_ids=(), dish_ids=(), everything=False):
+        """Put back ids returned by pop_changed() that could not be persisted"""
+        with self._lock:
+            self._changed_recipes.update(recipe_ids)
+            self._changed_batches.update(batch_ids)
+            self._changed_dishes.update(dish_ids)
+            if everything:
+                self._changed_all = True
+
+    # ------------------------------------------------------------------
+    # Costing
+    # ------------------------------------------------------------------
+
+    def recipe_dependencies(self, recipe_id):
+        """Recipes whose batches this recipe uses as portions"""
+        dependencies = set()
+        for rbp in self.recipe_portions.get(recipe_id, ()):
+            batch = self.batches.get(rbp.batch_id)
+            if batch is not None:
+                dependencies.add(batch.recipe_id)
+        return dependencies
+
+    def topological_order(self, recipe_ids=None):
+        """Order recipes so every recipe comes after the recipes it depends on
+
+        Covers recipe_ids (all recipes if None) plus everything they depend
+        on that isn't costed yet. Returns (order, cyclic) where cyclic holds
+        recipes that sit on, or depend on, a dependency cycle.
+        """
+        if recipe_ids is None:
+            recipe_ids = list(self.recipes)
+
+        # Collect the uncosted part of the graph below recipe_ids
+        dependencies = {}
+        pending = [recipe_id for recipe_id in recipe_ids if recipe_id not in self._recipe_costs]
+        while pending:
+            recipe_id = pending.pop()
+            if recipe_id in dependencies:
+                continue
+            dependencies[recipe_id] = {
+                dependency for dependency in self.recipe_dependencies(recipe_id)
+                if dependency not in self._recipe_costs
+            }
+            pending.extend(dependencies[recipe_id])
+
+        # Kahn's algorithm: repeatedly take recipes with no unresolved dependencies
+        dependents = defaultdict(set)
+        for recipe_id, recipe_dependencies in dependencies.items():
+            for dependency in recipe_dependencies:
+                dependents[dependency].add(recipe_id)
+        unresolved = {recipe_id: len(deps) for recipe_id, deps in dependencies.items()}
+        ready = [recipe_id for recipe_id, count in unresolved.items() if count == 0]
+
+        order = []
+        while ready:
+            recipe_id = ready.pop()
+            order.append(recipe_id)
+            for dependent in dependents.get(recipe_id, ()):
+                unresolved[dependent] -= 1
+                if unresolved[dependent] == 0:
+                    ready.append(dependent)
+
+        cyclic = set(dependencies) - set(order)
+        return order, cyclic
+
+    def _compute_recipe_cost(self, recipe_id):
+        """Cost one recipe from already-costed dependencies (missing ones count as 0)"""
+        ingredients_cost = 0
+        for ri in self.recipe_ingredients.get(recipe_id, ()):
+            ingredients_cost += self.ingredient_cost(ri.ingredient_id, ri.unit, ri.quantity)
+
+        batch_portions_cost = 0
+        for rbp in self.recipe_portions.get(recipe_id, ()):
+            batch = self.batches.get(rbp.batch_id)
+            if batch is None:
+                continue
+            ratio = get_portion_ratio(rbp, batch)
+            batch_portions_cost += (self._recipe_costs.get(batch.recipe_id, 0) + batch.estimated_labor_cost) * ratio
+
+        return ingredients_cost + batch_portions_cost
+
+    def cost_recipes(self, recipe_ids=None):
+        """Cost recipe_ids (all recipes if None) bottom-up, each recipe exactly once"""
+        with self._lock:
+            order, cyclic = self.topological_order(recipe_ids)
+            for recipe_id in order:
+                self._recipe_costs[recipe_id] = self._compute_recipe_cost(recipe_id)
+
+            if cyclic:
+                # Saving a cycle is rejected, but don't let stale data take costing down
+                logger.warning(f"Recipe dependency cycle detected involving recipes {sorted(cyclic)}")
+                for recipe_id in cyclic:
+                    self._recipe_costs[recipe_id] = self._compute_recipe_cost(recipe_id)
+
+    def recipe_cost(self, recipe_id):
+        """Total cost of a recipe: ingredients plus batch portions (recipe + estimated labor)"""
+        with self._lock:
+            if recipe_id not in self._recipe_costs:
+                self.cost_recipes([recipe_id])
+            return self._recipe_costs.get(recipe_id, 0)
+
+    def _dependency_path(self, start_recipe_id, is_target):
+        """Shortest chain of recipe ids from start_recipe_id to a recipe matching is_target"""
+        parents = {start_recipe_id: None}
+        queue = deque([start_recipe_id])
+        while queue:
+            recipe_id = queue.popleft()
+            if is_target(recipe_id):
+                path = []
+                while recipe_id is not None:
+                    path.append(recipe_id)
+                    recipe_id = parents[recipe_id]
+                return path[::-1]
+            for dependency in self.recipe_dependencies(recipe_id):
+                if dependency not in parents:
+                    parents[dependency] = recipe_id
+                    queue.append(dependency)
+        return None
+
+    def find_recipe_cycle(self, recipe_id, batch_ids):
+        """Recipe ids forming a cycle if recipe_id used portions of batch_ids, else None"""
+        with self._lock:
+            for batch_id in batch_ids:
+                batch = self.batches.get(batch_id)
+                if batch is None:
+                    continue
+                path = self._dependency_path(batch.recipe_id, lambda node: node == recipe_id)
+                if path:
+                    return [recipe_id] + path
+            return None
+
+    def describe_cycle(self, cycle):
+        """Human-readable "A → B → A" for a cycle from find_*_cycle"""
+        return " → ".join(
+            self.recipes[recipe_id].name if recipe_id in self.recipes else f"Recipe #{recipe_id}"
+            for recipe_id in cycle
+        )
+
+    def find_batch_cycle(self, batch_id, recipe_id):
+        """Recipe ids forming a cycle if batch_id were made from recipe_id, else None"""
+        with self._lock:
+            path = self._dependency_path(recipe_id, lambda node: node in self.recipes_by_batch.get(batch_id, ()))
+            if path:
+                return path + [recipe_id]
+            return None
+
+    def ingredient_cost(self, ingredient_id, unit, quantity):
+        """Cost of a quantity of an ingredient in the given unit"""
+        ingredient = self.ingredients.get(ingredient_id)
+        if ingredient is None:
+            return 0
+        return self.ingredient_cost_per_unit(ingredient, unit) * quantity
+
+    def ingredient_cost_per_unit(self, ingredient, unit):
+        """Ingredient.get_cost_per_unit, memoized per (ingredient, unit) and row version"""
+        version = ingredient.updated_at
+        key = (ingredient.id, unit)
+        cached = self._unit_costs.get(key)
+        if cached is not None and version is not None and cached[0] == version:
+            return cached[1]
+
+        cost = ingredient.get_cost_per_unit(unit)
+        self._unit_costs[key] = (version, cost)
+        return cost
+
+    def batch_recipe_cost(self, batch_id):
+        """Total recipe cost for one full batch"""
+        batch = self.batches.get(batch_id)
+        if batch is None:
+            return 0
+        return self.recipe_cost(batch.recipe_id)
+
+    def batch_cost_per_unit(self, batch_id):
+        """Expected cost (recipe + estimated labor) per yield unit of a batch"""
+        batch = self.batches.get(batch_id)
+        if batch is None or not batch.yield_amount:
+            return 0
+        return (self.recipe_cost(batch.recipe_id) + batch.estimated_labor_cost) / batch.yield_amount
+
+    def dish_expected_cost(self, dish_id):
+        """Expected cost of a dish: batch portions (recipe + estimated labor) plus ingredients"""
+        with self._lock:
+            if dish_id in self._dish_costs:
+                return self._dish_costs[dish_id]
+
+            total = 0
+            for dbp in self.dish_batch_portions.get(dish_id, ()):
+                total += self.portion_recipe_cost(dbp) + self.portion_labor_cost(dbp)
+            for dip in self.dish_ingredient_portions.get(dish_id, ()):
+                total += self.ingredient_cost(dip.ingredient_id, dip.unit, dip.quantity)
+
+            self._dish_costs[dish_id] = total
+            return total
+
+    def portion_ratio(self, portion):
+        """Fraction of its batch used by a recipe or dish batch portion"""
+        batch = self.batches.get(portion.batch_id)
+        if batch is None:
+            return 0
+        return get_portion_ratio(portion, batch)
+
+    def portion_recipe_cost(self, portion):
+        """Recipe cost for a recipe or dish batch portion"""
+        batch = self.batches.get(portion.batch_id)
+        if batch is None:
+            return 0
+        return self.recipe_cost(batch.recipe_id) * get_portion_ratio(portion, batch)
+
+    def portion_labor_cost(self, portion):
+        """Estimated labor cost for a recipe or dish batch portion"""
+        batch = self.batches.get(portion.batch_id)
+        if batch is None:
+            return 0
+        return batch.estimated_labor_cost * get_portion_ratio(portion, batch)
+
+
+# Global cost graph instance
+cost_graph = CostGraph()
+
+
+def get_cost_graph(db: Session) -> CostGraph:
+    """Return the shared cost graph, brought up to date with committed changes"""
+    cost_graph.sync(db)
+    return cost_graph
+
+
+def get_latest_completed_tasks(db: Session, batch_ids):
+    """Map batch_id -> most recently finished Task for that batch, in one windowed query
+
+    Matches Batch.get_actual_labor_cost: a task counts for a batch either
+    directly or through its inventory item's linked batch.
+    """
+    batch_ids = list(batch_ids)
+    if not batch_ids:
+        return {}
+
+    direct = select(
+        Task.id.label("task_id"),
+        Task.batch_id.label("batch_id"),
+        Task.finished_at.label("finished_at")
+    ).where(Task.batch_id.in_(batch_ids), Task.finished_at.isnot(None))
+    via_item = select(
+        Task.id.label("task_id"),
+        InventoryItem.batch_id.label("batch_id"),
+        Task.finished_at.label("finished_at")
+    ).join(InventoryItem, Task.inventory_item_id == InventoryItem.id).where(
+        InventoryItem.batch_id.in_(batch_ids), Task.finished_at.isnot(None)
+    )
+    candidates = union_all(direct, via_item).subquery()
+
+    ranked = select(
+        candidates.c.task_id,
+        candidates.c.batch_id,
+        func.row_number().over(
+            partition_by=candidates.c.batch_id,
+            order_by=candidates.c.finished_at.desc()
+        ).label("rank")
+    ).subquery()
+
+    latest = db.execute(
+        select(ranked.c.batch_id, ranked.c.task_id).where(ranked.c.rank == 1)
+    ).all()
+    if not latest:
+        return {}
+
+    tasks = {
+        task.id: task
+        for task in db.query(Task).options(
+            selectinload(Task.sessions),
+            joinedload(Task.assigned_to)
+        ).filter(Task.id.in_({task_id for _, task_id in latest})).all()
+    }
+    return {batch_id: tasks[task_id] for batch_id, task_id in latest if task_id in tasks}
+
+
+# ----------------------------------------------------------------------
+# Change tracking
+# ----------------------------------------------------------------------
+
+_PENDING_KEY = "cost_graph_pending"
+
+_TRACKED_CLASSES = (Ingredient, Recipe, Batch, Dish, RecipeIngredient, RecipeBatchPortion,
+                    DishBatchPortion, DishIngredientPortion)
+
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, {
+        "ingredients": set(),
+        "recipes": set(),
+        "batches": set(),
+        "dishes": set(),
+        "everything": False
+    })
+
+
+def _attribute_values(obj, attr):
+    """Current and previous values of an attribute (covers reassigned foreign keys)"""
+    history = inspect(obj).attrs[attr].history
+    values = {getattr(obj, attr)}
+    values.update(history.deleted or ())
+    values.discard(None)
+    return values
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_cost_changes(session, flush_context):
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if not changed:
+        return
+
+    pending = None
+    for obj in changed:
+        if isinstance(obj, Ingredient):
+            pending = pending or _pending(session)
+            pending["ingredients"].add(obj.id)
+        elif isinstance(obj, Recipe):
+            pending = pending or _pending(session)
+            pending["recipes"].add(obj.id)
+        elif isinstance(obj, Batch):
+            pending = pending or _pending(session)
+            pending["batches"].add(obj.id)
+            pending["recipes"].update(_attribute_values(obj, "recipe_id"))
+        elif isinstance(obj, (RecipeIngredient, RecipeBatchPortion)):
+            pending = pending or _pending(session)
+            pending["recipes"].update(_attribute_values(obj, "recipe_id"))
+        elif isinstance(obj, Dish):
+            pending = pending or _pending(session)
+            pending["dishes"].add(obj.id)
+        elif isinstance(obj, (DishBatchPortion, DishIngredientPortion)):
+            pending = pending or _pending(session)
+            pending["dishes"].update(_attribute_values(obj, "dish_id"))
+
+
+def _bulk_filter_value(statement, column_key):
+    """Value from a bulk statement filtered on `<column_key> == <value>`"""
+    clause = statement.whereclause
+    if (isinstance(clause, BinaryExpression) and
+            getattr(clause.left, "key", None) == column_key and
+            isinstance(clause.right, BindParameter)):
+        return clause.right.effective_value
+    return None
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_cost_changes(orm_execute_state):
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update):
+        return
+
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in _TRACKED_CLASSES:
+        return
+
+    pending = _pending(orm_execute_state.session)
+    statement = orm_execute_state.statement
+    if mapper.class_ in (RecipeIngredient, RecipeBatchPortion):
+        recipe_id = _bulk_filter_value(statement, "recipe_id")
+        if recipe_id is not None:
+            pending["recipes"].add(recipe_id)
+            return
+    elif mapper.class_ in (DishBatchPortion, DishIngredientPortion):
+        dish_id = _bulk_filter_value(statement, "dish_id")
+        if dish_id is not None:
+            pending["dishes"].add(dish_id)
+            return
+
+    pending["everything"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_cost_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        cost_graph.invalidate(
+            ingredient_ids=pending["ingredients"],
+            recipe_ids=pending["recipes"],
+            batch_ids=pending["batches"],
+            dish_ids=pending["dishes"],
+            everything=pending["everything"]
+        )
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_cost_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,206 @@
+"""
+Per-day report rollups
+
+When a day is finalized its report metrics - task counts and times, shift
+duration, off-task time and efficiency, below-par count, labor cost - and
+its task counts per category are written to inventory_day_rollups and
+inventory_day_category_rollups, using the same definitions as the day's
+report (see inventory_report). Weekly and monthly trends then read only
+these rows: a year of history is one indexed range scan of ~365 rows
+instead of a walk over every task and session.
+
+A finalized day's rollup is rewritten whenever one of its tasks is edited,
+reopened or finished afterwards. Days finalized before rollups existed are
+filled in at startup by backfill_day_rollups(), which can also be run by hand:
+
+    python -m app.utils.day_rollups
+"""
+import logging
+from collections import Counter
+from datetime import date
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from ..models import Category, InventoryDay, InventoryDayCategoryRollup, InventoryDayRollup
+from .datetime_utils import get_naive_local_time
+from .inventory_report import build_inventory_report
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_DAYS = 50  # Days written per commit by the backfill job
+
+TREND_PERIODS = {
+    "week": lambda column: func.date(column, "weekday 0", "-6 days"),  # Monday the week starts on
+    "month": lambda column: func.strftime("%Y-%m-01", column)
+}
+
+
+def task_category_id(task):
+    """Category a task is reported under, with the same precedence as the report page"""
+    if task.janitorial_task:
+        return task.janitorial_task.category_id
+    if task.inventory_item:
+        if task.inventory_item.category_id:
+            return task.inventory_item.category_id
+        if task.inventory_item.batch and task.inventory_item.batch.category_id:
+            return task.inventory_item.batch.category_id
+    if task.batch and task.batch.category_id:
+        return task.batch.category_id
+    return task.category_id
+
+
+def write_day_rollup(db: Session, inventory_day: InventoryDay):
+    """Write (or rewrite) a finalized day's rollup rows; not committed"""
+    report = build_inventory_report(db, inventory_day)
+
+    db.query(InventoryDayRollup).filter(InventoryDayRollup.day_id == inventory_day.id).delete(synchronize_session=False)
+    db.query(InventoryDayCategoryRollup).filter(
+        InventoryDayCategoryRollup.day_id == inventory_day.id
+    ).delete(synchronize_session=False)
+
+    task_labor_costs = report["task_labor_costs"]
+    db.add(InventoryDayRollup(
+        day_id=inventory_day.id,
+        date=inventory_day.date,
+        total_tasks=report["total_tasks"],
+        completed_tasks=report["completed_tasks"],
+        unstarted_tasks=len(report["unstarted_tasks"]),
+        inventory_items=len(report["inventory_day_items"]),
+        below_par_items=report["below_par_items"],
+        total_task_minutes=report["total_task_time"],
+        completed_task_minutes=report["completed_task_time"],
+        shift_minutes=report["total_shift_duration"],
+        off_task_minutes=report["off_task_time"],
+        shift_efficiency=report["shift_efficiency"],
+        labor_cost=sum(task_labor_costs.values()),
+        computed_at=get_naive_local_time()
+    ))
+
+    # Same tasks as the day totals (started ones), so the category counts add up to them
+    task_counts = Counter()
+    completed_counts = Counter()
+    for task in report["started_tasks"]:
+        category_id = task_category_id(task)
+        task_counts[category_id] += 1
+        if task.status == "completed":
+            completed_counts[category_id] += 1
+
+    db.add_all([
+        InventoryDayCategoryRollup(
+            day_id=inventory_day.id,
+            date=inventory_day.date,
+            category_id=category_id,
+            task_count=count,
+            completed_count=completed_counts[category_id]
+        )
+        for category_id, count in task_counts.items()
+    ])
+
+
+def refresh_day_rollup(db: Session, inventory_day: InventoryDay):
+    """Rewrite a day's rollup after one of its tasks changed, if the day is finalized; not committed"""
+    if inventory_day.finalized:
+        write_day_rollup(db, inventory_day)
+
+
+def backfill_day_rollups(db: Session):
+    """Write the rollups of finalized days that don't have one yet; returns the number of days written"""
+    days = db.query(InventoryDay).outerjoin(
+        InventoryDayRollup, InventoryDayRollup.day_id == InventoryDay.id
+    ).filter(
+        InventoryDay.finalized == True,
+        InventoryDayRollup.id.is_(None)
+    ).order_by(InventoryDay.date).all()
+
+    for index, inventory_day in enumerate(days, start=1):
+        write_day_rollup(db, inventory_day)
+        if index % BACKFILL_BATCH_DAYS == 0:
+            db.commit()
+            logger.info("Day rollups: wrote %d of %d day(s)", index, len(days))
+    db.commit()
+
+    logger.info("Day rollups: backfilled %d day(s)", len(days))
+    return len(days)
+
+
+def get_day_trends(db: Session, period: str, start_date: date, end_date: date):
+    """Rollup totals per week or month between two dates (inclusive), oldest first"""
+    period_start = TREND_PERIODS[period](InventoryDayRollup.date).label("period_start")
+    with_shift = InventoryDayRollup.shift_minutes.isnot(None)
+
+    rows = db.query(
+        period_start,
+        func.count(InventoryDayRollup.id).label("days"),
+        func.min(InventoryDayRollup.date).label("first_day"),
+        func.max(InventoryDayRollup.date).label("last_day"),
+        func.sum(InventoryDayRollup.total_tasks).label("total_tasks"),
+        func.sum(InventoryDayRollup.completed_tasks).label("completed_tasks"),
+        func.sum(InventoryDayRollup.unstarted_tasks).label("unstarted_tasks"),
+        func.sum(InventoryDayRollup.below_par_items).label("below_par_items"),
+        func.sum(InventoryDayRollup.total_task_minutes).label("total_task_minutes"),
+        func.sum(InventoryDayRollup.completed_task_minutes).label("completed_task_minutes"),
+        func.sum(InventoryDayRollup.shift_minutes).label("shift_minutes"),
+        func.sum(InventoryDayRollup.off_task_minutes).label("off_task_minutes"),
+        func.sum(case((with_shift, InventoryDayRollup.total_task_minutes), else_=0)).label("shift_task_minutes"),
+        func.sum(InventoryDayRollup.labor_cost).label("labor_cost")
+    ).filter(
+        InventoryDayRollup.date >= start_date,
+        InventoryDayRollup.date <= end_date
+    ).group_by(period_start).order_by(period_start).all()
+
+    category_start = TREND_PERIODS[period](InventoryDayCategoryRollup.date).label("period_start")
+    category_rows = db.query(
+        category_start,
+        InventoryDayCategoryRollup.category_id,
+        Category.name,
+        func.sum(InventoryDayCategoryRollup.task_count),
+        func.sum(InventoryDayCategoryRollup.completed_count)
+    ).outerjoin(
+        Category, InventoryDayCategoryRollup.category_id == Category.id
+    ).filter(
+        InventoryDayCategoryRollup.date >= start_date,
+        InventoryDayCategoryRollup.date <= end_date
+    ).group_by(category_start, InventoryDayCategoryRollup.category_id).order_by(category_start, Category.name).all()
+
+    categories = {}
+    for row_start, category_id, category_name, task_count, completed_count in category_rows:
+        categories.setdefault(row_start, []).append({
+            "category_id": category_id,
+            "category_name": category_name or "Uncategorized",
+            "tasks": task_count,
+            "completed_tasks": completed_count
+        })
+
+    trends = []
+    for row in rows:
+        trends.append({
+            "period_start": row.period_start,
+            "days": row.days,
+            "first_day": row.first_day.isoformat(),
+            "last_day": row.last_day.isoformat(),
+            "total_tasks": row.total_tasks,
+            "completed_tasks": row.completed_tasks,
+            "unstarted_tasks": row.unstarted_tasks,
+            "completion_rate": (row.completed_tasks / row.total_tasks * 100) if row.total_tasks else None,
+            "below_par_items": row.below_par_items,
+            "below_par_items_per_day": row.below_par_items / row.days,
+            "total_task_minutes": row.total_task_minutes,
+            "completed_task_minutes": row.completed_task_minutes,
+            "shift_minutes": row.shift_minutes,
+            "off_task_minutes": row.off_task_minutes,
+            "shift_efficiency": (row.shift_task_minutes / row.shift_minutes * 100) if row.shift_minutes else None,
+            "labor_cost": round(row.labor_cost, 2),
+            "categories": categories.get(row.period_start, [])
+        })
+    return trends
+
+
+if __name__ == "__main__":
+    from ..database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        written = backfill_day_rollups(db)
+        print(f"✅ Wrote rollups for {written} finalized day(s)")
+    finally:
+        db.close()
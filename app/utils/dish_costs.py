@@ -0,0 +1,294 @@
+"""
+Dish costing views
+
+Builds dish cost figures from the cost graph, which already holds every
+DishBatchPortion and DishIngredientPortion: a whole menu is costed in one
+walk instead of per-dish property calls, and a single dish's detail page
+gets every figure precomputed (DishCostBreakdown).
+"""
+import logging
+from datetime import datetime
+from sqlalchemy.orm import Session, joinedload
+from ..models import Dish, DishBatchPortion, DishIngredientPortion, Batch, Recipe, Ingredient, IngredientPrice
+from .costing import get_cost_graph, get_latest_completed_tasks
+from .labor_stats import get_batch_labor_stats
+from .price_history import get_cost_graph_as_of
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARGET_FOOD_COST_PERCENT = 30.0
+
+MENU_REPORT_SORT_KEYS = (
+    "name", "category", "sale_price", "expected_cost", "actual_cost",
+    "expected_margin", "actual_margin", "food_cost_percent"
+)
+
+
+def _margin(sale_price, cost):
+    profit = sale_price - cost
+    margin = (profit / sale_price * 100) if sale_price > 0 else 0
+    return profit, margin
+
+
+class DishCostBreakdown:
+    """Every cost figure on the dish detail page, computed once as plain numbers
+
+    Labor is reported for several windows: "estimated" (the batch's
+    estimate), "actual" (most recent completed task), and week, month and
+    all-time averages of completed tasks.
+    """
+
+    LABOR_WINDOWS = ("estimated", "actual", "week_avg", "month_avg", "all_time_avg")
+
+    def __init__(self, dish, batch_portions, ingredient_portions):
+        self.dish = dish
+        self.sale_price = dish.sale_price or 0
+        self.batch_portions = batch_portions            # [dict] one per DishBatchPortion
+        self.ingredient_portions = ingredient_portions  # [dict] one per DishIngredientPortion
+
+        self.recipe_cost = sum(row["recipe_cost"] for row in batch_portions)
+        self.ingredient_cost = sum(row["cost"] for row in ingredient_portions)
+        self.labor_cost = {
+            window: sum(row["labor_cost"][window] for row in batch_portions)
+            for window in self.LABOR_WINDOWS
+        }
+        self.total_cost = {
+            window: self.recipe_cost + self.labor_cost[window] + self.ingredient_cost
+            for window in self.LABOR_WINDOWS
+        }
+        self.profit = {}
+        self.margin = {}
+        self.food_cost_percent = {}
+        for window, total in self.total_cost.items():
+            self.profit[window], self.margin[window] = _margin(self.sale_price, total)
+            self.food_cost_percent[window] = (total / self.sale_price * 100) if self.sale_price > 0 else 0
+
+    def template_context(self):
+        """Flat values under the names dish_detail.html uses"""
+        context = {
+            "dish_batch_portions": self.batch_portions,
+            "dish_ingredient_portions": self.ingredient_portions,
+            "ingredient_cost": self.ingredient_cost,
+            "food_cost_percent": self.food_cost_percent
+        }
+        suffixes = {
+            "estimated": ("expected", "expected_total_cost", "expected_profit", "expected_profit_margin"),
+            "actual": ("actual", "actual_total_cost", "actual_profit", "actual_profit_margin"),
+            "week_avg": ("week", "actual_total_cost_week", "actual_profit_week", "actual_profit_margin_week"),
+            "month_avg": ("month", "actual_total_cost_month", "actual_profit_month", "actual_profit_margin_month"),
+            "all_time_avg": ("all_time", "actual_total_cost_all_time", "actual_profit_all_time", "actual_profit_margin_all_time")
+        }
+        for window, (prefix, total_key, profit_key, margin_key) in suffixes.items():
+            context[f"{prefix}_recipe_cost"] = self.recipe_cost
+            context[f"{prefix}_labor_cost"] = self.labor_cost[window]
+            context[total_key] = self.total_cost[window]
+            context[profit_key] = self.profit[window]
+            context[margin_key] = self.margin[window]
+        return context
+
+
+def build_dish_cost_breakdown(db: Session, dish: Dish) -> DishCostBreakdown:
+    """Cost a single dish: recipe cost once per portion, all labor windows from one task query"""
+    graph = get_cost_graph(db)
+
+    batch_portions = db.query(DishBatchPortion).options(
+        joinedload(DishBatchPortion.batch).joinedload(Batch.recipe).joinedload(Recipe.category)
+    ).filter(DishBatchPortion.dish_id == dish.id).all()
+    ingredient_portions = db.query(DishIngredientPortion).options(
+        joinedload(DishIngredientPortion.ingredient).joinedload(Ingredient.category)
+    ).filter(DishIngredientPortion.dish_id == dish.id).all()
+
+    labor_stats = get_batch_labor_stats(db, {portion.batch_id for portion in batch_portions})
+
+    batch_rows = []
+    for portion in batch_portions:
+        batch = portion.batch
+        ratio = graph.portion_ratio(portion)
+        recipe_cost = graph.portion_recipe_cost(portion)
+        batch_labor = dict(labor_stats.get(portion.batch_id, {}))
+        batch_labor["estimated"] = batch.estimated_labor_cost if batch else 0
+        labor_cost = {
+            window: batch_labor.get(window, batch_labor["estimated"]) * ratio
+            for window in DishCostBreakdown.LABOR_WINDOWS
+        }
+
+        recipe = batch.recipe if batch else None
+        batch_rows.append({
+            "id": portion.id,
+            "batch_name": recipe.name if recipe else "",
+            "batch_category": recipe.category.name if recipe and recipe.category else None,
+            "variable_yield": batch.variable_yield if batch else False,
+            "yield_unit": batch.yield_unit if batch else None,
+            "portion_size": portion.portion_size,
+            "portion_unit": portion.portion_unit,
+            "use_recipe_portion": portion.use_recipe_portion,
+            "recipe_portion_percent": portion.recipe_portion_percent,
+            "recipe_cost": recipe_cost,
+            "labor_cost": labor_cost,
+            "cost": {window: recipe_cost + labor for window, labor in labor_cost.items()}
+        })
+
+    ingredient_rows = []
+    for portion in ingredient_portions:
+        ingredient = portion.ingredient
+        ingredient_rows.append({
+            "id": portion.id,
+            "ingredient_name": ingredient.name if ingredient else "",
+            "ingredient_category": ingredient.category.name if ingredient and ingredient.category else None,
+            "quantity": portion.quantity,
+            "unit": portion.unit,
+            "cost": graph.ingredient_cost(portion.ingredient_id, portion.unit, portion.quantity)
+        })
+
+    return DishCostBreakdown(dish, batch_rows, ingredient_rows)
+
+
+def dish_cost_rows(graph, dishes):
+    """Expected cost of each dish from a cost graph (current, as-of or simulated prices)"""
+    rows = []
+    for dish in dishes:
+        recipe_cost = sum(graph.portion_recipe_cost(dbp) for dbp in graph.dish_batch_portions.get(dish.id, ()))
+        ingredient_cost = sum(
+            graph.ingredient_cost(dip.ingredient_id, dip.unit, dip.quantity)
+            for dip in graph.dish_ingredient_portions.get(dish.id, ())
+        )
+        expected_cost = graph.dish_expected_cost(dish.id)
+        sale_price = dish.sale_price or 0
+        expected_profit, expected_margin = _margin(sale_price, expected_cost)
+        rows.append({
+            "id": dish.id,
+            "name": dish.name,
+            "slug": dish.slug,
+            "sale_price": sale_price,
+            "recipe_cost": recipe_cost,
+            "ingredient_cost": ingredient_cost,
+            "expected_cost": expected_cost,
+            "expected_profit": expected_profit,
+            "expected_margin": expected_margin,
+            "food_cost_percent": (expected_cost / sale_price * 100) if sale_price > 0 else 0
+        })
+    return rows
+
+
+def build_menu_costs_as_of(db: Session, as_of: datetime, dish_ids=None):
+    """Expected cost of every dish (or just dish_ids) with ingredients priced as of a date"""
+    graph = get_cost_graph_as_of(db, as_of)
+    dishes = [dish for dish_id, dish in sorted(graph.dishes.items()) if dish_ids is None or dish_id in dish_ids]
+    return dish_cost_rows(graph, dishes)
+
+
+def simulate_ingredient_prices(db: Session, prices, target_food_cost_percent: float = DEFAULT_TARGET_FOOD_COST_PERCENT):
+    """Per-dish cost change if ingredients were bought at hypothetical prices
+
+    `prices` maps ingredient_id -> hypothetical purchase_total_cost. Costing
+    runs on an in-memory copy of the cost graph, re-costing only what
+    depends on those ingredients; nothing is written. Returns the affected
+    dishes, largest cost increase first.
+    """
+    graph = get_cost_graph(db)
+    unknown = set(prices) - set(graph.ingredients)
+    if unknown:
+        raise ValueError(f"Unknown ingredient ids: {', '.join(str(i) for i in sorted(unknown))}")
+
+    overrides = {}
+    for ingredient_id, purchase_total_cost in prices.items():
+        ingredient = graph.ingredients[ingredient_id]
+        priced = IngredientPrice.from_ingredient(ingredient).to_ingredient(ingredient)
+        priced.purchase_total_cost = purchase_total_cost
+        overrides[ingredient_id] = priced
+
+    simulated = graph.with_ingredients(overrides)
+    _, _, dish_ids = graph.downstream(ingredient_ids=overrides)
+
+    rows = []
+    for dish_id in dish_ids:
+        dish = graph.dishes.get(dish_id)
+        if dish is None:
+            continue
+        sale_price = dish.sale_price or 0
+        current_cost = graph.dish_expected_cost(dish_id)
+        simulated_cost = simulated.dish_expected_cost(dish_id)
+        current_percent = (current_cost / sale_price * 100) if sale_price > 0 else 0
+        simulated_percent = (simulated_cost / sale_price * 100) if sale_price > 0 else 0
+        rows.append({
+            "id": dish.id,
+            "name": dish.name,
+            "slug": dish.slug,
+            "sale_price": sale_price,
+            "current_cost": current_cost,
+            "simulated_cost": simulated_cost,
+            "delta": simulated_cost - current_cost,
+            "current_food_cost_percent": current_percent,
+            "simulated_food_cost_percent": simulated_percent,
+            "over_target": simulated_percent > target_food_cost_percent,
+            "newly_over_target": simulated_percent > target_food_cost_percent >= current_percent
+        })
+
+    rows.sort(key=lambda row: row["delta"], reverse=True)
+    return rows
+
+
+def build_menu_margin_report(db: Session, sort: str = "name", order: str = "asc"):
+    """Expected/actual cost and margin for every dish, sorted by `sort`"""
+    if sort not in MENU_REPORT_SORT_KEYS:
+        raise ValueError(f"Unsupported sort key: {sort}")
+
+    graph = get_cost_graph(db)
+    dishes = db.query(Dish).options(joinedload(Dish.category)).all()
+
+    # Latest actual labor for every batch on the menu, in one windowed query
+    batch_ids = {dbp.batch_id for portions in graph.dish_batch_portions.values() for dbp in portions}
+    latest_tasks = get_latest_completed_tasks(db, batch_ids)
+
+    rows = []
+    for dish in dishes:
+        ingredient_cost = 0
+        for dip in graph.dish_ingredient_portions.get(dish.id, ()):
+            ingredient_cost += graph.ingredient_cost(dip.ingredient_id, dip.unit, dip.quantity)
+
+        recipe_cost = 0
+        expected_labor_cost = 0
+        actual_labor_cost = 0
+        for dbp in graph.dish_batch_portions.get(dish.id, ()):
+            batch = graph.batches.get(dbp.batch_id)
+            if batch is None:
+                continue
+            recipe_cost += graph.portion_recipe_cost(dbp)
+            expected_labor_cost += graph.portion_labor_cost(dbp)
+
+            task = latest_tasks.get(batch.id)
+            batch_labor_cost = task.labor_cost if task else batch.estimated_labor_cost
+            actual_labor_cost += batch_labor_cost * graph.portion_ratio(dbp)
+
+        sale_price = dish.sale_price or 0
+        expected_cost = recipe_cost + expected_labor_cost + ingredient_cost
+        actual_cost = recipe_cost + actual_labor_cost + ingredient_cost
+        expected_profit, expected_margin = _margin(sale_price, expected_cost)
+        actual_profit, actual_margin = _margin(sale_price, actual_cost)
+
+        rows.append({
+            "id": dish.id,
+            "name": dish.name,
+            "slug": dish.slug,
+            "category": dish.category.name if dish.category else None,
+            "sale_price": sale_price,
+            "recipe_cost": recipe_cost,
+            "ingredient_cost": ingredient_cost,
+            "expected_labor_cost": expected_labor_cost,
+            "actual_labor_cost": actual_labor_cost,
+            "expected_cost": expected_cost,
+            "actual_cost": actual_cost,
+            "expected_profit": expected_profit,
+            "expected_margin": expected_margin,
+            "actual_profit": actual_profit,
+            "actual_margin": actual_margin,
+            "food_cost_percent": (expected_cost / sale_price * 100) if sale_price > 0 else 0
+        })
+
+    if sort in ("name", "category"):
+        sort_value = lambda row: (row[sort] or "").lower()
+    else:
+        sort_value = lambda row: row[sort]
+    rows.sort(key=sort_value, reverse=(order == "desc"))
+
+    return rows
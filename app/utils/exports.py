@@ -0,0 +1,162 @@
+"""
+Streaming data exports
+
+Raw inventory count, task and task session history as CSV or JSON Lines,
+filtered by inventory day date. The days in the range are walked in date
+order DAYS_PER_QUERY at a time, each slice is read YIELD_PER rows at a time
+with yield_per, and rows are written out as they arrive - so an export of
+any length uses the same small amount of memory, the database never has to
+sort more than one slice, and the first bytes (the CSV header) are sent
+straight away.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import func, select
+from ..database import SessionLocal
+from ..models import InventoryDay, InventoryDayItem, InventoryItem, Task, TaskAssignment, TaskSession
+
+YIELD_PER = 1000  # Rows fetched from the database at a time
+DAYS_PER_QUERY = 31  # Inventory days exported per query
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson"
+}
+
+
+def _inventory_day_items_query():
+    return select(
+        InventoryDayItem.id,
+        InventoryDayItem.day_id,
+        InventoryDay.date,
+        InventoryDay.finalized,
+        InventoryDayItem.inventory_item_id,
+        InventoryItem.name.label("item_name"),
+        InventoryDayItem.quantity,
+        InventoryDayItem.override_create_task,
+        InventoryDayItem.override_no_task
+    ).join(InventoryDay, InventoryDayItem.day_id == InventoryDay.id)\
+     .outerjoin(InventoryItem, InventoryDayItem.inventory_item_id == InventoryItem.id)\
+     .order_by(InventoryDay.date, InventoryDayItem.id)
+
+
+def _assigned_employee_ids():
+    """A task's assigned employee IDs as the comma-separated list the column used to hold, in assignment order"""
+    assignments = select(TaskAssignment.employee_id).where(
+        TaskAssignment.task_id == Task.id
+    ).order_by(TaskAssignment.position).correlate(Task).subquery()
+    return select(func.group_concat(assignments.c.employee_id, ",")).scalar_subquery()
+
+
+def _tasks_query():
+    return select(
+        Task.id,
+        Task.day_id,
+        InventoryDay.date,
+        Task.description,
+        Task.inventory_item_id,
+        Task.batch_id,
+        Task.janitorial_task_id,
+        Task.category_id,
+        Task.assigned_to_id,
+        _assigned_employee_ids().label("assigned_employee_ids"),
+        Task.auto_generated,
+        Task.started_at,
+        Task.finished_at,
+        Task.is_paused,
+        Task.total_pause_time,
+        Task.selected_scale,
+        Task.scale_factor,
+        Task.made_amount,
+        Task.made_unit,
+        Task.duration_seconds,
+        Task.recorded_labor_cost.label("labor_cost"),
+        Task.notes,
+        Task.created_at
+    ).join(InventoryDay, Task.day_id == InventoryDay.id)\
+     .order_by(InventoryDay.date, Task.id)
+
+
+def _task_sessions_query():
+    return select(
+        TaskSession.id,
+        TaskSession.task_id,
+        Task.day_id,
+        InventoryDay.date,
+        TaskSession.started_at,
+        TaskSession.ended_at,
+        TaskSession.pause_duration,
+        TaskSession.created_at
+    ).join(Task, TaskSession.task_id == Task.id)\
+     .join(InventoryDay, Task.day_id == InventoryDay.id)\
+     .order_by(InventoryDay.date, TaskSession.id)
+
+
+EXPORTS = {
+    "inventory_day_items": _inventory_day_items_query,
+    "tasks": _tasks_query,
+    "task_sessions": _task_sessions_query
+}
+
+
+def export_day_ids(db, start_date: date = None, end_date: date = None):
+    """Ids of the inventory days in the date range (inclusive), in date order"""
+    query = select(InventoryDay.id).order_by(InventoryDay.date)
+    if start_date:
+        query = query.where(InventoryDay.date >= start_date)
+    if end_date:
+        query = query.where(InventoryDay.date <= end_date)
+    return db.execute(query).scalars().all()
+
+
+def _export_rows(db, dataset: str, day_ids):
+    """Rows of a dataset for some inventory days, DAYS_PER_QUERY days per query, in chunks of YIELD_PER"""
+    for start in range(0, len(day_ids), DAYS_PER_QUERY):
+        query = EXPORTS[dataset]().where(InventoryDay.id.in_(day_ids[start:start + DAYS_PER_QUERY]))
+        yield from db.execute(query.execution_options(yield_per=YIELD_PER)).partitions()
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    return _json_value(value)
+
+
+def stream_export(dataset: str, export_format: str, start_date: date = None, end_date: date = None):
+    """Generate an export chunk by chunk, one chunk per YIELD_PER rows (or fewer)
+
+    Uses its own session, which stays open exactly as long as the response
+    is being streamed.
+    """
+    db = SessionLocal()
+    try:
+        columns = [column.name for column in EXPORTS[dataset]().selected_columns]
+        day_ids = export_day_ids(db, start_date, end_date)
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+            for rows in _export_rows(db, dataset, day_ids):
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_csv_value(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+        else:
+            for rows in _export_rows(db, dataset, day_ids):
+                yield "".join(
+                    json.dumps({column: _json_value(value) for column, value in zip(columns, row)}) + "\n"
+                    for row in rows
+                )
+    finally:
+        db.close()
@@ -0,0 +1,307 @@
+"""
+Inventory day view model
+
+Everything the inventory day page renders - the day's inventory and
+janitorial items, its tasks with their items, batches, categories,
+assignees and sessions, plus the employee, batch and category pickers - is
+loaded in a fixed handful of queries with joined/selectin loading, and the
+result is cached per day.
+
+A cached view is dropped after any commit that touches the day (its items,
+janitorial items, employees, tasks, task sessions or task assignments -
+every change the inventory routes broadcast over SSE) and every cached view is dropped when something
+shared by all days changes (inventory items, janitorial tasks, batches,
+recipes, categories, par unit names, users). Nothing in a cached view
+depends on the current time: running task timers are computed in the
+browser from session start times.
+
+The same change tracking bumps each day's revision (day_revision), which
+other per-day caches such as the inventory report key their entries on.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from sqlalchemy import case, event
+from sqlalchemy.orm import Session, joinedload, selectinload
+from ..models import (InventoryDay, InventoryDayItem, JanitorialTaskDay, JanitorialTask, InventoryItem, Task,
+                      TaskSession, TaskAssignment, DayEmployee, Batch, Recipe, Category, ParUnitName, User)
+from .costing import _bulk_filter_value
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_DAYS = 16
+
+_views = OrderedDict()  # day_id -> view dict, least recently used first
+_views_lock = threading.Lock()
+
+_day_revisions = {}  # day_id -> number of committed changes to the day
+_shared_revision = 0  # Number of committed changes to data every day shows
+
+
+def calculate_task_summary(task, db, day_item=None):
+    """Calculate task summary information
+
+    Pass the task's InventoryDayItem if it's already loaded to skip the query.
+    """
+    if not task.inventory_item:
+        return None
+
+    # Get the inventory day item for initial inventory
+    if day_item is None:
+        day_item = db.query(InventoryDayItem).filter(
+            InventoryDayItem.day_id == task.day_id,
+            InventoryDayItem.inventory_item_id == task.inventory_item.id
+        ).first()
+
+    if not day_item:
+        return None
+
+    item = task.inventory_item
+
+    # Basic information
+    summary = {
+        'par_level': item.par_level,
+        'par_unit_name': item.par_unit_name.name if item.par_unit_name else 'units',
+        'par_unit_equals_type': item.par_unit_equals_type,
+        'par_unit_equals': item.par_unit_equals_calculated,
+        'par_unit_equals_unit': item.par_unit_equals_unit,
+        'initial_inventory': day_item.quantity,
+        'made_amount': task.made_amount,
+        'made_unit': task.made_unit,
+        'made_par_units': 0,
+        'made_amount_par_units': 0,
+        'final_inventory': day_item.quantity,
+        'initial_converted': None,
+        'made_converted': None,
+        'final_converted': None,
+        'made_quantity_equivalent': None,
+        'made_quantity_unit': None
+    }
+
+    # Calculate made amount in par units and quantity equivalents
+    if task.made_amount and task.made_unit:
+        # For par unit tasks, the made_amount is already in par units
+        if item.par_unit_name and task.made_unit == item.par_unit_name.name:
+            summary['made_par_units'] = task.made_amount
+            summary['made_amount_par_units'] = task.made_amount
+
+            # Calculate quantity equivalent if custom par unit equals
+            if item.par_unit_equals_type == 'custom' and item.par_unit_equals_amount and item.par_unit_equals_unit:
+                quantity_equivalent = task.made_amount * item.par_unit_equals_amount
+                summary['made_quantity_equivalent'] = quantity_equivalent
+                summary['made_quantity_unit'] = item.par_unit_equals_unit
+        else:
+            # Regular unit conversion
+            made_par_units = item.convert_to_par_units(task.made_amount, task.made_unit)
+            summary['made_par_units'] = made_par_units
+            summary['made_amount_par_units'] = made_par_units
+
+        summary['final_inventory'] = day_item.quantity + summary['made_amount_par_units']
+
+    # Calculate conversions if custom par unit equals
+    if item.par_unit_equals_type == 'custom' and item.par_unit_equals_calculated:
+        summary['initial_converted'] = day_item.quantity * item.par_unit_equals_calculated
+        if summary['made_amount_par_units']:
+            summary['made_converted'] = summary['made_amount_par_units'] * item.par_unit_equals_calculated
+        summary['final_converted'] = summary['final_inventory'] * item.par_unit_equals_calculated
+
+    return summary
+
+
+def _inventory_item_options(path):
+    """Loader options for an inventory item and everything the page shows about it"""
+    return (
+        path.joinedload(InventoryItem.category),
+        path.joinedload(InventoryItem.par_unit_name),
+        path.joinedload(InventoryItem.batch).joinedload(Batch.recipe),
+        path.joinedload(InventoryItem.batch).joinedload(Batch.category)
+    )
+
+
+def build_inventory_day_view(db: Session, inventory_day: InventoryDay):
+    """Load everything the inventory day page renders (nine queries, however many tasks)"""
+    inventory_day_items = db.query(InventoryDayItem).options(
+        *_inventory_item_options(joinedload(InventoryDayItem.inventory_item))
+    ).filter(InventoryDayItem.day_id == inventory_day.id).order_by(InventoryDayItem.id).all()
+
+    janitorial_day_items = db.query(JanitorialTaskDay).options(
+        joinedload(JanitorialTaskDay.janitorial_task)
+    ).filter(JanitorialTaskDay.day_id == inventory_day.id).order_by(JanitorialTaskDay.id).all()
+
+    inventory_day.day_employees  # Loaded now, as a cached view is rendered detached from its session
+
+    # Tasks sorted by their inventory item's category name, then creation order
+    tasks = db.query(Task)\
+        .outerjoin(InventoryItem, Task.inventory_item_id == InventoryItem.id)\
+        .outerjoin(Category, InventoryItem.category_id == Category.id)\
+        .options(
+            *_inventory_item_options(joinedload(Task.inventory_item)),
+            joinedload(Task.batch).joinedload(Batch.recipe),
+            joinedload(Task.batch).joinedload(Batch.category),
+            joinedload(Task.janitorial_task),
+            joinedload(Task.category),
+            joinedload(Task.assigned_to),
+            selectinload(Task.assignments),
+            selectinload(Task.sessions)
+        )\
+        .filter(Task.day_id == inventory_day.id)\
+        .order_by(
+            case(
+                (Category.name.isnot(None), Category.name),
+                else_=''
+            ),
+            Task.id
+        )\
+        .all()
+
+    employees = db.query(User).filter(User.is_active == True).all()
+    batches = db.query(Batch).options(  # For manual task creation
+        joinedload(Batch.recipe), joinedload(Batch.category)
+    ).all()
+    categories = db.query(Category).filter(Category.type.in_(["batch", "inventory"])).all()
+
+    # Task summaries for completed tasks, using the day items already loaded
+    day_items_by_item = {day_item.inventory_item_id: day_item for day_item in inventory_day_items}
+    task_summaries = {}
+    for task in tasks:
+        if task.status == "completed" and task.inventory_item:
+            summary = calculate_task_summary(task, db, day_items_by_item.get(task.inventory_item_id))
+            if summary:
+                task_summaries[task.id] = summary
+
+    return {
+        "inventory_day": inventory_day,
+        "inventory_day_items": inventory_day_items,
+        "janitorial_day_items": janitorial_day_items,
+        "tasks": tasks,
+        "employees": employees,
+        "batches": batches,
+        "categories": categories,
+        "task_summaries": task_summaries
+    }
+
+
+def get_inventory_day_view(db: Session, day_id: int):
+    """Cached view model for a day, built on first use; None if the day doesn't exist
+
+    The objects in a cached view are detached from any session and shared
+    between requests, so treat them as read-only.
+    """
+    with _views_lock:
+        view = _views.get(day_id)
+        if view is not None:
+            _views.move_to_end(day_id)
+            return view
+
+    inventory_day = db.get(InventoryDay, day_id)
+    if inventory_day is None:
+        return None
+
+    view = build_inventory_day_view(db, inventory_day)
+    with _views_lock:
+        _views[day_id] = view
+        while len(_views) > MAX_CACHED_DAYS:
+            _views.popitem(last=False)
+    return view
+
+
+def day_revision(day_id: int):
+    """Revision of everything shown for a day; changes with every commit that changes it"""
+    with _views_lock:
+        return (_shared_revision, _day_revisions.get(day_id, 0))
+
+
+def invalidate_inventory_day_views(day_ids=None):
+    """Drop the cached views of some days, or of every day, and bump their revisions"""
+    global _shared_revision
+    with _views_lock:
+        if day_ids is None:
+            _views.clear()
+            _shared_revision += 1
+        else:
+            for day_id in day_ids:
+                _views.pop(day_id, None)
+                _day_revisions[day_id] = _day_revisions.get(day_id, 0) + 1
+
+
+# ----------------------------------------------------------------------
+# Change tracking
+# ----------------------------------------------------------------------
+
+_PENDING_KEY = "inventory_day_views_pending"
+
+_DAY_CLASSES = (InventoryDay, InventoryDayItem, JanitorialTaskDay, DayEmployee, Task, TaskSession, TaskAssignment)
+_SHARED_CLASSES = (InventoryItem, JanitorialTask, Batch, Recipe, Category, ParUnitName, User)
+
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, {"days": set(), "everything": False})
+
+
+def _day_id_of(obj):
+    """Day a day-scoped object belongs to, or None if it can't be told without a query"""
+    if isinstance(obj, InventoryDay):
+        return obj.id
+    if isinstance(obj, (TaskSession, TaskAssignment)):
+        task = obj.__dict__.get("task")
+        return task.day_id if task is not None else None
+    return obj.day_id
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_day_view_changes(session, flush_context):
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if not changed:
+        return
+
+    pending = None
+    for obj in changed:
+        if isinstance(obj, _SHARED_CLASSES):
+            pending = pending or _pending(session)
+            pending["everything"] = True
+        elif isinstance(obj, _DAY_CLASSES):
+            pending = pending or _pending(session)
+            day_id = _day_id_of(obj)
+            if day_id is None:
+                pending["everything"] = True
+            else:
+                pending["days"].add(day_id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_day_view_changes(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or not issubclass(mapper.class_, _DAY_CLASSES + _SHARED_CLASSES):
+        return
+
+    pending = _pending(orm_execute_state.session)
+    if mapper.class_ is not InventoryDay and issubclass(mapper.class_, _DAY_CLASSES):
+        if orm_execute_state.is_insert:
+            parameters = orm_execute_state.parameters
+            rows = parameters if isinstance(parameters, list) else [parameters or {}]
+            day_ids = {row.get("day_id") for row in rows}
+            if day_ids and None not in day_ids:
+                pending["days"].update(day_ids)
+                return
+        else:
+            day_id = _bulk_filter_value(orm_execute_state.statement, "day_id")
+            if day_id is not None:
+                pending["days"].add(day_id)
+                return
+
+    pending["everything"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_day_view_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        invalidate_inventory_day_views(None if pending["everything"] else pending["days"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_day_view_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,253 @@
+"""
+Inventory day report
+
+The report of a day - its counts, started and unstarted tasks with their
+times and labor costs, and the shift statistics - is built in a fixed
+handful of queries, and for finalized days it is cached, since a finalized
+day's data only changes when an admin edits one of its tasks afterwards
+(edit time, edit assigned employees, reopen).
+
+Cached reports are keyed by day id and the day's revision (see
+inventory_day_view.day_revision), which changes with every commit that
+touches the day's items, tasks or sessions or anything shared that the
+report shows (item names and par levels, categories, employees), so an
+edited day's report is rebuilt on its next view and no other report is.
+Reports with a task still running are never cached, as its time keeps
+growing. The inventory report page and the emailed report share the cache.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy.orm import Session, joinedload, selectinload
+from ..models import InventoryDay, InventoryDayItem, InventoryItem, Task, Batch, User
+from .inventory_day_view import day_revision
+from .labor_costing import get_task_wages
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_REPORTS = 32
+
+_reports = OrderedDict()  # day_id -> (revision, report dict), least recently used first
+_reports_lock = threading.Lock()
+
+
+def _time_is_running(task):
+    """Whether a task's total time still depends on the current time"""
+    if task.finished_at or not task.started_at:
+        return False
+    if task.sessions:
+        return any(session.ended_at is None for session in task.sessions)
+    return not (task.is_paused and task.paused_at)
+
+
+def build_inventory_report(db: Session, inventory_day: InventoryDay):
+    """Load and compute everything the report page and report email show"""
+    inventory_day_items = db.query(InventoryDayItem).options(
+        joinedload(InventoryDayItem.inventory_item)
+    ).filter(InventoryDayItem.day_id == inventory_day.id).all()
+
+    all_tasks = db.query(Task).options(
+        joinedload(Task.inventory_item).joinedload(InventoryItem.category),
+        joinedload(Task.inventory_item).joinedload(InventoryItem.batch).joinedload(Batch.category),
+        joinedload(Task.batch).joinedload(Batch.recipe),
+        joinedload(Task.batch).joinedload(Batch.category),
+        joinedload(Task.janitorial_task),
+        joinedload(Task.category),
+        joinedload(Task.assigned_to),
+        selectinload(Task.assignments),
+        selectinload(Task.sessions)
+    ).filter(Task.day_id == inventory_day.id).all()
+    inventory_day.day_employees  # Loaded now, as a cached report is rendered detached from its session
+
+    employees = db.query(User).filter(User.is_active == True).all()
+
+    # Filter out inventory day items where inventory item was deleted
+    inventory_day_items = [item for item in inventory_day_items if item.inventory_item is not None]
+
+    # Separate started and unstarted tasks
+    started_tasks = [t for t in all_tasks if t.started_at is not None]
+    unstarted_tasks = [t for t in all_tasks if t.started_at is None]
+
+    # Time and labor cost of every task, computed once
+    task_minutes = {t.id: t.total_time_minutes for t in all_tasks}
+    wages = get_task_wages(db, [t for t in all_tasks if t.finished_at and t.recorded_labor_cost is None])
+    task_labor_costs = {
+        t.id: (t.recorded_labor_cost if t.recorded_labor_cost is not None else t.calculate_labor_cost(wages))
+        if t.finished_at else 0
+        for t in all_tasks
+    }
+
+    # Calculate statistics (only include started tasks in counts)
+    total_tasks = len(started_tasks)
+    completed_tasks = len([t for t in started_tasks if t.status == "completed"])
+    below_par_items = len([item for item in inventory_day_items if item.quantity <= item.inventory_item.par_level])
+
+    # Calculate time metrics (only from started tasks)
+    total_task_time = sum(task_minutes[t.id] for t in started_tasks)
+    completed_task_time = sum(task_minutes[t.id] for t in started_tasks if t.finished_at)
+    total_shift_duration = None
+    off_task_time = None
+    shift_efficiency = None
+
+    if inventory_day.started_at and inventory_day.finalized_at:
+        shift_duration_seconds = (inventory_day.finalized_at - inventory_day.started_at).total_seconds()
+        total_shift_duration = shift_duration_seconds / 60  # Convert to minutes
+        off_task_time = total_shift_duration - total_task_time
+        if total_shift_duration > 0:
+            shift_efficiency = (total_task_time / total_shift_duration) * 100
+
+    return {
+        "inventory_day": inventory_day,
+        "inventory_day_items": inventory_day_items,
+        "all_tasks": all_tasks,
+        "started_tasks": started_tasks,
+        "unstarted_tasks": unstarted_tasks,
+        "employees": employees,
+        "task_minutes": task_minutes,
+        "task_labor_costs": task_labor_costs,
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks,
+        "below_par_items": below_par_items,
+        "total_task_time": total_task_time,
+        "completed_task_time": completed_task_time,
+        "total_shift_duration": total_shift_duration,
+        "off_task_time": off_task_time,
+        "shift_efficiency": shift_efficiency,
+        "time_is_running": any(_time_is_running(t) for t in all_tasks)
+    }
+
+
+def get_inventory_report(db: Session, inventory_day: InventoryDay):
+    """Report for a day, cached for finalized days
+
+    The objects in a cached report are detached from any session and shared
+    between requests, so treat them as read-only.
+    """
+    if not inventory_day.finalized:
+        return build_inventory_report(db, inventory_day)
+
+    # Read the revision before building, so a report built from data that
+    # changes meanwhile is stored under the old revision and never served
+    revision = day_revision(inventory_day.id)
+    with _reports_lock:
+        cached = _reports.get(inventory_day.id)
+        if cached is not None and cached[0] == revision:
+            _reports.move_to_end(inventory_day.id)
+            return cached[1]
+
+    report = build_inventory_report(db, inventory_day)
+    if not report["time_is_running"]:
+        with _reports_lock:
+            _reports[inventory_day.id] = (revision, report)
+            _reports.move_to_end(inventory_day.id)
+            while len(_reports) > MAX_CACHED_REPORTS:
+                _reports.popitem(last=False)
+    return report
+
+
+def build_report_email_data(report):
+    """Sections of the report email (see utils.email.generate_report_email_html) from a report"""
+    inventory_day = report["inventory_day"]
+    tasks = report["all_tasks"]
+    task_minutes = report["task_minutes"]
+    task_labor_costs = report["task_labor_costs"]
+    completed_tasks = [t for t in tasks if t.finished_at is not None]
+
+    day_summary = {
+        'total_tasks': len(tasks),
+        'completed_tasks': len(completed_tasks),
+        'total_labor_cost': sum(task_labor_costs[t.id] for t in completed_tasks),
+        'total_time_hours': sum(task_minutes[t.id] for t in completed_tasks) / 60
+    }
+
+    task_report = {
+        'tasks': []
+    }
+    for task in tasks:
+        task_info = {
+            'description': task.description or 'N/A',
+            'assigned_to': task.assigned_to.full_name if task.assigned_to else 'Unassigned',
+            'status': task.status,
+            'time_minutes': task_minutes[task.id] if task.finished_at else 0,
+            'labor_cost': task_labor_costs[task.id]
+        }
+        task_report['tasks'].append(task_info)
+
+    inventory_status = {
+        'items': []
+    }
+    for day_item in report["inventory_day_items"]:
+        quantity = day_item.quantity
+        par_level = day_item.inventory_item.par_level
+
+        if quantity < par_level * 0.25:
+            status = 'critical'
+        elif quantity < par_level * 0.5:
+            status = 'warning'
+        else:
+            status = 'ok'
+
+        inventory_status['items'].append({
+            'name': day_item.inventory_item.name,
+            'current_quantity': quantity,
+            'par_level': par_level,
+            'status': status
+        })
+
+    employee_time = {}
+    for task in completed_tasks:
+        if task.assigned_to:
+            emp_name = task.assigned_to.full_name or task.assigned_to.username
+            if emp_name not in employee_time:
+                employee_time[emp_name] = 0
+            employee_time[emp_name] += task_minutes[task.id]
+
+    time_analysis = {
+        'employees': [
+            {
+                'name': name,
+                'hours_worked': minutes / 60
+            }
+            for name, minutes in employee_time.items()
+        ]
+    }
+
+    notes_data = {
+        'daily_note': inventory_day.global_notes,
+        'task_notes': []
+    }
+
+    sorted_tasks = sorted(
+        [t for t in tasks if t.notes],
+        key=lambda x: x.started_at if x.started_at else datetime.max
+    )
+
+    employees_by_id = {e.id: e for e in report["employees"]}
+    for task in sorted_tasks:
+        assigned_to_name = None
+        if task.assignments:
+            emp_ids = [assignment.employee_id for assignment in task.assignments]
+            if len(emp_ids) > 1:
+                assigned_to_name = f"Team of {len(emp_ids)}"
+            else:
+                emp = employees_by_id.get(emp_ids[0])
+                if emp:
+                    assigned_to_name = emp.full_name or emp.username
+        elif task.assigned_to:
+            assigned_to_name = task.assigned_to.full_name or task.assigned_to.username
+
+        notes_data['task_notes'].append({
+            'description': task.description,
+            'assigned_to': assigned_to_name,
+            'note': task.notes
+        })
+
+    return {
+        "day_date": inventory_day.date.strftime('%B %d, %Y'),
+        "day_summary": day_summary,
+        "task_report": task_report,
+        "inventory_status": inventory_status,
+        "time_analysis": time_analysis,
+        "notes_data": notes_data
+    }
@@ -0,0 +1,68 @@
+"""
+Task labor costing
+
+A task's labor is charged at the highest hourly wage among its assignees
+(assigned_to plus the task's task_assignments). Resolving
+those wages per task would mean a User query per task, so wages are looked
+up for a whole set of tasks at once and kept in a small in-process cache;
+routers/employees drops cached wages whenever an employee is changed.
+"""
+import logging
+import threading
+from sqlalchemy.orm import Session
+from ..models import User
+
+logger = logging.getLogger(__name__)
+
+_wage_cache = {}  # employee_id -> hourly_wage
+_wage_lock = threading.Lock()
+
+
+def invalidate_wages(employee_id=None):
+    """Drop one employee's cached wage, or every cached wage"""
+    with _wage_lock:
+        if employee_id is None:
+            _wage_cache.clear()
+        else:
+            _wage_cache.pop(employee_id, None)
+
+
+def get_wages(db: Session, employee_ids):
+    """Map employee_id -> hourly wage, querying only uncached employees (in one query)"""
+    employee_ids = set(employee_ids)
+    with _wage_lock:
+        wages = {emp_id: _wage_cache[emp_id] for emp_id in employee_ids if emp_id in _wage_cache}
+
+    missing = employee_ids - set(wages)
+    if missing:
+        rows = db.query(User.id, User.hourly_wage).filter(User.id.in_(missing)).all()
+        loaded = {emp_id: hourly_wage or 0 for emp_id, hourly_wage in rows}
+        with _wage_lock:
+            _wage_cache.update(loaded)
+        wages.update(loaded)
+
+    return wages
+
+
+def task_employee_ids(task):
+    """IDs of every employee assigned to a task"""
+    employee_ids = {assignment.employee_id for assignment in task.assignments}
+    if task.assigned_to_id:
+        employee_ids.add(task.assigned_to_id)
+    return employee_ids
+
+
+def get_task_wages(db: Session, tasks):
+    """Map employee_id -> hourly wage for every assignee of the given tasks"""
+    employee_ids = set()
+    for task in tasks:
+        employee_ids |= task_employee_ids(task)
+    return get_wages(db, employee_ids)
+
+
+def record_labor_costs(db: Session, tasks):
+    """Record duration and labor cost on each task, resolving all assignee wages at once"""
+    tasks = list(tasks)
+    wages = get_task_wages(db, [task for task in tasks if task.finished_at])
+    for task in tasks:
+        task.record_time_and_cost(wages)
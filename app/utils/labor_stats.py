@@ -0,0 +1,115 @@
+"""
+Batch labor statistics
+
+Labor figures for a batch (most recent task, week/month/all-time averages)
+used to load every completed Task and sum Task.labor_cost in Python, lazy
+loading sessions and assignees per task. Finished tasks now carry their
+labor cost in a column (Task.record_time_and_cost), so the statistics are
+aggregated in one grouped query and nothing per-task is loaded into Python.
+"""
+import logging
+from datetime import timedelta
+from sqlalchemy import select, func, case, union
+from sqlalchemy.orm import Session
+from ..models import Task, InventoryItem, Batch
+from .datetime_utils import get_naive_local_time
+
+logger = logging.getLogger(__name__)
+
+WEEK = timedelta(days=7)
+MONTH = timedelta(days=30)
+
+
+def _batch_task_candidates(batch_ids):
+    """Distinct (task_id, batch_id) for finished tasks on the batches, directly or via their inventory item"""
+    direct = select(
+        Task.id.label("task_id"),
+        Task.batch_id.label("batch_id")
+    ).where(Task.batch_id.in_(batch_ids), Task.finished_at.isnot(None))
+    via_item = select(
+        Task.id.label("task_id"),
+        InventoryItem.batch_id.label("batch_id")
+    ).join(InventoryItem, Task.inventory_item_id == InventoryItem.id).where(
+        InventoryItem.batch_id.in_(batch_ids), Task.finished_at.isnot(None)
+    )
+    return union(direct, via_item).subquery()
+
+
+def get_labor_stats(db: Session, batch_ids):
+    """Map batch_id -> raw labor statistics for completed tasks (batches without tasks are omitted)
+
+    Each entry has task_count, average_all_time, most_recent_cost,
+    most_recent_at, week_task_count, average_week, month_task_count and
+    average_month (the averages are None when their window is empty).
+    """
+    batch_ids = list(set(batch_ids))
+    if not batch_ids:
+        return {}
+
+    now = get_naive_local_time()
+    week_ago = now - WEEK
+    month_ago = now - MONTH
+
+    candidates = _batch_task_candidates(batch_ids)
+    per_task = select(
+        candidates.c.batch_id,
+        Task.finished_at,
+        func.coalesce(Task.recorded_labor_cost, 0).label("labor_cost"),
+        func.row_number().over(
+            partition_by=candidates.c.batch_id,
+            order_by=Task.finished_at.desc()
+        ).label("rank")
+    ).select_from(candidates).join(
+        Task, Task.id == candidates.c.task_id
+    ).subquery()
+
+    in_week = per_task.c.finished_at >= week_ago
+    in_month = per_task.c.finished_at >= month_ago
+    rows = db.execute(
+        select(
+            per_task.c.batch_id,
+            func.count().label("task_count"),
+            func.avg(per_task.c.labor_cost).label("average_all_time"),
+            func.max(case((per_task.c.rank == 1, per_task.c.labor_cost))).label("most_recent_cost"),
+            func.max(per_task.c.finished_at).label("most_recent_at"),
+            func.count(case((in_week, 1))).label("week_task_count"),
+            func.avg(case((in_week, per_task.c.labor_cost))).label("average_week"),
+            func.count(case((in_month, 1))).label("month_task_count"),
+            func.avg(case((in_month, per_task.c.labor_cost))).label("average_month")
+        ).group_by(per_task.c.batch_id)
+    ).all()
+
+    return {row.batch_id: dict(row._mapping) for row in rows}
+
+
+def get_batch_labor_stats(db: Session, batch_ids):
+    """Map batch_id -> labor cost per window, falling back to the batch estimate
+
+    Windows are "actual" (most recent completed task), "week_avg",
+    "month_avg" and "all_time_avg", matching DishBatchPortion.get_labor_cost.
+    """
+    batch_ids = set(batch_ids)
+    if not batch_ids:
+        return {}
+
+    estimates = {
+        batch.id: batch.estimated_labor_cost
+        for batch in db.query(Batch).filter(Batch.id.in_(batch_ids)).all()
+    }
+    stats = get_labor_stats(db, batch_ids)
+
+    result = {}
+    for batch_id in batch_ids:
+        estimated = estimates.get(batch_id, 0)
+        batch_stats = stats.get(batch_id, {})
+
+        def or_estimated(value):
+            return value if value is not None else estimated
+
+        result[batch_id] = {
+            "actual": or_estimated(batch_stats.get("most_recent_cost")),
+            "week_avg": or_estimated(batch_stats.get("average_week")),
+            "month_avg": or_estimated(batch_stats.get("average_month")),
+            "all_time_avg": or_estimated(batch_stats.get("average_all_time"))
+        }
+    return result
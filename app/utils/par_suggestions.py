@@ -0,0 +1,208 @@
+"""
+History-based par suggestions
+
+Par levels are set by hand; this job learns them from the counts. For every
+pair of consecutive finalized days it records how much of each item was
+used in between (opening count + amount made by the opening day's finished
+tasks - closing count, in par units) in inventory_item_usage. From the
+usage in the last WINDOW_DAYS it then writes, per item, the mean and 90th
+percentile daily usage and a day-of-week adjusted par to par_suggestions.
+
+The job is incremental: InventoryDay.usage_recorded_at marks the days
+already folded in, so a run only reads the counts and tasks of newly
+finalized days (and of the days next to them) and only recomputes the
+suggestions of the items they counted. The first run covers the whole
+history. It runs whenever a day is finalized, and can be run by hand:
+
+    python -m app.utils.par_suggestions
+"""
+import logging
+import statistics
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, joinedload
+from ..models import InventoryDay, InventoryDayItem, InventoryItem, InventoryItemUsage, ParSuggestion, Task
+from .datetime_utils import get_naive_local_time
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 56  # Usage history the suggestions are computed from
+MAX_GAP_DAYS = 7  # Counts further apart than this don't say much about daily usage
+MIN_OBSERVATIONS = 3  # Fewer usage observations than this gives no suggestion
+MIN_WEEKDAY_OBSERVATIONS = 2  # Per weekday, before its usage adjusts that weekday's par
+
+
+def _counts_by_day(db: Session, day_ids):
+    """Map day_id -> {inventory_item_id: counted quantity}"""
+    counts = defaultdict(dict)
+    rows = db.query(InventoryDayItem.day_id, InventoryDayItem.inventory_item_id, InventoryDayItem.quantity).filter(
+        InventoryDayItem.day_id.in_(day_ids)
+    )
+    for day_id, item_id, quantity in rows:
+        counts[day_id][item_id] = quantity or 0.0
+    return counts
+
+
+def _made_by_day(db: Session, day_ids, items):
+    """Map (day_id, inventory_item_id) -> amount made by the day's finished tasks, in par units"""
+    made = defaultdict(float)
+    rows = db.query(Task.day_id, Task.inventory_item_id, Task.made_amount, Task.made_unit).filter(
+        Task.day_id.in_(day_ids),
+        Task.inventory_item_id.isnot(None),
+        Task.finished_at.isnot(None),
+        Task.made_amount.isnot(None)
+    )
+    for day_id, item_id, made_amount, made_unit in rows:
+        item = items.get(item_id)
+        if item is not None:
+            made[(day_id, item_id)] += item.convert_to_par_units(made_amount, made_unit)
+    return made
+
+
+def compute_par_suggestion(observations):
+    """Suggestion values from (date, days, usage) observations, or None if there are too few
+
+    The suggested par covers the 90th percentile of daily usage. Each
+    weekday's par scales it by how that weekday's usage compares with the
+    mean (from single-day periods starting on that weekday).
+    """
+    if len(observations) < MIN_OBSERVATIONS:
+        return None
+
+    rates = [usage / days for _, days, usage in observations]
+    mean = statistics.fmean(rates)
+    p90 = statistics.quantiles(rates, n=10, method='inclusive')[8]
+
+    weekday_rates = defaultdict(list)
+    for day, days, usage in observations:
+        if days == 1:
+            weekday_rates[day.weekday()].append(usage)
+
+    weekday_pars = []
+    for weekday in range(7):
+        day_rates = weekday_rates.get(weekday, [])
+        if mean > 0 and len(day_rates) >= MIN_WEEKDAY_OBSERVATIONS:
+            weekday_pars.append(round(p90 * statistics.fmean(day_rates) / mean, 2))
+        else:
+            weekday_pars.append(round(p90, 2))
+
+    return {
+        "suggested_par": round(p90, 2),
+        "mean_daily_usage": round(mean, 4),
+        "p90_daily_usage": round(p90, 4),
+        "weekday_pars": ",".join(str(par) for par in weekday_pars),
+        "observations": len(observations)
+    }
+
+
+def _refresh_suggestions(db: Session, item_ids, latest_date):
+    """Recompute the suggestions of some items from their usage in the window before latest_date"""
+    if not item_ids:
+        return 0
+
+    observations = defaultdict(list)
+    rows = db.query(
+        InventoryItemUsage.inventory_item_id, InventoryItemUsage.date, InventoryItemUsage.days, InventoryItemUsage.usage
+    ).filter(
+        InventoryItemUsage.inventory_item_id.in_(item_ids),
+        InventoryItemUsage.date >= latest_date - timedelta(days=WINDOW_DAYS)
+    )
+    for item_id, day, days, usage in rows:
+        observations[item_id].append((day, days, usage))
+
+    now = get_naive_local_time()
+    suggestions = []
+    for item_id in item_ids:
+        values = compute_par_suggestion(observations.get(item_id, []))
+        if values is not None:
+            suggestions.append({"inventory_item_id": item_id, "computed_at": now, **values})
+
+    db.query(ParSuggestion).filter(ParSuggestion.inventory_item_id.in_(item_ids)).delete(synchronize_session=False)
+    if suggestions:
+        db.execute(insert(ParSuggestion), suggestions)
+    return len(suggestions)
+
+
+def update_par_suggestions(db: Session):
+    """Fold newly finalized days into the usage history and refresh the affected suggestions
+
+    Commits. Returns the number of days processed.
+    """
+    days = db.query(InventoryDay.id, InventoryDay.date, InventoryDay.usage_recorded_at).filter(
+        InventoryDay.finalized == True
+    ).order_by(InventoryDay.date).all()
+
+    new_day_ids = {day.id for day in days if day.usage_recorded_at is None}
+    if not new_day_ids:
+        return 0
+
+    # A new day closes the period since the finalized day before it, and (if it was
+    # finalized out of order) opens a new period for the finalized day after it
+    periods = {
+        closing.id: (opening, closing)
+        for opening, closing in zip(days, days[1:])
+        if opening.id in new_day_ids or closing.id in new_day_ids
+    }
+    opening_ids = {opening.id for opening, _ in periods.values()}
+
+    items = {
+        item.id: item
+        for item in db.query(InventoryItem).options(
+            joinedload(InventoryItem.par_unit_name), joinedload(InventoryItem.batch)
+        )
+    }
+    counts = _counts_by_day(db, opening_ids | set(periods))
+    made = _made_by_day(db, opening_ids, items)
+
+    usage_rows = []
+    for opening, closing in periods.values():
+        gap = (closing.date - opening.date).days
+        if gap < 1 or gap > MAX_GAP_DAYS:
+            continue
+
+        opening_counts = counts.get(opening.id, {})
+        for item_id, closing_quantity in counts.get(closing.id, {}).items():
+            if item_id not in opening_counts or item_id not in items:
+                continue
+            usage = opening_counts[item_id] + made.get((opening.id, item_id), 0.0) - closing_quantity
+            if usage < 0:
+                # Restocked without a recorded task (e.g. a delivery); says nothing about usage
+                continue
+            usage_rows.append({
+                "inventory_item_id": item_id,
+                "day_id": closing.id,
+                "date": opening.date,
+                "days": gap,
+                "usage": usage
+            })
+
+    db.query(InventoryItemUsage).filter(InventoryItemUsage.day_id.in_(periods)).delete(synchronize_session=False)
+    if usage_rows:
+        db.execute(insert(InventoryItemUsage), usage_rows)
+
+    affected_item_ids = {item_id for day_id in periods for item_id in counts.get(day_id, {}) if item_id in items}
+    suggestion_count = _refresh_suggestions(db, affected_item_ids, days[-1].date)
+
+    db.query(InventoryDay).filter(InventoryDay.id.in_(new_day_ids)).update(
+        {InventoryDay.usage_recorded_at: get_naive_local_time()}, synchronize_session=False
+    )
+    db.commit()
+
+    logger.info(
+        "Par suggestions: processed %d day(s), recorded %d usage observation(s), refreshed %d suggestion(s)",
+        len(new_day_ids), len(usage_rows), suggestion_count
+    )
+    return len(new_day_ids)
+
+
+if __name__ == "__main__":
+    from ..database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        processed = update_par_suggestions(db)
+        print(f"✅ Processed {processed} newly finalized day(s)")
+    finally:
+        db.close()
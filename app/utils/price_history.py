@@ -0,0 +1,72 @@
+"""
+Ingredient price history
+
+Ingredients are priced in place, so the ingredient_prices table keeps an
+append-only snapshot of each ingredient's pricing whenever it changes. Costing
+"as of" a date looks up the snapshot in effect for every ingredient with one
+indexed (ingredient_id, effective_at) seek per ingredient, then costs the
+cost graph with those prices swapped in - the same walk as costing today.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+from ..models import Ingredient, IngredientPrice
+from .costing import get_cost_graph
+
+logger = logging.getLogger(__name__)
+
+
+def record_ingredient_price(db: Session, ingredient: Ingredient):
+    """Append a price snapshot if the ingredient's pricing changed since the last one
+
+    Call after the ingredient has been flushed (it needs an id). Returns the
+    new IngredientPrice, or None if the pricing is unchanged.
+    """
+    latest = db.query(IngredientPrice).filter(
+        IngredientPrice.ingredient_id == ingredient.id
+    ).order_by(IngredientPrice.effective_at.desc(), IngredientPrice.id.desc()).first()
+
+    if latest is not None and latest.same_pricing(ingredient):
+        return None
+
+    price = IngredientPrice.from_ingredient(ingredient)
+    db.add(price)
+    return price
+
+
+def get_prices_as_of(db: Session, as_of: datetime, ingredient_ids=None):
+    """Map ingredient_id -> IngredientPrice in effect at as_of
+
+    Ingredients whose history starts after as_of get their earliest recorded
+    price; ingredients without any history are omitted.
+    """
+    def snapshot_id(descending):
+        candidate = aliased(IngredientPrice)
+        query = db.query(candidate.id).filter(candidate.ingredient_id == Ingredient.id)
+        if descending:
+            query = query.filter(candidate.effective_at <= as_of).order_by(
+                candidate.effective_at.desc(), candidate.id.desc()
+            )
+        else:
+            query = query.order_by(candidate.effective_at.asc(), candidate.id.asc())
+        return query.limit(1).correlate(Ingredient).scalar_subquery()
+
+    query = db.query(IngredientPrice).join(
+        Ingredient, IngredientPrice.id == func.coalesce(snapshot_id(True), snapshot_id(False))
+    )
+    if ingredient_ids is not None:
+        query = query.filter(Ingredient.id.in_(list(ingredient_ids)))
+
+    return {price.ingredient_id: price for price in query.all()}
+
+
+def get_cost_graph_as_of(db: Session, as_of: datetime):
+    """Copy of the cost graph with every ingredient priced as of a date"""
+    graph = get_cost_graph(db)
+    prices = get_prices_as_of(db, as_of)
+    return graph.with_ingredients({
+        ingredient_id: price.to_ingredient(graph.ingredients[ingredient_id])
+        for ingredient_id, price in prices.items()
+        if ingredient_id in graph.ingredients
+    })
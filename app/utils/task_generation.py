@@ -0,0 +1,237 @@
+"""
+Inventory day task generation
+
+Tasks are generated from a day's inventory counts (items below par, or
+overridden) and its janitorial tasks. Rather than querying and rewriting
+tasks one item at a time, the day's tasks are loaded once and keyed by
+inventory item and janitorial task, the desired task set is diffed against
+them in memory, and the difference is applied as one bulk INSERT, one bulk
+UPDATE and one DELETE.
+
+Tasks that have been started are never touched (unless force regenerating),
+and an item's unstarted task is only rewritten when the inventory snapshot
+it was generated from (quantity, par level, overrides) has changed.
+Inserted tasks get their slug (see task_slugs) in the same bulk INSERT.
+"""
+import logging
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session, joinedload
+from ..models import Batch, InventoryDay, InventoryItem, JanitorialTask, Task, TaskAssignment, TaskSession
+from .task_slugs import task_slug_base, unique_slug
+
+logger = logging.getLogger(__name__)
+
+
+def should_create_item_task(day_item, item):
+    """Below par and not overridden to skip, or at/above par and overridden to create"""
+    is_below_par = day_item.quantity < item.par_level
+    return (
+        (is_below_par and not day_item.override_no_task) or
+        (not is_below_par and day_item.override_create_task)
+    )
+
+
+def should_include_janitorial_task(janitorial_day_item, janitorial_task):
+    """Daily janitorial tasks are always included, manual ones when ticked for the day"""
+    return (
+        janitorial_task.task_type == 'daily' or
+        (janitorial_task.task_type == 'manual' and janitorial_day_item.include_task)
+    )
+
+
+def snapshot_changed(task, day_item, item):
+    """Whether the inventory values have changed since the task was generated"""
+    # Tasks without a snapshot (created before snapshots existed) are treated as changed
+    if task.snapshot_quantity is None:
+        return True
+    return (
+        task.snapshot_quantity != day_item.quantity or
+        task.snapshot_par_level != item.par_level or
+        task.snapshot_override_create != day_item.override_create_task or
+        task.snapshot_override_no_task != day_item.override_no_task
+    )
+
+
+def _item_task_values(day_item, item):
+    """Column values of the auto-generated task for an inventory item"""
+    if item.batch:
+        description = f"Make {item.name} - {item.batch.recipe.name}"
+    else:
+        description = f"Restock {item.name}"
+
+    return {
+        "batch_id": item.batch_id if item.batch else None,
+        "description": description,
+        "auto_generated": True,
+        "snapshot_quantity": day_item.quantity,
+        "snapshot_par_level": item.par_level,
+        "snapshot_override_create": day_item.override_create_task,
+        "snapshot_override_no_task": day_item.override_no_task
+    }
+
+
+def _prefetch(db: Session, inventory_day_items, janitorial_day_items):
+    """Load the inventory items (with batch and recipe) and janitorial tasks in two queries
+
+    The rows land in the session's identity map, so day_item.inventory_item
+    and janitorial_day_item.janitorial_task resolve without further queries.
+    The identity map only holds weak references, so the caller must keep the
+    returned (items_by_id, janitorial_tasks_by_id) lookups alive while it works.
+    """
+    items = {}
+    item_ids = {day_item.inventory_item_id for day_item in inventory_day_items}
+    if item_ids:
+        items = {
+            item.id: item
+            for item in db.query(InventoryItem).options(
+                joinedload(InventoryItem.batch).joinedload(Batch.recipe)
+            ).filter(InventoryItem.id.in_(item_ids)).all()
+        }
+
+    janitorial_tasks = {}
+    janitorial_ids = {janitorial_day_item.janitorial_task_id for janitorial_day_item in janitorial_day_items}
+    if janitorial_ids:
+        janitorial_tasks = {
+            janitorial_task.id: janitorial_task
+            for janitorial_task in db.query(JanitorialTask).filter(JanitorialTask.id.in_(janitorial_ids)).all()
+        }
+
+    return items, janitorial_tasks
+
+
+def plan_day_tasks(day_id, inventory_day_items, janitorial_day_items, tasks_by_item, tasks_by_janitorial):
+    """Diff the desired tasks against the existing ones
+
+    tasks_by_item / tasks_by_janitorial map inventory_item_id / janitorial_task_id
+    to the day's existing task. Returns (inserts, updates, delete_ids), where
+    inserts and updates are lists of column-value dicts (updates include "id" and
+    the "version" the task was loaded with).
+    """
+    inserts = []
+    updates = []
+    delete_ids = []
+
+    for day_item in inventory_day_items:
+        item = day_item.inventory_item
+        existing_task = tasks_by_item.get(item.id)
+
+        # CRITICAL: Never modify tasks that have been started or completed
+        if existing_task and existing_task.started_at:
+            continue
+
+        if existing_task and not snapshot_changed(existing_task, day_item, item):
+            continue
+
+        if not should_create_item_task(day_item, item):
+            if existing_task:
+                delete_ids.append(existing_task.id)
+            continue
+
+        values = _item_task_values(day_item, item)
+        if existing_task:
+            # The version guards the UPDATE against the task being started meanwhile
+            updates.append({"id": existing_task.id, "version": existing_task.version, **values})
+        else:
+            inserts.append({"day_id": day_id, "inventory_item_id": item.id, **values})
+
+    for janitorial_day_item in janitorial_day_items:
+        janitorial_task = janitorial_day_item.janitorial_task
+        existing_task = tasks_by_janitorial.get(janitorial_task.id)
+
+        # CRITICAL: Never modify tasks that have been started or completed
+        if existing_task and existing_task.started_at:
+            continue
+
+        should_include = should_include_janitorial_task(janitorial_day_item, janitorial_task)
+        if existing_task and not should_include:
+            delete_ids.append(existing_task.id)
+        elif should_include and not existing_task:
+            inserts.append({
+                "day_id": day_id,
+                "janitorial_task_id": janitorial_task.id,
+                "description": janitorial_task.title,
+                "auto_generated": janitorial_task.task_type == 'daily'
+            })
+
+    return inserts, updates, delete_ids
+
+
+def _assign_insert_slugs(inserts, items, janitorial_tasks, taken):
+    """Set the slug of each task to insert, unique among the day's remaining tasks
+
+    items / janitorial_tasks map ids to the objects loaded by _prefetch().
+    """
+    for values in inserts:
+        item = items.get(values.get("inventory_item_id"))
+        janitorial_task = janitorial_tasks.get(values.get("janitorial_task_id"))
+        base_slug = task_slug_base(
+            values.get("description"),
+            values.get("auto_generated"),
+            item_name=item.name if item else None,
+            janitorial_title=janitorial_task.title if janitorial_task else None
+        )
+        values["slug"] = unique_slug(base_slug, taken)
+        taken.add(values["slug"])
+
+
+def generate_tasks_for_day(db: Session, inventory_day: InventoryDay, inventory_day_items, janitorial_day_items,
+                           force_regenerate: bool = False):
+    """Generate tasks for items that are below par level
+
+    Only tasks for the given inventory and janitorial day items are created,
+    updated or deleted; with force_regenerate every task of the day (started
+    or not) is deleted first and the task set is rebuilt from scratch.
+    Changes are executed in the current transaction but not committed.
+    Returns the number of tasks created, updated and deleted.
+    """
+    # Also holds references to the prefetched rows while generating
+    items, janitorial_tasks = _prefetch(db, inventory_day_items, janitorial_day_items)
+
+    tasks_by_item = {}
+    tasks_by_janitorial = {}
+    slugs_by_task = {}
+    if force_regenerate:
+        day_task_ids = db.query(Task.id).filter(Task.day_id == inventory_day.id)
+        db.query(TaskSession).filter(TaskSession.task_id.in_(day_task_ids.scalar_subquery())).delete(
+            synchronize_session=False
+        )
+        db.query(TaskAssignment).filter(TaskAssignment.task_id.in_(day_task_ids.scalar_subquery())).delete(
+            synchronize_session=False
+        )
+        db.query(Task).filter(Task.day_id == inventory_day.id).delete()
+    else:
+        for task in db.query(Task).filter(Task.day_id == inventory_day.id).order_by(Task.id):
+            slugs_by_task[task.id] = task.slug
+            if task.inventory_item_id is not None:
+                tasks_by_item.setdefault(task.inventory_item_id, task)
+            if task.janitorial_task_id is not None:
+                tasks_by_janitorial.setdefault(task.janitorial_task_id, task)
+
+    inserts, updates, delete_ids = plan_day_tasks(
+        inventory_day.id, inventory_day_items, janitorial_day_items, tasks_by_item, tasks_by_janitorial
+    )
+
+    if delete_ids:
+        db.query(TaskAssignment).filter(TaskAssignment.task_id.in_(delete_ids)).delete(synchronize_session=False)
+        db.query(Task).filter(Task.id.in_(delete_ids)).delete()
+    if updates:
+        db.execute(update(Task), updates)
+        # Bulk UPDATE by primary key leaves loaded objects untouched; reload them on next access
+        updated_ids = {values["id"] for values in updates}
+        for task in tasks_by_item.values():
+            if task.id in updated_ids:
+                db.expire(task)
+    if inserts:
+        _assign_insert_slugs(inserts, items, janitorial_tasks, {
+            slug for task_id, slug in slugs_by_task.items() if task_id not in delete_ids
+        })
+        # The ORM leaves None values out of bulk INSERTs and batches runs of rows with the same
+        # columns into one executemany, so keep rows with the same columns together
+        inserts.sort(key=lambda values: sorted(key for key, value in values.items() if value is not None))
+        db.execute(insert(Task), inserts)
+
+    logger.debug(
+        "Generated tasks for day %s: %d created, %d updated, %d deleted",
+        inventory_day.id, len(inserts), len(updates), len(delete_ids)
+    )
+    return {"created": len(inserts), "updated": len(updates), "deleted": len(delete_ids)}
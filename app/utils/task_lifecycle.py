@@ -0,0 +1,171 @@
+"""
+Task lifecycle
+
+Starting, pausing, resuming, finishing and reopening tasks. A transition
+loads the task and its day in one query (by the day's date and the task's
+slug index), checks the task's state and writes the task row and its
+session in one transaction: start is an UPDATE and a session INSERT,
+pause a single UPDATE, resume and finish an UPDATE of the task and of its
+open session.
+
+Tasks are versioned (Task.version), so the task UPDATE only matches the
+row as it was loaded. When two devices act on the same task at once, the
+second transition matches no row and raises StaleDataError: its
+transaction is rolled back, leaving the task and its sessions as the first
+one wrote them, and the request is answered with a 409 asking to reload
+(see the StaleDataError handler in main).
+"""
+import logging
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, joinedload, selectinload
+from ..models import InventoryDay, Task, TaskSession
+from .datetime_utils import get_naive_local_time
+from .day_rollups import refresh_day_rollup
+
+logger = logging.getLogger(__name__)
+
+SCALE_FACTORS = {
+    'full': 1.0,
+    'double': 2.0,
+    'triple': 3.0,
+    'quadruple': 4.0,
+    'three_quarters': 0.75,
+    'two_thirds': 0.6667,
+    'half': 0.5,
+    'quarter': 0.25,
+    'eighth': 0.125,
+    'sixteenth': 0.0625
+}
+
+
+def load_task(db: Session, date: str, task_slug: str, with_sessions: bool = False):
+    """The day with a date and its task with a slug, in one query; returns (inventory_day, task)"""
+    query = db.query(InventoryDay, Task).join(Task, Task.day_id == InventoryDay.id).filter(
+        InventoryDay.date == date,
+        Task.slug == task_slug
+    )
+    if with_sessions:
+        query = query.options(joinedload(Task.batch), selectinload(Task.sessions))
+    row = query.first()
+    if row is None:
+        if not db.query(InventoryDay.id).filter(InventoryDay.date == date).first():
+            raise HTTPException(status_code=404, detail="Inventory day not found")
+        raise HTTPException(status_code=404, detail="Task not found")
+    return row
+
+
+def _commit(db: Session):
+    """Commit a transition, keeping the loaded day and task as written rather than expiring them,
+    since the routes broadcast and redirect from them right after"""
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+def _open_session(task: Task):
+    """The task's open session, if any (sessions must be loaded)"""
+    return next((session for session in task.sessions if session.ended_at is None), None)
+
+
+def start_task(db: Session, task: Task, selected_scale: str = None):
+    """Start a task (at a scale, for batch tasks) and open its first session; returns the start time"""
+    if task.status != "not_started":
+        raise HTTPException(status_code=400, detail="Task already started")
+
+    # Check if task has assigned employees
+    if not task.assigned_to_id and not task.assignments:
+        raise HTTPException(status_code=400, detail="Please assign employees before starting this task")
+
+    now = get_naive_local_time()
+    if selected_scale:
+        task.selected_scale = selected_scale
+        task.scale_factor = SCALE_FACTORS.get(selected_scale, 1.0)
+    task.started_at = now
+    task.is_paused = False
+    db.add(TaskSession(task=task, started_at=now, pause_duration=0))
+    _commit(db)
+    return now
+
+
+def pause_task(db: Session, task: Task):
+    """Pause an in-progress task; returns the pause time"""
+    if task.status != "in_progress":
+        raise HTTPException(status_code=400, detail="Task is not in progress")
+
+    now = get_naive_local_time()
+    task.paused_at = now
+    task.is_paused = True
+    _commit(db)
+    return now
+
+
+def _end_pause(task: Task, now):
+    """Add the pause in progress to the task's and its open session's pause time"""
+    if task.is_paused and task.paused_at:
+        pause_duration = int((now - task.paused_at).total_seconds())
+        task.total_pause_time += pause_duration
+
+        current_session = _open_session(task)
+        if current_session:
+            current_session.pause_duration += pause_duration
+
+    task.is_paused = False
+    task.paused_at = None
+
+
+def resume_task(db: Session, task: Task):
+    """Resume a paused task (loaded with its sessions); returns the resume time"""
+    if task.status != "paused":
+        raise HTTPException(status_code=400, detail="Task is not paused")
+
+    now = get_naive_local_time()
+    _end_pause(task, now)
+    _commit(db)
+    return now
+
+
+def finish_task(db: Session, inventory_day: InventoryDay, task: Task, made_amount: float = None,
+                made_unit: str = None):
+    """Finish a started task (loaded with its sessions), closing its session and recording its time
+    and labor cost; without a made amount, non-variable yield batches record their scaled yield.
+    Returns the finish time."""
+    if task.status not in ["in_progress", "paused"]:
+        raise HTTPException(status_code=400, detail="Task cannot be finished")
+
+    now = get_naive_local_time()
+    _end_pause(task, now)
+    task.finished_at = now
+
+    current_session = _open_session(task)
+    if current_session:
+        current_session.ended_at = now
+
+    if made_amount is not None:
+        task.made_amount = made_amount
+        task.made_unit = made_unit
+    elif task.batch and not task.batch.variable_yield and task.scale_factor:
+        task.made_amount = task.batch.yield_amount * task.scale_factor
+        task.made_unit = task.batch.yield_unit
+
+    task.record_time_and_cost()
+    refresh_day_rollup(db, inventory_day)
+    _commit(db)
+    return now
+
+
+def reopen_task(db: Session, inventory_day: InventoryDay, task: Task):
+    """Reopen a completed task with a new session; returns the reopen time"""
+    if task.status != "completed":
+        raise HTTPException(status_code=400, detail="Only completed tasks can be reopened")
+
+    now = get_naive_local_time()
+    # Use the model's reopen method to clear completion data
+    task.reopen()
+    # pause_duration is set explicitly: the rollup below reads the new session before its INSERT applies the default
+    db.add(TaskSession(task=task, started_at=now, pause_duration=0))
+    refresh_day_rollup(db, inventory_day)
+    _commit(db)
+    return now
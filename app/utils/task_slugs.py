@@ -0,0 +1,118 @@
+"""
+Task slugs
+
+A task's slug is stored in tasks.slug, unique within its day (indexed on
+slug, day_id), so task URLs resolve with one index lookup instead of
+loading every task of the day - or of every day, when no day is given -
+and generating each one's slug.
+
+The slug is generated from the task's description or the name of what it
+is for (see task_slug_base) and made unique within the day with a numeric
+suffix (name, name-2, name-3, ...). It is assigned when a task is inserted
+and regenerated when the columns it is generated from change (e.g. a batch
+task started at half scale gets a -half suffix); renaming an inventory
+item, recipe or janitorial task afterwards doesn't change existing slugs.
+Bulk-inserted tasks (see task_generation) carry their slug in the insert.
+"""
+import logging
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from ..models import Batch, InventoryItem, JanitorialTask, Recipe, Task
+from .slugify import slugify
+
+logger = logging.getLogger(__name__)
+
+SLUG_SOURCE_COLUMNS = (
+    "description", "auto_generated", "inventory_item_id", "batch_id", "janitorial_task_id", "selected_scale"
+)
+
+
+def task_slug_base(description, auto_generated, item_name=None, recipe_name=None, janitorial_title=None,
+                   has_batch=False, selected_scale=None):
+    """Slug of a task before it is made unique within its day"""
+    # For manual tasks, ALWAYS use the description if available
+    # This ensures manually created tasks keep their custom names even when attached to batches
+    if not auto_generated and description:
+        base_slug = slugify(description[:50])
+    # For auto-generated tasks, prefer the most specific entity name
+    # Priority: inventory_item > batch/recipe > janitorial_task > description
+    elif item_name:
+        base_slug = slugify(item_name)
+    elif recipe_name:
+        base_slug = slugify(recipe_name)
+    elif janitorial_title:
+        base_slug = slugify(janitorial_title)
+    elif description:
+        base_slug = slugify(description[:50])
+    else:
+        base_slug = "task"
+
+    # Add scale suffix for batch tasks if not full scale
+    if has_batch and selected_scale and selected_scale != 'full':
+        base_slug = f"{base_slug}-{selected_scale}"
+
+    return base_slug or "task"
+
+
+def unique_slug(base_slug, taken):
+    """First of base_slug, base_slug-2, base_slug-3, ... not in taken"""
+    slug = base_slug
+    counter = 2
+    while slug in taken:
+        slug = f"{base_slug}-{counter}"
+        counter += 1
+    return slug
+
+
+def _slug_base_of(session, task):
+    """Slug base of a task object, resolving its related names by foreign key (pending tasks don't lazy-load)"""
+    item = session.get(InventoryItem, task.inventory_item_id) if task.inventory_item_id else None
+    batch = session.get(Batch, task.batch_id) if task.batch_id else None
+    recipe = session.get(Recipe, batch.recipe_id) if batch and batch.recipe_id else None
+    janitorial_task = session.get(JanitorialTask, task.janitorial_task_id) if task.janitorial_task_id else None
+    return task_slug_base(
+        task.description,
+        task.auto_generated,
+        item_name=item.name if item else None,
+        recipe_name=recipe.name if recipe else None,
+        janitorial_title=janitorial_task.title if janitorial_task else None,
+        has_batch=batch is not None,
+        selected_scale=task.selected_scale
+    )
+
+
+def find_task_by_slug(db: Session, slug: str, day_id: int = None, options=()):
+    """Task with a slug, within a day if given (otherwise the oldest task with it)"""
+    query = db.query(Task).options(*options).filter(Task.slug == slug)
+    if day_id:
+        return query.filter(Task.day_id == day_id).first()
+    return query.order_by(Task.id).first()
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_task_slugs(session, flush_context, instances):
+    """Give new tasks a slug, and regenerate it when a task's slug source columns change"""
+    # New tasks in the order they'll be inserted, so earlier tasks get the unsuffixed slugs
+    tasks = sorted((obj for obj in session.new if isinstance(obj, Task)), key=lambda obj: inspect(obj).insert_order)
+    for obj in session.dirty:
+        if isinstance(obj, Task) and obj not in session.deleted:
+            state = inspect(obj)
+            if any(state.attrs[column].history.has_changes() for column in SLUG_SOURCE_COLUMNS):
+                tasks.append(obj)
+    if not tasks:
+        return
+
+    taken_by_day = {}
+    with session.no_autoflush:
+        for task in tasks:
+            if task.day_id not in taken_by_day:
+                taken_by_day[task.day_id] = {
+                    slug for (slug,) in session.query(Task.slug).filter(
+                        Task.day_id == task.day_id, Task.slug.isnot(None)
+                    )
+                }
+            taken = taken_by_day[task.day_id]
+            if task.slug and task.id is not None:
+                taken.discard(task.slug)
+            task.slug = unique_slug(_slug_base_of(session, task), taken)
+            taken.add(task.slug)
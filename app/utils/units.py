@@ -0,0 +1,97 @@
+"""
+Unit conversion registry
+
+Every supported unit pair is resolved to a single multiplication factor when
+the module is imported, so costing code can convert with one dictionary
+lookup instead of re-checking which unit system each side belongs to.
+"""
+
+# Unit conversion dictionaries
+WEIGHT_CONVERSIONS = {
+    'lb': 1.0,
+    'oz': 16.0,
+    'g': 453.592,
+    'kg': 0.453592
+}
+
+VOLUME_CONVERSIONS = {
+    'gal': 1.0,
+    'qt': 4.0,
+    'pt': 8.0,
+    'cup': 16.0,
+    'fl_oz': 128.0,
+    'l': 3.78541,
+    'ml': 3785.41
+}
+
+BAKING_MEASUREMENTS = {
+    'cup': 1.0,
+    '3_4_cup': 1.333,
+    '2_3_cup': 1.5,
+    '1_2_cup': 2.0,
+    '1_3_cup': 3.0,
+    '1_4_cup': 4.0,
+    '1_8_cup': 8.0,
+    'tbsp': 16.0,
+    'tsp': 48.0
+}
+
+def convert_weight(amount, from_unit, to_unit):
+    """Convert weight from one unit to another"""
+    if from_unit not in WEIGHT_CONVERSIONS or to_unit not in WEIGHT_CONVERSIONS:
+        raise ValueError(f"Unsupported weight units: {from_unit} to {to_unit}")
+
+    # Convert to pounds first, then to target unit
+    pounds = amount / WEIGHT_CONVERSIONS[from_unit]
+    return pounds * WEIGHT_CONVERSIONS[to_unit]
+
+def convert_volume(amount, from_unit, to_unit):
+    """Convert volume from one unit to another"""
+    if from_unit not in VOLUME_CONVERSIONS or to_unit not in VOLUME_CONVERSIONS:
+        raise ValueError(f"Unsupported volume units: {from_unit} to {to_unit}")
+
+    # Convert to gallons first, then to target unit
+    gallons = amount / VOLUME_CONVERSIONS[from_unit]
+    return gallons * VOLUME_CONVERSIONS[to_unit]
+
+def convert_baking_measurement(amount, from_unit, to_unit, weight_per_cup, weight_unit):
+    """Convert baking measurements using weight conversion"""
+    if from_unit not in BAKING_MEASUREMENTS or to_unit not in BAKING_MEASUREMENTS:
+        raise ValueError(f"Unsupported baking units: {from_unit} to {to_unit}")
+
+    # Convert to cups first
+    cups = amount / BAKING_MEASUREMENTS[from_unit]
+
+    # Convert to weight
+    weight = cups * weight_per_cup
+
+    # Convert back to target baking measurement
+    target_cups = weight / weight_per_cup
+    return target_cups * BAKING_MEASUREMENTS[to_unit]
+
+def _build_factor_table():
+    """(from_unit, to_unit) -> factor such that amount_in_to = amount_in_from * factor"""
+    table = {}
+
+    # Same-system conversions
+    for conversions in (WEIGHT_CONVERSIONS, VOLUME_CONVERSIONS, BAKING_MEASUREMENTS):
+        for from_unit, from_per_base in conversions.items():
+            for to_unit, to_per_base in conversions.items():
+                table[(from_unit, to_unit)] = to_per_base / from_per_base
+
+    # Volume <-> baking measurements, bridged through cups
+    volume_per_cup = {unit: per_gal / VOLUME_CONVERSIONS['cup'] for unit, per_gal in VOLUME_CONVERSIONS.items()}
+    for volume_unit, volume_units_per_cup in volume_per_cup.items():
+        for baking_unit, baking_units_per_cup in BAKING_MEASUREMENTS.items():
+            table.setdefault((volume_unit, baking_unit), baking_units_per_cup / volume_units_per_cup)
+            table.setdefault((baking_unit, volume_unit), volume_units_per_cup / baking_units_per_cup)
+
+    return table
+
+UNIT_FACTORS = _build_factor_table()
+
+def unit_factor(from_unit, to_unit):
+    """Multiplication factor from one unit to another, or None if they don't convert"""
+    if from_unit == to_unit:
+        return 1.0
+    return UNIT_FACTORS.get((from_unit, to_unit))
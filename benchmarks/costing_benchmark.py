@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Costing benchmark suite
+
+Builds a synthetic menu in a throwaway SQLite database (5,000 ingredients,
+recipes nested 4-6 levels deep through batches, 500 dishes), then times the
+costing paths and counts the SQL statements each one issues:
+
+- Ingredient.get_cost_per_unit for every ingredient and unit
+- RecipeBatchPortion.get_total_cost for every recipe batch portion
+- DishBatchPortion recipe/labor costing for every dish portion
+- Full-menu costing and the menu margin report
+- Single-dish costing (the dish detail breakdown) for the deepest dish
+- /api/batches/all
+- Re-costing the menu after one ingredient price change
+
+Usage:
+    python benchmarks/costing_benchmark.py                  # compare against baseline.json
+    python benchmarks/costing_benchmark.py --save-baseline  # record a new baseline
+
+A case regresses when it issues more SQL statements than the baseline or
+takes more than --tolerance times the baseline wall-clock time; the script
+then exits with status 1.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).parent
+BASELINE_PATH = BENCHMARK_DIR / "baseline.json"
+
+# The app reads DATABASE_URL at import time, so point it at a scratch database first
+_db_dir = tempfile.mkdtemp(prefix="costing-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/benchmark.db"
+sys.path.insert(0, str(BENCHMARK_DIR.parent))
+
+from sqlalchemy import event
+from app.database import SessionLocal, engine
+from app.models import (Base, Ingredient, Recipe, RecipeIngredient, RecipeBatchPortion, Batch, Dish,
+                        DishBatchPortion, DishIngredientPortion, WEIGHT_CONVERSIONS, VOLUME_CONVERSIONS)
+from app.utils import costing
+from app.utils.dish_costs import build_menu_margin_report, build_dish_cost_breakdown
+from app.api.batches import get_all_batches
+
+INGREDIENT_COUNT = 5000
+RECIPE_LEVELS = 6
+RECIPES_PER_LEVEL = 250
+DISH_COUNT = 500
+SEED = 20261016
+
+
+# ----------------------------------------------------------------------
+# Synthetic menu
+# ----------------------------------------------------------------------
+
+def _ingredient(rnd, ingredient_id):
+    kind = rnd.choice(["weight", "volume", "item"])
+    fields = dict(id=ingredient_id, name=f"Ingredient {ingredient_id}", slug=f"ingredient-{ingredient_id}",
+                  purchase_type=rnd.choice(["case", "single"]), purchase_total_cost=round(rnd.uniform(5, 120), 2))
+    if kind == "item":
+        fields.update(usage_type="weight", use_item_count_pricing=True, items_per_case=rnd.randint(1, 24))
+    elif kind == "weight":
+        fields.update(usage_type="weight", net_unit=rnd.choice(list(WEIGHT_CONVERSIONS)),
+                      net_weight_volume_item=rnd.uniform(1, 10), net_weight_volume_case=rnd.uniform(10, 60),
+                      has_baking_conversion=rnd.random() < 0.2, baking_measurement_unit="cup",
+                      baking_weight_amount=4.0, baking_weight_unit="oz")
+    else:
+        fields.update(usage_type="volume", net_unit=rnd.choice(list(VOLUME_CONVERSIONS)),
+                      net_weight_volume_item=rnd.uniform(1, 10), net_weight_volume_case=rnd.uniform(10, 60))
+    return Ingredient(**fields)
+
+
+def _portion_unit(rnd, yield_unit):
+    system = WEIGHT_CONVERSIONS if yield_unit in WEIGHT_CONVERSIONS else VOLUME_CONVERSIONS
+    return rnd.choice(list(system))
+
+
+def build_menu(db):
+    """Insert the synthetic menu; returns dataset counts"""
+    rnd = random.Random(SEED)
+
+    ingredients = [_ingredient(rnd, i) for i in range(1, INGREDIENT_COUNT + 1)]
+    db.add_all(ingredients)
+
+    def units(ingredient):
+        return ingredient.get_available_units() or ["lb"]
+
+    rows = []
+    levels = []  # level -> [Batch]
+    recipe_id = 0
+    recipe_batch_portions = 0
+    for level in range(RECIPE_LEVELS):
+        level_batches = []
+        for _ in range(RECIPES_PER_LEVEL):
+            recipe_id += 1
+            rows.append(Recipe(id=recipe_id, name=f"Recipe {recipe_id}", slug=f"recipe-{recipe_id}"))
+            for ingredient in rnd.sample(ingredients, rnd.randint(2, 6)):
+                rows.append(RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient.id,
+                                             unit=rnd.choice(units(ingredient)), quantity=rnd.uniform(0.1, 5)))
+            if level > 0:
+                # Always use the level below (so depth grows per level), sometimes deeper ones too
+                used = rnd.sample(levels[level - 1], rnd.randint(1, 3))
+                if level > 1 and rnd.random() < 0.3:
+                    used.append(rnd.choice(levels[rnd.randrange(level - 1)]))
+                for batch in used:
+                    recipe_batch_portions += 1
+                    if rnd.random() < 0.25:
+                        rows.append(RecipeBatchPortion(recipe_id=recipe_id, batch_id=batch.id, use_recipe_portion=True,
+                                                       recipe_portion_percent=rnd.uniform(0.05, 0.5)))
+                    else:
+                        rows.append(RecipeBatchPortion(recipe_id=recipe_id, batch_id=batch.id,
+                                                       portion_size=rnd.uniform(0.5, 4),
+                                                       portion_unit=_portion_unit(rnd, batch.yield_unit)))
+
+            yield_unit = rnd.choice(["lb", "oz", "kg", "qt", "gal", "cup"])
+            batch = Batch(id=recipe_id, slug=f"batch-{recipe_id}", recipe_id=recipe_id,
+                          yield_amount=rnd.uniform(2, 20), yield_unit=yield_unit,
+                          estimated_labor_minutes=rnd.randint(5, 120), hourly_labor_rate=16.75)
+            rows.append(batch)
+            level_batches.append(batch)
+        levels.append(level_batches)
+
+    # Dishes use batches from the top three levels, i.e. 4-6 levels of nesting
+    dish_batches = [batch for level in levels[-3:] for batch in level]
+    dish_portions = 0
+    for dish_id in range(1, DISH_COUNT + 1):
+        rows.append(Dish(id=dish_id, name=f"Dish {dish_id}", slug=f"dish-{dish_id}",
+                         sale_price=round(rnd.uniform(8, 40), 2)))
+        for batch in rnd.sample(dish_batches, rnd.randint(1, 3)):
+            dish_portions += 1
+            rows.append(DishBatchPortion(dish_id=dish_id, batch_id=batch.id, portion_size=rnd.uniform(0.1, 1),
+                                         portion_unit=_portion_unit(rnd, batch.yield_unit)))
+        for ingredient in rnd.sample(ingredients, rnd.randint(0, 2)):
+            rows.append(DishIngredientPortion(dish_id=dish_id, ingredient_id=ingredient.id,
+                                              quantity=rnd.uniform(0.1, 2), unit=rnd.choice(units(ingredient))))
+
+    db.add_all(rows)
+    db.commit()
+
+    return {
+        "ingredients": INGREDIENT_COUNT,
+        "recipes": recipe_id,
+        "recipe_levels": RECIPE_LEVELS,
+        "recipe_batch_portions": recipe_batch_portions,
+        "dishes": DISH_COUNT,
+        "dish_batch_portions": dish_portions
+    }
+
+
+# ----------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------
+
+class StatementCounter:
+    """Counts SQL statements sent to the engine"""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def reset_cost_graph():
+    """Drop the in-process cost graph so the next costing call starts cold"""
+    costing.cost_graph = costing.CostGraph()
+
+
+def measure(counter, run, setup=None, repeat=3):
+    """Median wall-clock milliseconds and SQL statements of run() over `repeat` runs"""
+    timings = []
+    statements = 0
+    for _ in range(repeat):
+        if setup:
+            setup()
+        before = counter.count
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+        statements = counter.count - before
+    return {"ms": round(statistics.median(timings), 2), "queries": statements}
+
+
+def deepest_dish(graph):
+    """Dish whose batch portions sit on the longest recipe chain"""
+    depths = {}
+
+    def depth(recipe_id):
+        if recipe_id not in depths:
+            depths[recipe_id] = 1 + max((depth(dep) for dep in graph.recipe_dependencies(recipe_id)), default=0)
+        return depths[recipe_id]
+
+    def dish_depth(dish_id):
+        return max((depth(graph.batches[dbp.batch_id].recipe_id)
+                    for dbp in graph.dish_batch_portions.get(dish_id, ()) if dbp.batch_id in graph.batches), default=0)
+
+    return max(graph.dishes, key=dish_depth)
+
+
+def run_benchmarks(db):
+    counter = StatementCounter()
+    results = {}
+
+    ingredients = db.query(Ingredient).all()
+    unit_pairs = [(ingredient, unit) for ingredient in ingredients for unit in ingredient.get_available_units()]
+    results["ingredient_cost_per_unit"] = measure(
+        counter, lambda: [ingredient.get_cost_per_unit(unit) for ingredient, unit in unit_pairs]
+    )
+
+    recipe_portions = db.query(RecipeBatchPortion).all()
+    results["recipe_batch_portion_total_cost_cold"] = measure(
+        counter, lambda: [portion.get_total_cost(db) for portion in recipe_portions], setup=reset_cost_graph
+    )
+
+    dish_portions = db.query(DishBatchPortion).all()
+    results["dish_batch_portion_cost_warm"] = measure(
+        counter, lambda: [portion.get_recipe_cost(db) + portion.get_labor_cost(db) for portion in dish_portions]
+    )
+
+    def cost_menu():
+        graph = costing.get_cost_graph(db)
+        return [graph.dish_expected_cost(dish_id) for dish_id in graph.dishes]
+
+    results["full_menu_cold"] = measure(counter, cost_menu, setup=reset_cost_graph)
+    results["menu_margin_report_warm"] = measure(counter, lambda: build_menu_margin_report(db))
+
+    dish = db.get(Dish, deepest_dish(costing.get_cost_graph(db)))
+    results["single_dish_cold"] = measure(counter, lambda: build_dish_cost_breakdown(db, dish), setup=reset_cost_graph)
+    results["single_dish_warm"] = measure(counter, lambda: build_dish_cost_breakdown(db, dish))
+
+    results["api_batches_all_cold"] = measure(counter, lambda: asyncio.run(get_all_batches(db)), setup=reset_cost_graph)
+    results["api_batches_all_warm"] = measure(counter, lambda: asyncio.run(get_all_batches(db)))
+
+    # One leaf ingredient price change, then re-cost the whole menu
+    leaf = db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id == 1).first().ingredient
+    cost_menu()
+
+    def change_price():
+        leaf.purchase_total_cost = round(leaf.purchase_total_cost * 1.1, 2)
+        db.commit()
+
+    results["menu_after_price_change"] = measure(counter, cost_menu, setup=change_price)
+
+    return results
+
+
+# ----------------------------------------------------------------------
+# Baseline
+# ----------------------------------------------------------------------
+
+def compare(results, baseline, tolerance):
+    """Print results next to the baseline; returns the names of regressed cases"""
+    regressions = []
+    print(f"\n{'case':40} {'ms':>10} {'base ms':>10} {'ratio':>7} {'sql':>6} {'base':>6}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:40} {result['ms']:>10.2f} {'-':>10} {'-':>7} {result['queries']:>6} {'-':>6}")
+            continue
+
+        ratio = result["ms"] / base["ms"] if base["ms"] else 0
+        regressed = result["queries"] > base["queries"] or ratio > tolerance
+        flag = "  ❌" if regressed else ""
+        print(f"{name:40} {result['ms']:>10.2f} {base['ms']:>10.2f} {ratio:>7.2f} "
+              f"{result['queries']:>6} {base['queries']:>6}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costing benchmark suite")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {BASELINE_PATH.name}")
+    parser.add_argument("--tolerance", type=float, default=2.0,
+                        help="allowed slowdown factor against the baseline (default 2.0)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print("Building synthetic menu...")
+        dataset = build_menu(db)
+        print("  " + ", ".join(f"{key}={value}" for key, value in dataset.items()))
+
+        print("Running benchmarks...")
+        results = run_benchmarks(db)
+    finally:
+        db.close()
+        engine.dispose()
+        shutil.rmtree(_db_dir, ignore_errors=True)
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps({"dataset": dataset, "results": results}, indent=2) + "\n")
+        compare(results, {}, args.tolerance)
+        print(f"\n✅ Baseline saved to {BASELINE_PATH}")
+        return 0
+
+    if not BASELINE_PATH.exists():
+        compare(results, {}, args.tolerance)
+        print("\nℹ No baseline yet; run with --save-baseline to record one")
+        return 0
+
+    baseline = json.loads(BASELINE_PATH.read_text())
+    if baseline.get("dataset") != dataset:
+        print("⚠️  Baseline was recorded on a different dataset; comparisons may not be meaningful")
+
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print(f"\n❌ Regressions: {', '.join(regressions)}")
+        return 1
+
+    print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
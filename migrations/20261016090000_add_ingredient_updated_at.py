@@ -0,0 +1,45 @@
+"""
+Migration: Add row version timestamp to ingredients
+
+# Summary
+Adds an updated_at column to ingredients. The application bumps it on every
+update and uses it to key cached per-unit ingredient costs, so a cached cost
+is discarded as soon as the ingredient's pricing changes.
+
+# Changes Made
+
+1. New Columns
+   - `ingredients.updated_at` (DATETIME)
+     - Set on insert and on every update
+     - Existing rows are backfilled from created_at (or the current time)
+"""
+
+
+def upgrade(conn):
+    """Add updated_at column to ingredients table"""
+
+    print("Adding updated_at column to ingredients table...")
+
+    # Check if column already exists
+    cursor = conn.execute("PRAGMA table_info(ingredients)")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    if 'updated_at' not in columns:
+        conn.execute("""
+            ALTER TABLE ingredients
+            ADD COLUMN updated_at DATETIME
+        """)
+        print("  ✓ Added 'updated_at' column to ingredients table")
+    else:
+        print("  ℹ Column 'updated_at' already exists, skipping")
+
+    # Backfill rows without a version
+    cursor = conn.execute("""
+        UPDATE ingredients
+        SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)
+        WHERE updated_at IS NULL
+    """)
+    print(f"  ✓ Backfilled updated_at for {cursor.rowcount} ingredient(s)")
+
+    conn.commit()
+    print("✅ Ingredient updated_at migration completed successfully!")
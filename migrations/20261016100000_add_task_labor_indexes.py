@@ -0,0 +1,42 @@
+"""
+Migration: Add indexes for batch labor statistics
+
+# Summary
+Batch labor statistics are aggregated in SQL over a batch's completed tasks
+(directly or through the batch's inventory item) and their sessions. These
+indexes keep those lookups seeks rather than full table scans as task
+history grows.
+
+# Changes Made
+
+1. New Indexes
+   - `ix_tasks_batch_id_finished_at` on tasks (batch_id, finished_at)
+   - `ix_tasks_inventory_item_id` on tasks (inventory_item_id)
+   - `ix_task_sessions_task_id` on task_sessions (task_id)
+"""
+
+INDEXES = [
+    ("ix_tasks_batch_id_finished_at", "tasks", "batch_id, finished_at"),
+    ("ix_tasks_inventory_item_id", "tasks", "inventory_item_id"),
+    ("ix_task_sessions_task_id", "task_sessions", "task_id"),
+]
+
+
+def upgrade(conn):
+    """Create task labor indexes"""
+
+    print("Adding task labor indexes...")
+
+    for name, table, columns in INDEXES:
+        cursor = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+        )
+        if cursor.fetchone():
+            print(f"  ℹ Index '{name}' already exists, skipping")
+            continue
+
+        conn.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+        print(f"  ✓ Created index '{name}' on {table} ({columns})")
+
+    conn.commit()
+    print("✅ Task labor index migration completed successfully!")
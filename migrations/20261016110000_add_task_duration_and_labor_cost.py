@@ -0,0 +1,76 @@
+"""
+Migration: Persist task duration and labor cost
+
+# Summary
+Adds duration_seconds and labor_cost columns to tasks. They are written when
+a task is finished (and cleared when it is reopened), so reports and labor
+statistics can sum them in SQL instead of walking every task's sessions and
+assignee in Python.
+
+# Changes Made
+
+1. New Columns
+   - `tasks.duration_seconds` (INTEGER)
+     - Worked seconds: session time minus session pauses, or start to finish
+       minus total pause time for tasks without sessions
+   - `tasks.labor_cost` (FLOAT)
+     - Whole worked minutes times the assigned employee's hourly wage
+
+2. Backfill
+   - Every finished task without a recorded duration is backfilled
+"""
+
+
+def upgrade(conn):
+    """Add duration_seconds and labor_cost columns to tasks table"""
+
+    print("Adding duration and labor cost columns to tasks table...")
+
+    # Check which columns already exist
+    cursor = conn.execute("PRAGMA table_info(tasks)")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    for column, column_type in (("duration_seconds", "INTEGER"), ("labor_cost", "FLOAT")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} {column_type}")
+            print(f"  ✓ Added '{column}' column to tasks table")
+        else:
+            print(f"  ℹ Column '{column}' already exists, skipping")
+
+    # Backfill worked seconds for finished tasks
+    cursor = conn.execute("""
+        UPDATE tasks
+        SET duration_seconds = CASE
+            WHEN EXISTS (SELECT 1 FROM task_sessions s WHERE s.task_id = tasks.id) THEN (
+                SELECT CAST(SUM(MAX(0,
+                    ROUND((julianday(COALESCE(s.ended_at, tasks.finished_at)) - julianday(s.started_at)) * 86400, 3)
+                    - COALESCE(s.pause_duration, 0)
+                )) AS INTEGER)
+                FROM task_sessions s
+                WHERE s.task_id = tasks.id
+            )
+            WHEN started_at IS NULL THEN 0
+            ELSE MAX(0, CAST(
+                ROUND((julianday(CASE WHEN is_paused AND paused_at IS NOT NULL THEN paused_at ELSE finished_at END)
+                       - julianday(started_at)) * 86400, 3)
+                - COALESCE(total_pause_time, 0)
+            AS INTEGER))
+        END
+        WHERE finished_at IS NOT NULL AND duration_seconds IS NULL
+    """)
+    print(f"  ✓ Backfilled duration_seconds for {cursor.rowcount} task(s)")
+
+    # Backfill labor cost from whole minutes and the assignee's wage
+    cursor = conn.execute("""
+        UPDATE tasks
+        SET labor_cost = COALESCE((
+            SELECT (tasks.duration_seconds / 60) / 60.0 * u.hourly_wage
+            FROM users u
+            WHERE u.id = tasks.assigned_to_id
+        ), 0)
+        WHERE finished_at IS NOT NULL AND labor_cost IS NULL
+    """)
+    print(f"  ✓ Backfilled labor_cost for {cursor.rowcount} task(s)")
+
+    conn.commit()
+    print("✅ Task duration and labor cost migration completed successfully!")
@@ -0,0 +1,69 @@
+"""
+Migration: Re-cost finished tasks with several assignees
+
+# Summary
+Task labor is now charged at the highest hourly wage among all of a task's
+assignees (assigned_to plus assigned_employee_ids) rather than only the
+primary assignee's wage. Recorded labor costs of finished multi-assignee
+tasks are recomputed to match.
+
+# Changes Made
+
+1. Data Updates
+   - `tasks.labor_cost` for finished tasks with assigned_employee_ids set:
+     whole worked minutes times the highest assignee wage
+   - Skipped when tasks has no assigned_employee_ids column (databases
+     created after assignees moved to the task_assignments table)
+"""
+
+
+def column_exists(conn, table_name, column_name):
+    """Check if a table has a column"""
+    cursor = conn.execute(f"PRAGMA table_info({table_name})")
+    return column_name in [row[1] for row in cursor.fetchall()]
+
+
+def upgrade(conn):
+    """Recompute labor_cost for finished multi-assignee tasks"""
+
+    print("Re-costing finished tasks with multiple assignees...")
+
+    if not column_exists(conn, "tasks", "assigned_employee_ids"):
+        print("  ✓ No assigned_employee_ids column, nothing to re-cost")
+        return
+
+    wages = {
+        user_id: hourly_wage or 0
+        for user_id, hourly_wage in conn.execute("SELECT id, hourly_wage FROM users").fetchall()
+    }
+
+    cursor = conn.execute("""
+        SELECT id, assigned_to_id, assigned_employee_ids, duration_seconds
+        FROM tasks
+        WHERE finished_at IS NOT NULL
+          AND duration_seconds IS NOT NULL
+          AND assigned_employee_ids IS NOT NULL AND assigned_employee_ids != ''
+    """)
+
+    updated = 0
+    for task_id, assigned_to_id, assigned_employee_ids, duration_seconds in cursor.fetchall():
+        employee_ids = {assigned_to_id} if assigned_to_id else set()
+        for emp_id in assigned_employee_ids.split(','):
+            try:
+                employee_ids.add(int(emp_id.strip()))
+            except ValueError:
+                continue
+
+        if not assigned_to_id:
+            labor_cost = 0
+        else:
+            highest_wage = max((wages.get(emp_id, 0) for emp_id in employee_ids), default=0)
+            labor_cost = (duration_seconds // 60) / 60 * highest_wage
+
+        conn.execute("UPDATE tasks SET labor_cost = ? WHERE id = ?", (labor_cost, task_id))
+        updated += 1
+
+    print(f"  ✓ Re-costed {updated} task(s)")
+
+    conn.commit()
+    print("✅ Multi-assignee task re-costing migration completed successfully!")
@@ -0,0 +1,76 @@
+"""
+Migration: Add ingredient price history
+
+# Summary
+Creates the append-only ingredient_prices table. A snapshot of an
+ingredient's pricing is written whenever it is created or its pricing is
+edited, so dishes and recipes can be costed as of a past date.
+
+# Changes Made
+
+1. New Tables
+   - `ingredient_prices`: ingredient_id, effective_at and the ingredient's
+     pricing columns (purchase type and cost, case/item sizes, net unit,
+     baking conversion)
+
+2. New Indexes
+   - `ix_ingredient_prices_ingredient_effective` on (ingredient_id, effective_at)
+
+3. Backfill
+   - One snapshot of the current pricing per existing ingredient, effective
+     from the ingredient's created_at (the earliest date it can be costed at)
+"""
+
+PRICING_COLUMNS = (
+    "usage_type", "purchase_type", "purchase_total_cost", "use_item_count_pricing",
+    "items_per_case", "net_weight_volume_item", "net_weight_volume_case", "net_unit",
+    "has_baking_conversion", "baking_measurement_unit", "baking_weight_amount", "baking_weight_unit"
+)
+
+
+def upgrade(conn):
+    """Create ingredient_prices table and seed it from current ingredient pricing"""
+
+    print("Adding ingredient price history...")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingredient_prices (
+            id INTEGER PRIMARY KEY,
+            ingredient_id INTEGER NOT NULL,
+            effective_at DATETIME NOT NULL,
+            usage_type VARCHAR,
+            purchase_type VARCHAR,
+            purchase_total_cost FLOAT,
+            use_item_count_pricing BOOLEAN,
+            items_per_case INTEGER,
+            net_weight_volume_item FLOAT,
+            net_weight_volume_case FLOAT,
+            net_unit VARCHAR,
+            has_baking_conversion BOOLEAN,
+            baking_measurement_unit VARCHAR,
+            baking_weight_amount FLOAT,
+            baking_weight_unit VARCHAR,
+            FOREIGN KEY (ingredient_id) REFERENCES ingredients (id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_ingredient_prices_id ON ingredient_prices (id)")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS ix_ingredient_prices_ingredient_effective
+        ON ingredient_prices (ingredient_id, effective_at)
+    """)
+    print("  ✓ Created 'ingredient_prices' table")
+
+    # Seed one snapshot per ingredient that has no history yet
+    columns = ", ".join(PRICING_COLUMNS)
+    cursor = conn.execute(f"""
+        INSERT INTO ingredient_prices (ingredient_id, effective_at, {columns})
+        SELECT id, COALESCE(created_at, CURRENT_TIMESTAMP), {columns}
+        FROM ingredients
+        WHERE NOT EXISTS (
+            SELECT 1 FROM ingredient_prices p WHERE p.ingredient_id = ingredients.id
+        )
+    """)
+    print(f"  ✓ Recorded current pricing for {cursor.rowcount} ingredient(s)")
+
+    conn.commit()
+    print("✅ Ingredient price history migration completed successfully!")
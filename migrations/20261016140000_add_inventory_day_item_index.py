@@ -0,0 +1,35 @@
+"""
+Migration: Index inventory day items by day
+
+# Summary
+Inventory day items are read and written per day (opening a day, carrying
+counts over from the last finalized day, task generation, reports), but
+inventory_day_items had no index on day_id. This adds a composite index so
+those lookups are seeks.
+
+# Changes Made
+
+1. New Indexes
+   - `ix_inventory_day_items_day_item` on inventory_day_items (day_id, inventory_item_id)
+"""
+
+
+def upgrade(conn):
+    """Create the inventory day item index"""
+
+    print("Adding inventory day item index...")
+
+    cursor = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'ix_inventory_day_items_day_item'"
+    )
+    if cursor.fetchone():
+        print("  ℹ Index 'ix_inventory_day_items_day_item' already exists, skipping")
+    else:
+        conn.execute("""
+            CREATE INDEX ix_inventory_day_items_day_item
+            ON inventory_day_items (day_id, inventory_item_id)
+        """)
+        print("  ✓ Created index 'ix_inventory_day_items_day_item'")
+
+    conn.commit()
+    print("✅ Inventory day item index migration completed successfully!")
@@ -0,0 +1,31 @@
+"""
+Migration: Index tasks by inventory day
+
+# Summary
+Task generation, the inventory day page and the day report all load a day's
+tasks with WHERE day_id = ?, which scanned the whole tasks table. This adds
+the index SQLAlchemy creates for Task.day_id on new databases.
+
+# Changes Made
+
+1. New Indexes
+   - `ix_tasks_day_id` on tasks (day_id)
+"""
+
+
+def upgrade(conn):
+    """Create the tasks day_id index"""
+
+    print("Adding tasks day index...")
+
+    cursor = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'ix_tasks_day_id'"
+    )
+    if cursor.fetchone():
+        print("  ℹ Index 'ix_tasks_day_id' already exists, skipping")
+    else:
+        conn.execute("CREATE INDEX ix_tasks_day_id ON tasks (day_id)")
+        print("  ✓ Created index 'ix_tasks_day_id'")
+
+    conn.commit()
+    print("✅ Tasks day index migration completed successfully!")
@@ -0,0 +1,84 @@
+"""
+Migration: Add par suggestions
+
+# Summary
+Adds the tables behind history-based par suggestions. A job records each
+item's usage between consecutive finalized days and writes suggested par
+levels from it; inventory_days.usage_recorded_at marks the days it has
+already processed so each run only reads newly finalized days.
+
+# Changes Made
+
+1. New Columns
+   - `inventory_days.usage_recorded_at` (DATETIME)
+
+2. New Tables
+   - `inventory_item_usage`: inventory_item_id, day_id (closing day), date
+     (opening day), days between the counts and usage in par units
+   - `par_suggestions`: one row per item with the suggested par, mean and
+     90th percentile daily usage, per-weekday pars and observation count
+
+3. New Indexes
+   - `ix_inventory_item_usage_item_day` (unique) on inventory_item_usage (inventory_item_id, day_id)
+   - `ix_inventory_item_usage_item_date` on inventory_item_usage (inventory_item_id, date)
+
+4. Backfill
+   - None here; the first run of the job (on the next finalized day, or
+     `python -m app.utils.par_suggestions`) processes the whole history
+"""
+
+
+def upgrade(conn):
+    """Add usage_recorded_at and create the usage and par suggestion tables"""
+
+    print("Adding par suggestions...")
+
+    cursor = conn.execute("PRAGMA table_info(inventory_days)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if "usage_recorded_at" not in columns:
+        conn.execute("ALTER TABLE inventory_days ADD COLUMN usage_recorded_at DATETIME")
+        print("  ✓ Added 'usage_recorded_at' column to inventory_days table")
+    else:
+        print("  ℹ Column 'usage_recorded_at' already exists, skipping")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_item_usage (
+            id INTEGER PRIMARY KEY,
+            inventory_item_id INTEGER NOT NULL,
+            day_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            days INTEGER NOT NULL,
+            usage FLOAT NOT NULL,
+            FOREIGN KEY (inventory_item_id) REFERENCES inventory_items (id),
+            FOREIGN KEY (day_id) REFERENCES inventory_days (id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_inventory_item_usage_id ON inventory_item_usage (id)")
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_inventory_item_usage_item_day
+        ON inventory_item_usage (inventory_item_id, day_id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS ix_inventory_item_usage_item_date
+        ON inventory_item_usage (inventory_item_id, date)
+    """)
+    print("  ✓ Created 'inventory_item_usage' table")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS par_suggestions (
+            id INTEGER PRIMARY KEY,
+            inventory_item_id INTEGER NOT NULL UNIQUE,
+            suggested_par FLOAT NOT NULL,
+            mean_daily_usage FLOAT NOT NULL,
+            p90_daily_usage FLOAT NOT NULL,
+            weekday_pars VARCHAR,
+            observations INTEGER NOT NULL,
+            computed_at DATETIME,
+            FOREIGN KEY (inventory_item_id) REFERENCES inventory_items (id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_par_suggestions_id ON par_suggestions (id)")
+    print("  ✓ Created 'par_suggestions' table")
+
+    conn.commit()
+    print("✅ Par suggestions migration completed successfully!")
@@ -0,0 +1,84 @@
+"""
+Migration: Add day rollups
+
+# Summary
+Adds per-day rollups of the inventory report metrics. When a day is
+finalized its report totals and per-category task counts are written here,
+so weekly and monthly trends read one row per day instead of every task
+and session.
+
+# Changes Made
+
+1. New Tables
+   - `inventory_day_rollups`: one row per finalized day with task counts,
+     task/shift/off-task minutes, shift efficiency, below-par items and
+     labor cost
+   - `inventory_day_category_rollups`: task and completed task counts per
+     day and category
+
+2. New Indexes
+   - `ix_inventory_day_rollups_date` (unique) on inventory_day_rollups (date)
+   - `ix_inventory_day_category_rollups_date` on inventory_day_category_rollups (date)
+   - `ix_inventory_day_category_rollups_day` on inventory_day_category_rollups (day_id)
+
+3. Backfill
+   - None here; the app writes the rollups of days finalized before this
+     migration at startup (`backfill_day_rollups` in app/main.py). It can
+     also be run by hand with `python -m app.utils.day_rollups`
+"""
+
+
+def upgrade(conn):
+    """Create the day rollup tables"""
+
+    print("Adding day rollups...")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_day_rollups (
+            id INTEGER PRIMARY KEY,
+            day_id INTEGER NOT NULL UNIQUE,
+            date DATE NOT NULL,
+            total_tasks INTEGER NOT NULL,
+            completed_tasks INTEGER NOT NULL,
+            unstarted_tasks INTEGER NOT NULL,
+            inventory_items INTEGER NOT NULL,
+            below_par_items INTEGER NOT NULL,
+            total_task_minutes INTEGER NOT NULL,
+            completed_task_minutes INTEGER NOT NULL,
+            shift_minutes FLOAT,
+            off_task_minutes FLOAT,
+            shift_efficiency FLOAT,
+            labor_cost FLOAT NOT NULL,
+            computed_at DATETIME,
+            FOREIGN KEY (day_id) REFERENCES inventory_days (id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_inventory_day_rollups_id ON inventory_day_rollups (id)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_inventory_day_rollups_date ON inventory_day_rollups (date)")
+    print("  ✓ Created 'inventory_day_rollups' table")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_day_category_rollups (
+            id INTEGER PRIMARY KEY,
+            day_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            category_id INTEGER,
+            task_count INTEGER NOT NULL,
+            completed_count INTEGER NOT NULL,
+            FOREIGN KEY (day_id) REFERENCES inventory_days (id),
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_inventory_day_category_rollups_id ON inventory_day_category_rollups (id)")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS ix_inventory_day_category_rollups_date
+        ON inventory_day_category_rollups (date)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS ix_inventory_day_category_rollups_day
+        ON inventory_day_category_rollups (day_id)
+    """)
+    print("  ✓ Created 'inventory_day_category_rollups' table")
+
+    conn.commit()
+    print("✅ Day rollups migration completed successfully!")
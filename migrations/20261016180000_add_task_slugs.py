@@ -0,0 +1,118 @@
+"""
+Migration: Persist task slugs
+
+# Summary
+Adds a slug column to tasks, unique within the task's day. Task URLs used to
+be resolved by loading every task of the day (or of every day, for the task
+API without a day_id) and generating each one's slug; they are now one
+index lookup.
+
+# Changes Made
+
+1. New Columns
+   - `tasks.slug` (TEXT)
+     - Generated from the task's description or the name of its inventory
+       item, recipe or janitorial task, with a -<scale> suffix for batch
+       tasks not at full scale; "task" when none of those slugify to
+       anything
+
+2. Backfill
+   - Every task without a slug, per day in id order: the first task with a
+     slug keeps it, so existing task URLs keep resolving to the same task,
+     and later duplicates within the day get -2, -3, ... suffixes
+
+3. New Indexes
+   - `ix_tasks_slug_day_id` (unique) on tasks (slug, day_id)
+"""
+
+import re
+
+
+def slugify(text):
+    """Convert text to a URL-friendly slug (same rules as app.utils.slugify)"""
+    if not text:
+        return ""
+    slug = text.lower()
+    slug = re.sub(r'[\s_]+', '-', slug)
+    slug = re.sub(r'[^a-z0-9-]', '', slug)
+    slug = re.sub(r'-+', '-', slug)
+    return slug.strip('-')
+
+
+def task_slug_base(description, auto_generated, item_name, recipe_name, janitorial_title,
+                   batch_id, selected_scale):
+    """Slug of a task before it is made unique within its day (same rules as app.utils.task_slugs)"""
+    if not auto_generated and description:
+        base_slug = slugify(description[:50])
+    elif item_name:
+        base_slug = slugify(item_name)
+    elif recipe_name:
+        base_slug = slugify(recipe_name)
+    elif janitorial_title:
+        base_slug = slugify(janitorial_title)
+    elif description:
+        base_slug = slugify(description[:50])
+    else:
+        base_slug = "task"
+
+    if batch_id and selected_scale and selected_scale != 'full':
+        base_slug = f"{base_slug}-{selected_scale}"
+
+    return base_slug or "task"
+
+
+def upgrade(conn):
+    """Add the slug column to tasks, backfill it and index it"""
+
+    print("Adding slug column to tasks table...")
+
+    cursor = conn.execute("PRAGMA table_info(tasks)")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    if "slug" not in columns:
+        conn.execute("ALTER TABLE tasks ADD COLUMN slug TEXT")
+        print("  ✓ Added 'slug' column to tasks table")
+    else:
+        print("  ℹ Column 'slug' already exists, skipping")
+
+    # Slugs already taken per day
+    taken_by_day = {}
+    for day_id, slug in conn.execute("SELECT day_id, slug FROM tasks WHERE slug IS NOT NULL"):
+        taken_by_day.setdefault(day_id, set()).add(slug)
+
+    # Backfill in id order per day, so the oldest task keeps the plain slug
+    # (the one the old lookups resolved to)
+    rows = conn.execute("""
+        SELECT t.id, t.day_id, t.description, t.auto_generated, i.name, r.name, j.title,
+               t.batch_id, t.selected_scale
+        FROM tasks t
+        LEFT JOIN inventory_items i ON i.id = t.inventory_item_id
+        LEFT JOIN batches b ON b.id = t.batch_id
+        LEFT JOIN recipes r ON r.id = b.recipe_id
+        LEFT JOIN janitorial_tasks j ON j.id = t.janitorial_task_id
+        WHERE t.slug IS NULL
+        ORDER BY t.day_id, t.id
+    """).fetchall()
+
+    updates = []
+    for (task_id, day_id, description, auto_generated, item_name, recipe_name, janitorial_title,
+         batch_id, selected_scale) in rows:
+        base_slug = task_slug_base(description, auto_generated, item_name, recipe_name,
+                                   janitorial_title, batch_id, selected_scale)
+        taken = taken_by_day.setdefault(day_id, set())
+        slug = base_slug
+        counter = 2
+        while slug in taken:
+            slug = f"{base_slug}-{counter}"
+            counter += 1
+        taken.add(slug)
+        updates.append((slug, task_id))
+
+    conn.executemany("UPDATE tasks SET slug = ? WHERE id = ?", updates)
+    print(f"  ✓ Backfilled slug for {len(updates)} task(s)")
+
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_tasks_slug_day_id ON tasks (slug, day_id)")
+    print("  ✓ Created index 'ix_tasks_slug_day_id' on tasks (slug, day_id)")
+
+    conn.commit()
+    print("✅ Task slug migration completed successfully!")
@@ -0,0 +1,36 @@
+"""
+Migration: Add task row versions
+
+# Summary
+Adds a version column to tasks. Every update of a task is made conditional
+on the version it was loaded with and bumps it, so two devices starting,
+pausing or finishing the same task at once can't overwrite each other: the
+second update matches no row and is rejected.
+
+# Changes Made
+
+1. New Columns
+   - `tasks.version` (INTEGER NOT NULL DEFAULT 1)
+     - Row version, checked and bumped by every update of the task
+
+2. Backfill
+   - Existing tasks start at version 1 (the column default)
+"""
+
+
+def upgrade(conn):
+    """Add version column to tasks table"""
+
+    print("Adding version column to tasks table...")
+
+    cursor = conn.execute("PRAGMA table_info(tasks)")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    if "version" not in columns:
+        conn.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        print("  ✓ Added 'version' column to tasks table")
+    else:
+        print("  ℹ Column 'version' already exists, skipping")
+
+    conn.commit()
+    print("✅ Task version migration completed successfully!")
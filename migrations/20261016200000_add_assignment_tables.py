@@ -0,0 +1,97 @@
+"""
+Migration: Add task assignment and day employee tables
+
+# Summary
+Moves the comma-separated employee ID lists tasks.assigned_employee_ids and
+inventory_days.employees_working into join tables, so "tasks this employee
+was assigned" and "days this employee worked" are index lookups instead of
+full-table scans with string parsing.
+
+# Changes Made
+
+1. New Tables
+   - `task_assignments`: task_id, employee_id (primary key) and position,
+     the order the employees were assigned in
+   - `day_employees`: day_id, employee_id (primary key) and position, the
+     order the employees were picked in
+
+2. New Indexes
+   - `ix_task_assignments_employee_task` on task_assignments (employee_id, task_id)
+   - `ix_day_employees_employee_day` on day_employees (employee_id, day_id)
+
+3. Backfill
+   - Each task's assigned_employee_ids and each day's employees_working are
+     split into rows (invalid and duplicate IDs skipped), only while the
+     tables are still empty
+   - The old string columns are left in place but no longer read or written
+"""
+
+
+def column_exists(conn, table_name, column_name):
+    """Check if a table has a column"""
+    cursor = conn.execute(f"PRAGMA table_info({table_name})")
+    return column_name in [row[1] for row in cursor.fetchall()]
+
+
+def split_ids(value):
+    """Unique integer IDs of a comma-separated list, in order"""
+    ids = []
+    for part in (value or "").split(","):
+        try:
+            employee_id = int(part.strip())
+        except ValueError:
+            continue
+        if employee_id not in ids:
+            ids.append(employee_id)
+    return ids
+
+
+def create_join_table(conn, table_name, owner_column, owner_table, source_table, source_column):
+    """Create a join table to users and fill it from a comma-separated column while it is empty"""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            {owner_column} INTEGER NOT NULL,
+            employee_id INTEGER NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY ({owner_column}, employee_id),
+            FOREIGN KEY ({owner_column}) REFERENCES {owner_table} (id),
+            FOREIGN KEY (employee_id) REFERENCES users (id)
+        )
+    """)
+    print(f"  ✓ Created '{table_name}' table")
+
+    if conn.execute(f"SELECT 1 FROM {table_name} LIMIT 1").fetchone():
+        print(f"  ℹ Table '{table_name}' already has rows, skipping backfill")
+        return
+
+    rows = []
+    if column_exists(conn, source_table, source_column):
+        cursor = conn.execute(
+            f"SELECT id, {source_column} FROM {source_table} WHERE {source_column} IS NOT NULL AND {source_column} != ''"
+        )
+        for owner_id, value in cursor.fetchall():
+            rows.extend((owner_id, employee_id, position) for position, employee_id in enumerate(split_ids(value)))
+    conn.executemany(
+        f"INSERT INTO {table_name} ({owner_column}, employee_id, position) VALUES (?, ?, ?)",
+        rows
+    )
+    print(f"  ✓ Backfilled {len(rows)} row(s) into '{table_name}' from {source_table}.{source_column}")
+
+
+def upgrade(conn):
+    """Create the task_assignments and day_employees tables and backfill them"""
+
+    print("Adding task assignment and day employee tables...")
+
+    create_join_table(conn, "task_assignments", "task_id", "tasks", "tasks", "assigned_employee_ids")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_task_assignments_employee_task ON task_assignments (employee_id, task_id)"
+    )
+    print("  ✓ Created index 'ix_task_assignments_employee_task'")
+
+    create_join_table(conn, "day_employees", "day_id", "inventory_days", "inventory_days", "employees_working")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_day_employees_employee_day ON day_employees (employee_id, day_id)")
+    print("  ✓ Created index 'ix_day_employees_employee_day'")
+
+    conn.commit()
+    print("✅ Task assignment and day employee migration completed successfully!")